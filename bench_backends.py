@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Loopback benchmark of the socket workers' I/O backends.
+
+Sends n_packets from one socket to another over loopback with each backend,
+once as a burst that is due at once and once paced at a fixed rate, and
+reports packets per second, CPU time per packet (all threads of this
+process, so both workers and the Python side) and send syscalls per packet.
+A backend whose kernel support is missing reports the poll numbers, see the
+uring column.
+
+    python bench_backends.py [n_packets]
+"""
+
+import resource
+import sys
+import threading
+import time
+from array import array
+from rtudp import create_rtudp_pair
+
+BACKENDS = ["poll", "io_uring"]
+CASES = [
+    # (label, packets per second, 0 for a burst)
+    ("burst", 0),
+    ("paced 20k/s", 20_000),
+]
+PAYLOAD = 64
+CHUNK = 1024
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(backend, rate, n_packets, port):
+    sender, receiver = create_rtudp_pair(
+        "socket",
+        "127.0.88.1", port,
+        "127.0.88.2", port + 1,
+        capacity=32768, rx_batch=64, backend=backend,
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    received = 0
+
+    def drain():
+        nonlocal received
+        buffer = bytearray(CHUNK * PAYLOAD)
+        lengths = array('q', bytes(8 * CHUNK))
+        timestamps = array('q', bytes(8 * CHUNK))
+        while received < n_packets:
+            try:
+                received += receiver.receive_into(buffer, lengths, timestamps,
+                                                  1_000_000_000)
+            except TimeoutError:
+                return
+
+    reader = threading.Thread(target=drain)
+    data = bytes(CHUNK * PAYLOAD)
+    lengths = array('q', [PAYLOAD] * CHUNK)
+    offsets = array('q', range(0, CHUNK * PAYLOAD, PAYLOAD))
+    try:
+        cpu = cpu_time()
+        start = time.monotonic_ns()
+        reader.start()
+        for first in range(0, n_packets, CHUNK):
+            n = min(CHUNK, n_packets - first)
+            if rate:
+                timestamps = array('q', (start + (first + i) * 1_000_000_000
+                                         // rate for i in range(n)))
+            else:
+                timestamps = array('q', [start] * n)
+            sender.send_from(data, lengths[:n], timestamps, offsets[:n])
+        reader.join()
+        elapsed = (time.monotonic_ns() - start) / 1e9
+        cpu = cpu_time() - cpu
+        stats = sender.get_packet_stats()
+        rx_stats = receiver.get_packet_stats()
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+    return {
+        "received": received,
+        "pps": received / elapsed,
+        "cpu_us": cpu / max(received, 1) * 1e6,
+        "syscalls": stats["syscalls_per_packet"],
+        "p99_us": stats["p99_latency_ns"] / 1e3,
+        "uring": f"{stats['uring_tx']}/{rx_stats['uring_rx']}",
+    }
+
+
+def main(n_packets=30_000):
+    print(f"{'case':<14}{'backend':<10}{'uring':>6}{'kpkt/s':>10}"
+          f"{'cpu us/pkt':>12}{'sys/pkt':>9}{'p99 us':>9}{'lost':>7}")
+    port = 6801
+    for label, rate in CASES:
+        for backend in BACKENDS:
+            r = run(backend, rate, n_packets, port)
+            port += 2
+            print(f"{label:<14}{backend:<10}{r['uring']:>6}"
+                  f"{r['pps'] / 1e3:>10.1f}{r['cpu_us']:>12.2f}"
+                  f"{r['syscalls']:>9.2f}{r['p99_us']:>9.1f}"
+                  f"{n_packets - r['received']:>7}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30_000)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Ring buffer microbenchmark: records per second between two threads.
+
+Runs the C ring used by the socket implementation with one producer and one
+consumer thread and no socket in the way. n_wakes counts the FUTEX_WAKE
+syscalls the two sides needed; a consumer that keeps up needs none.
+
+    python bench_ring.py [n_packets]
+"""
+
+import sys
+from rtudp.rtudp import _ring_bench
+
+CASES = [
+    # (label, kwargs)
+    ("fixed, batch 1", dict(capacity=1024, payload=64, batch=1)),
+    ("fixed, batch 16", dict(capacity=1024, payload=64, batch=16)),
+    ("fixed, batch 64", dict(capacity=1024, payload=64, batch=64)),
+    ("slab, batch 1", dict(capacity=1 << 16, payload=64, batch=1, slab=True)),
+    ("slab, batch 16", dict(capacity=1 << 16, payload=64, batch=16, slab=True)),
+]
+
+
+def main(n_packets=2_000_000, repeat=3):
+    print(f"{'case':<18}{'Mops/s':>10}{'wakes':>10}")
+    for label, kwargs in CASES:
+        best = max((_ring_bench(n_packets, **kwargs) for _ in range(repeat)),
+                   key=lambda r: r["ops_per_s"])
+        assert best["n_packets"] == n_packets, "ring lost or reordered records"
+        print(f"{label:<18}{best['ops_per_s'] / 1e6:>10.2f}{best['n_wakes']:>10}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,9 @@
+"""Helpers shared by the test modules."""
+
+
+def close_pair(sender, receiver):
+    """Stop both endpoints of a started pair and close their sockets."""
+    sender.stop()
+    receiver.stop()
+    sender.close_socket()
+    receiver.close_socket()
@@ -1,6 +1,11 @@
 from .base import RtUdpBase
 from .socket_impl import RtUdpSocket
-from .emulated import RtUdpEmulated
+from .emulated import RtUdpEmulated, VirtualClock
+from .impairment import Impairment
+from .engine import Engine
+from .sharded import ShardedReceiver
+from .shm import ShmRing
+from .pcap import load_capture
 from .factory import create_rtudp, create_rtudp_pair
 
 # Type alias for type hinting - use this in your type annotations
@@ -15,6 +20,12 @@ __all__ = [
     'RtUdpType',  # Preferred for type hints
     'RtUdpSocket', 
     'RtUdpEmulated',
+    'VirtualClock',
+    'Impairment',
+    'Engine',
+    'ShardedReceiver',
+    'ShmRing',
+    'load_capture',
     'create_rtudp',
     'create_rtudp_pair',
     'RtUdp',  # Compatibility alias
@@ -1,5 +1,9 @@
+import asyncio
+import time
 from abc import ABC, abstractmethod
+from array import array
 from typing import Optional, Tuple, Dict, Any, List
+from .pcap import load_capture
 
 
 class RtUdpBase(ABC):
@@ -34,9 +38,84 @@ class RtUdpBase(ABC):
         Args:
             data: Bytes to send
             timestamp: Optional monotonic timestamp in nanoseconds for scheduled send
+            
+        Raises:
+            BlockingIOError: If the send queue is full and backpressure is "raise"
+            TimeoutError: If no room frees up within send_timeout
+        """
+        pass
+    
+    @abstractmethod
+    def send_batch(self, packets: List[Tuple[bytes, int]]) -> None:
+        """Queue many packets for sending in one call.
+        
+        Args:
+            packets: Sequence of (data, timestamp_ns) tuples, sent in order
+            
+        Raises:
+            BlockingIOError: If the send queue fills up and backpressure is
+                "raise". The packets before it stay queued.
+            TimeoutError: If no room frees up within send_timeout
         """
         pass
     
+    @abstractmethod
+    def send_from(self, buffer: Any, lengths: Any, timestamps: Any,
+                  offsets: Optional[Any] = None) -> None:
+        """Queue many packets sliced out of one contiguous buffer.
+        
+        Args:
+            buffer: Buffer-protocol object holding all payloads
+            lengths: int64 buffer with the length of each payload
+            timestamps: int64 buffer with the send time of each packet
+            offsets: Optional int64 buffer with the start of each payload in
+                ``buffer``. If omitted, payloads are taken back to back.
+                
+        Raises:
+            ValueError: If the arrays differ in size or a packet lies outside
+                ``buffer``. Nothing is queued in that case.
+        """
+        pass
+    
+    def replay_capture(self, path: str, start_ns: Optional[int] = None,
+                       speed: float = 1.0,
+                       direction: Optional[str] = None) -> int:
+        """Queue the UDP payloads of a pcap or pcapng file with their
+        original timing.
+        
+        The file is loaded in one read and queued with one ``send_from()``
+        call. Each packet is scheduled at ``start_ns`` plus its capture time
+        relative to the earliest packet, divided by ``speed``.
+        
+        Args:
+            path: Capture file, e.g. one written with ``capture=``
+            start_ns: When the first packet goes out (CLOCK_MONOTONIC ns),
+                None for now
+            speed: Playback rate, 2.0 replays twice as fast
+            direction: "out" or "in" to replay only the packets a pcapng
+                capture marks as sent or received, None for all
+                
+        Returns:
+            Number of packets queued
+            
+        Raises:
+            ValueError: If the file is not a capture, speed is not positive
+                or a payload exceeds ``max_payload``
+        """
+        if speed <= 0:
+            raise ValueError("speed must be positive.")
+        capture = load_capture(path, direction)
+        if not capture.lengths:
+            return 0
+        if start_ns is None:
+            start_ns = time.monotonic_ns()
+        first = min(capture.timestamps)
+        timestamps = array('q', (start_ns + int((ts - first) / speed)
+                                 for ts in capture.timestamps))
+        self.send_from(capture.data, capture.lengths, timestamps,
+                       capture.offsets)
+        return len(timestamps)
+    
     @abstractmethod
     def receive_data(self, timeout_ns: int) -> Tuple[bytes, int]:
         """Receive data with timeout.
@@ -69,6 +148,131 @@ class RtUdpBase(ABC):
         """
         pass
     
+    @abstractmethod
+    def receive_into(self, buffer: Any, lengths: Any, timestamps: Any,
+                     timeout_ns: int) -> int:
+        """Receive queued packets into caller-owned buffers without allocating.
+        
+        Waits up to ``timeout_ns`` for the first packet. After that it takes
+        every packet already queued until ``buffer``, ``lengths`` or
+        ``timestamps`` is full. Payloads are packed back to back in ``buffer``.
+        
+        Args:
+            buffer: Writable buffer (bytearray, memoryview, NumPy array, ...)
+            lengths: Writable int64 buffer receiving each payload length
+            timestamps: Writable int64 buffer receiving each timestamp_ns
+            timeout_ns: Timeout in nanoseconds
+            
+        Returns:
+            Number of packets written
+            
+        Raises:
+            TimeoutError: If no data received within timeout
+            ValueError: If the next packet does not fit in ``buffer``
+        """
+        pass
+    
+    @abstractmethod
+    def fileno(self) -> int:
+        """File descriptor that is readable while received packets are queued.
+        
+        Meant for ``select``/``poll``/``epoll`` and event loops. Only wait
+        for readability on it; the receive methods keep it up to date. It
+        may briefly stay readable after the queue runs empty.
+        
+        Returns:
+            The file descriptor, owned by this instance
+        """
+        pass
+    
+    async def _wait_receivable(self, deadline: Optional[float]) -> None:
+        """Wait on the running loop until a packet is queued or ``deadline``
+        (``loop.time()``) passes."""
+        loop = asyncio.get_running_loop()
+        fd = self.fileno()
+        while self.get_receive_length() == 0:
+            timeout = None if deadline is None else deadline - loop.time()
+            if timeout is not None and timeout <= 0:
+                raise TimeoutError("Receive timed out")
+            readable = loop.create_future()
+            loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+            try:
+                await asyncio.wait_for(readable, timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError("Receive timed out") from None
+            finally:
+                loop.remove_reader(fd)
+    
+    async def areceive(self, timeout_ns: Optional[int] = None) -> Tuple[bytes, int]:
+        """Receive one packet without blocking the event loop.
+        
+        Args:
+            timeout_ns: Timeout in nanoseconds, None to wait forever
+            
+        Returns:
+            Tuple of (data, timestamp_ns)
+            
+        Raises:
+            TimeoutError: If no data received within timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout_ns is None else loop.time() + timeout_ns / 1e9
+        while True:
+            await self._wait_receivable(deadline)
+            try:
+                return self.receive_data(0)
+            except TimeoutError:
+                pass  # readable but already taken, wait again
+    
+    async def areceive_batch(self, n_packets: int,
+                             timeout_ns: Optional[int] = None) -> List[Tuple[bytes, int]]:
+        """Receive ``n_packets`` packets without blocking the event loop.
+        
+        Takes whatever is queued each time the loop reports the queue
+        readable, so other tasks run while the batch fills up.
+        
+        Args:
+            n_packets: Number of packets to receive
+            timeout_ns: Timeout in nanoseconds, None to wait forever
+            
+        Returns:
+            List of (data, timestamp_ns) tuples
+            
+        Raises:
+            TimeoutError: If timeout reached before all packets received
+            ValueError: If packets were dropped
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout_ns is None else loop.time() + timeout_ns / 1e9
+        packets = []
+        while len(packets) < n_packets:
+            await self._wait_receivable(deadline)
+            n = min(self.get_receive_length(), n_packets - len(packets))
+            if n > 0:
+                packets.extend(self.receive_batch(n, 0))
+        return packets
+    
+    async def adrain(self, timeout_ns: Optional[int] = None,
+                     poll_ns: int = 1_000_000) -> None:
+        """Wait until every queued packet has been sent.
+        
+        The send queue has no file descriptor, so this checks
+        ``get_send_length()`` every ``poll_ns`` nanoseconds.
+        
+        Args:
+            timeout_ns: Timeout in nanoseconds, None to wait forever
+            poll_ns: Polling interval in nanoseconds
+            
+        Raises:
+            TimeoutError: If packets are still queued after the timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout_ns is None else loop.time() + timeout_ns / 1e9
+        while self.get_send_length() > 0:
+            if deadline is not None and loop.time() >= deadline:
+                raise TimeoutError("Timed out draining the send queue")
+            await asyncio.sleep(poll_ns / 1e9)
+    
     @abstractmethod
     def init_socket(self) -> None:
         """Initialize the communication channel (socket/queue)."""
@@ -102,6 +306,45 @@ class RtUdpBase(ABC):
                 - max_latency_ns
                 - min_latency_ns
                 - total_latency_ns
+                - p50_latency_ns, p99_latency_ns, p999_latency_ns,
+                  p9999_latency_ns
+        """
+        pass
+    
+    @abstractmethod
+    def get_tx_timestamps(self) -> List[Tuple[int, int, int]]:
+        """Collect the TX timestamps recorded since the last call.
+        
+        Needs ``timestamping=True``. The socket backend takes software
+        timestamps from the kernel (SO_TIMESTAMPING) and converts them to the
+        CLOCK_MONOTONIC domain. Received packets are then also stamped with
+        the kernel receive time rather than the worker's wake-up time.
+        
+        Returns:
+            List of (id, scheduled_ns, sent_ns) tuples. ``id`` counts the
+            datagrams sent on the socket from 0, in send order.
+        
+        Raises:
+            ValueError: If timestamping is not enabled
+        """
+        pass
+    
+    @abstractmethod
+    def get_latency_histogram(self) -> Tuple[memoryview, memoryview]:
+        """Get the send latency histogram.
+        
+        Each sent packet's lateness (actual minus scheduled send time) is
+        counted in a log-linear histogram, except packets handed to the
+        kernel with an SO_TXTIME launch time (``n_tx_txtime_packets``),
+        whose send time the worker never sees. The bins are set by the
+        ``histo_start`` and ``histo_div`` constructor arguments.
+        
+        Returns:
+            Tuple of (counts, edges), both copies wrapped in memoryviews that
+            ``numpy.asarray`` accepts. ``counts`` holds the 128 uint64 bin
+            counts. ``edges`` holds the 129 int64 bin edges in ns, as with
+            ``numpy.histogram``. The last bin also counts latencies beyond
+            its upper edge.
         """
         pass
     
@@ -1,32 +1,148 @@
+import os
 import time
 import threading
 import queue
 import heapq
-from typing import Optional, Tuple, Dict, Any, List
+import itertools
+from array import array
+from typing import Optional, Tuple, Dict, Any, List, Callable
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import defaultdict, deque
 from .base import RtUdpBase
+from .impairment import Impairment, ImpairedLink
 
 
 @dataclass(order=True)
 class TimedPacket:
-    """Packet with scheduled send time for priority queue."""
+    """Packet with scheduled send time for priority queue.
+    
+    Packets with equal timestamps are ordered by ``seq`` so they go out in
+    the order they were queued.
+    """
     timestamp_ns: int
-    data: bytes = field(compare=False)
+    seq: int = 0
+    data: bytes = field(default=b"", compare=False)
+    
+    
+class LatencyHistogram:
+    """Log-linear latency histogram with the same bins as the C extension.
+    
+    The first ``div`` bins are ``start`` ns wide. Each octave after that is
+    split into ``div // 2`` equal bins, and the last bin also counts anything
+    beyond the covered range.
+    """
+    N_BINS = 128
+    
+    def __init__(self, start: int = 100, div: int = 16):
+        if start < 1 or div < 8 or div > self.N_BINS or div & (div - 1):
+            raise ValueError(
+                "histo_start must be >= 1 and histo_div a power of two "
+                f"between 8 and {self.N_BINS}.")
+        self.start = start
+        self.div = div
+        if self.edge(self.N_BINS) >= 2**63:
+            raise ValueError(
+                "The latency histogram range exceeds 2**63 ns, use a "
+                "smaller histo_start or a larger histo_div.")
+        self.counts = array('Q', bytes(8 * self.N_BINS))
+        self.edges = array('q', (self.edge(i) for i in range(self.N_BINS + 1)))
+    
+    def index(self, value: int) -> int:
+        """Bin index for a latency in ns."""
+        u = max(value, 0) // self.start
+        if u < self.div:
+            return u
+        octave = u.bit_length() - self.div.bit_length() + 1
+        idx = self.div + (octave - 1) * (self.div // 2) + (u >> octave) - self.div // 2
+        return min(idx, self.N_BINS - 1)
+    
+    def edge(self, idx: int) -> int:
+        """Lower edge of bin ``idx`` in ns."""
+        if idx < self.div:
+            return idx * self.start
+        j = idx - self.div
+        half = self.div // 2
+        return ((j % half + half) << (j // half + 1)) * self.start
+    
+    def record(self, value: int) -> None:
+        self.counts[self.index(value)] += 1
+    
+    def percentile(self, q: float, max_value: int) -> int:
+        """Upper edge of the bin holding rank ``q``, capped at ``max_value``."""
+        total = sum(self.counts)
+        if total == 0:
+            return 0
+        rank = max(int(q * total + 0.5), 1)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.edges[i + 1], max_value)
+        return max_value
+
+
+class EventQueue(queue.Queue):
+    """queue.Queue with a pipe that is readable while the queue holds items.
     
+    The pipe is only created on the first fileno() call. All updates happen
+    under the queue's mutex, so readability follows the queue exactly.
+    """
     
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self._rfd = None
+        self._wfd = None
+    
+    def fileno(self) -> int:
+        with self.mutex:
+            if self._rfd is None:
+                self._rfd, self._wfd = os.pipe()
+                os.set_blocking(self._rfd, False)
+                os.set_blocking(self._wfd, False)
+                if self.queue:
+                    os.write(self._wfd, b"\0")
+            return self._rfd
+    
+    def close(self) -> None:
+        """Close the pipe. A later fileno() call opens a new one."""
+        with self.mutex:
+            if self._rfd is not None:
+                os.close(self._rfd)
+                os.close(self._wfd)
+                self._rfd = None
+                self._wfd = None
+    
+    def _put(self, item):
+        if self._wfd is not None and not self.queue:
+            os.write(self._wfd, b"\0")
+        super()._put(item)
+    
+    def _get(self):
+        item = super()._get()
+        self.emptied()
+        return item
+    
+    def emptied(self) -> None:
+        """Clear the pipe if the queue ran empty. Call with mutex held."""
+        if self._rfd is not None and not self.queue:
+            try:
+                os.read(self._rfd, 64)
+            except BlockingIOError:
+                pass
+
+
 class GlobalQueueRegistry:
     """Global registry mapping (ip, port) endpoints to queues."""
-    _registry: Dict[Tuple[str, int], queue.Queue] = {}
+    _registry: Dict[Tuple[str, int], EventQueue] = {}
     _lock = threading.Lock()
     
     @classmethod
-    def get_or_create_queue(cls, ip: str, port: int, capacity: int = 1024) -> queue.Queue:
+    def get_or_create_queue(cls, ip: str, port: int, capacity: int = 1024) -> EventQueue:
         """Get existing queue or create new one for endpoint."""
         endpoint = (ip, port)
         with cls._lock:
             if endpoint not in cls._registry:
-                cls._registry[endpoint] = queue.Queue(maxsize=capacity)
+                cls._registry[endpoint] = EventQueue(maxsize=capacity)
             return cls._registry[endpoint]
     
     @classmethod
@@ -34,7 +150,96 @@ class GlobalQueueRegistry:
         """Remove queue from registry."""
         endpoint = (ip, port)
         with cls._lock:
-            cls._registry.pop(endpoint, None)
+            q = cls._registry.pop(endpoint, None)
+        if q is not None:
+            q.close()
+
+
+class VirtualClock:
+    """Simulated CLOCK_MONOTONIC for a discrete-event run of emulated endpoints.
+    
+    Pass the same instance as ``clock=`` to every endpoint of a simulation.
+    Those endpoints have no send thread. Their send queues (and the packets
+    in flight on impaired links) together form the event list, and each
+    step jumps straight to the earliest deadline over all started endpoints
+    and sends or delivers that packet. Packets with equal
+    deadlines go out in the order they were queued, so a run gives the same
+    result every time, however much virtual time it covers.
+    
+    Time only moves while something waits: a receive call runs the
+    simulation until a packet arrives or its timeout has passed in virtual
+    time, and a "block" send runs it until there is room. ``run_until()``
+    and ``run()`` move it explicitly. Drive a simulation from one thread.
+    """
+    
+    def __init__(self, start_ns: int = 0):
+        self._now_ns = start_ns
+        self._endpoints: List['RtUdpEmulated'] = []
+        self._lock = threading.RLock()
+        self._seq = itertools.count()
+    
+    def monotonic_ns(self) -> int:
+        """Current virtual time in ns."""
+        return self._now_ns
+    
+    def run_until(self, t_ns: int) -> None:
+        """Send every packet due by ``t_ns`` and move time to it."""
+        self._run(lambda: False, t_ns)
+    
+    def advance(self, ns: int) -> None:
+        """Run the simulation for ``ns`` nanoseconds of virtual time."""
+        self.run_until(self._now_ns + ns)
+    
+    def run(self) -> None:
+        """Send every queued packet, moving time to the last deadline."""
+        self._run(lambda: False, None)
+    
+    def _attach(self, endpoint: 'RtUdpEmulated') -> None:
+        with self._lock:
+            self._endpoints.append(endpoint)
+    
+    def _detach(self, endpoint: 'RtUdpEmulated') -> None:
+        with self._lock:
+            if endpoint in self._endpoints:
+                self._endpoints.remove(endpoint)
+    
+    def _step(self, deadline_ns: Optional[int]) -> bool:
+        """Send or deliver the earliest packet if it is due by
+        ``deadline_ns`` (None for any deadline). Returns False if there was
+        none."""
+        endpoint = min((e for e in self._endpoints if e._send_queue or e._flight),
+                       key=lambda e: e._head(), default=None)
+        if endpoint is None:
+            return False
+        with endpoint._send_lock:
+            packet = endpoint._head()
+            if deadline_ns is not None and packet.timestamp_ns > deadline_ns:
+                return False
+            self._now_ns = max(self._now_ns, packet.timestamp_ns)
+            if endpoint._send_queue and endpoint._send_queue[0] is packet:
+                endpoint._deliver(heapq.heappop(endpoint._send_queue), self._now_ns)
+                endpoint._send_not_full.notify_all()
+            else:
+                endpoint._arrive(heapq.heappop(endpoint._flight), self._now_ns)
+        return True
+    
+    def _run(self, predicate: Callable[[], bool],
+             deadline_ns: Optional[int]) -> bool:
+        """Step until ``predicate()`` holds or nothing is due by
+        ``deadline_ns``, then move time to the deadline.
+        
+        Returns the final value of ``predicate()``.
+        """
+        with self._lock:
+            while not predicate():
+                if not self._step(deadline_ns):
+                    if deadline_ns is not None:
+                        self._now_ns = max(self._now_ns, deadline_ns)
+                    return predicate()
+            return True
+
+
+BACKPRESSURE_POLICIES = ("block", "drop_newest", "drop_oldest", "raise")
 
 
 class RtUdpEmulated(RtUdpBase):
@@ -53,6 +258,28 @@ class RtUdpEmulated(RtUdpBase):
                 - capacity: Queue capacity (default: 1024)
                 - direction: 0=send, 1=receive, 2=full duplex (default: 0)
                 - cpu: Ignored for emulated version
+                - engine: Ignored for emulated version
+                - shm_name: Ignored for emulated version
+                - capture: Ignored for emulated version
+                - backend: Ignored for emulated version
+                - rx_spin: Ignored for emulated version
+                - busy_poll: Ignored for emulated version
+                - clock: A VirtualClock to run in simulated time instead of
+                  CLOCK_MONOTONIC; endpoints sharing it form one simulation
+                  (default: None)
+                - impairment: An Impairment applied to the packets this
+                  endpoint sends (default: None)
+                - histo_start: Latency histogram bin width in ns for the
+                  first octave (default: 100)
+                - histo_div: Latency histogram bins per octave, a power of
+                  two from 8 to 128 (default: 16)
+                - timestamping: Record (id, scheduled, sent) for every sent
+                  packet for get_tx_timestamps() (default: False)
+                - backpressure: What sending does when ``capacity`` packets
+                  are queued: "block", "drop_newest", "drop_oldest" or
+                  "raise" (default: "block")
+                - send_timeout: How long "block" waits for room in ns, -1
+                  waits forever (default: -1)
                 - timeout: Default timeout in nanoseconds (default: 10s)
         """
         self.local_ip = local_ip
@@ -64,17 +291,41 @@ class RtUdpEmulated(RtUdpBase):
         self.capacity = kwargs.get('capacity', 1024)
         self.direction = kwargs.get('direction', 0)
         self.timeout_ns = kwargs.get('timeout', 10_000_000_000)
+        self._histogram = LatencyHistogram(kwargs.get('histo_start', 100),
+                                           kwargs.get('histo_div', 16))
+        self.timestamping = kwargs.get('timestamping', False)
+        self._tx_timestamps = deque(maxlen=4096)
+        self._tx_id = itertools.count()
+        self.backpressure = kwargs.get('backpressure', 'block')
+        if self.backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError("backpressure must be 'block', 'drop_newest', "
+                             "'drop_oldest' or 'raise'.")
+        send_timeout = kwargs.get('send_timeout', -1)
+        self.send_timeout_ns = None if send_timeout < 0 else send_timeout
+        
+        self._clock = kwargs.get('clock')
+        if self._clock is not None and not isinstance(self._clock, VirtualClock):
+            raise ValueError("clock must be a VirtualClock or None.")
+        
+        impairment = kwargs.get('impairment')
+        if impairment is not None and not isinstance(impairment, Impairment):
+            raise ValueError("impairment must be an Impairment or None.")
+        self._link = (None if impairment is None else
+                      ImpairedLink(impairment, f"{local_ip}:{local_port}"))
         
         # Internal state
         self._running = False
         self._socket_initialized = False
         self._send_thread = None
-        self._receive_thread = None
         
-        # Queues for communication
+        # Queues for communication. In virtual time the clock delivers from
+        # the send queue, possibly while a "block" send holds the lock.
         self._send_queue = []  # Priority queue for scheduled sends
-        self._send_lock = threading.Lock()
-        self._send_event = threading.Event()
+        self._flight = []  # Priority queue of arrivals on an impaired link
+        self._send_lock = threading.RLock() if self._clock else threading.Lock()
+        self._send_not_full = threading.Condition(self._send_lock)
+        self._send_wake = threading.Condition(self._send_lock)
+        self._send_seq = self._clock._seq if self._clock else itertools.count()
         
         # Get or create receive queue from global registry
         self._receive_queue = None
@@ -93,6 +344,9 @@ class RtUdpEmulated(RtUdpBase):
             'n_send_ticks': 0,
             'n_rec_ticks': 0,
             'n_immediate_packets': 0,
+            'n_link_lost': 0,
+            'n_link_reordered': 0,
+            'n_link_duplicated': 0,
         }
         
     def init_socket(self) -> None:
@@ -114,7 +368,9 @@ class RtUdpEmulated(RtUdpBase):
             return
         
         self._socket_initialized = False
-        # Note: We don't remove queues from registry as other endpoints might use them
+        # Note: We don't remove queues from registry as other endpoints might use them,
+        # but the pipe behind fileno() belongs to this endpoint.
+        self._receive_queue.close()
     
     def start(self) -> None:
         """Start worker threads."""
@@ -126,26 +382,26 @@ class RtUdpEmulated(RtUdpBase):
         
         self._running = True
         
-        # Start send thread if needed
+        # Start send thread if needed. Receiving needs no thread: packets
+        # are read straight from the queue the remote end delivers into.
         if self.direction in [0, 2]:  # Send or full duplex
+            if self._clock is not None:
+                self._clock._attach(self)
+                return
             self._send_thread = threading.Thread(target=self._send_worker, daemon=True)
             self._send_thread.start()
-        
-        # Start receive thread if needed
-        if self.direction in [1, 2]:  # Receive or full duplex
-            self._receive_thread = threading.Thread(target=self._receive_worker, daemon=True)
-            self._receive_thread.start()
     
     def stop(self) -> None:
         """Stop worker threads."""
-        self._running = False
-        self._send_event.set()  # Wake up send thread
+        if self._clock is not None:
+            self._clock._detach(self)
+        with self._send_lock:
+            self._running = False
+            self._send_wake.notify()  # Wake up send thread
         
         # Wait for threads to finish
         if self._send_thread:
             self._send_thread.join(timeout=1.0)
-        if self._receive_thread:
-            self._receive_thread.join(timeout=1.0)
     
     def send_data(self, data: bytes, timestamp: Optional[int] = None) -> None:
         """Send data with optional timestamp."""
@@ -153,16 +409,92 @@ class RtUdpEmulated(RtUdpBase):
             raise OSError("Socket not initialized")
         
         if timestamp is None:
-            timestamp = time.monotonic_ns()
-        
-        self._stats['n_packets_req'] += 1
+            timestamp = self._now_ns()
         
         # Add to priority queue
+        packet = TimedPacket(timestamp, next(self._send_seq), data)
+        with self._send_lock:
+            if self._make_room():
+                heapq.heappush(self._send_queue, packet)
+                # Wake up send thread if this is its new deadline
+                if self._send_queue[0] is packet:
+                    self._send_wake.notify()
+            self._stats['n_packets_req'] += 1
+    
+    def send_batch(self, packets: List[Tuple[bytes, int]]) -> None:
+        """Queue many packets for sending in one call."""
+        if not self._socket_initialized:
+            raise OSError("Socket not initialized")
+        
+        timed = [TimedPacket(timestamp, next(self._send_seq), data)
+                 for data, timestamp in packets]
+        
         with self._send_lock:
-            heapq.heappush(self._send_queue, TimedPacket(timestamp, data))
+            for packet in timed:
+                if self._make_room():
+                    heapq.heappush(self._send_queue, packet)
+                    if self._send_queue[0] is packet:
+                        self._send_wake.notify()
+                self._stats['n_packets_req'] += 1
+    
+    def _make_room(self) -> bool:
+        """Apply the backpressure policy before queueing one packet.
+        
+        Call with ``_send_lock`` held. Returns False if the packet is to be
+        dropped.
+        """
+        q = self._send_queue
+        if len(q) < self.capacity:
+            return True
+        if self.backpressure == 'drop_newest':
+            self._stats['n_tx_packets_dropped'] += 1
+            return False
+        if self.backpressure == 'drop_oldest':
+            oldest = min(range(len(q)), key=lambda i: q[i].seq)
+            q[oldest] = q[-1]
+            q.pop()
+            heapq.heapify(q)
+            self._stats['n_tx_packets_dropped'] += 1
+            return True
+        if self.backpressure == 'raise':
+            raise BlockingIOError("Send queue is full.")
+        if self._clock is not None:
+            deadline = (None if self.send_timeout_ns is None
+                        else self._clock.monotonic_ns() + self.send_timeout_ns)
+            if not self._clock._run(lambda: len(q) < self.capacity, deadline):
+                raise TimeoutError("Timed out waiting for room in the send queue.")
+            return True
+        timeout = None if self.send_timeout_ns is None else self.send_timeout_ns / 1e9
+        if not self._send_not_full.wait_for(lambda: len(q) < self.capacity, timeout):
+            raise TimeoutError("Timed out waiting for room in the send queue.")
+        return True
+    
+    def send_from(self, buffer: Any, lengths: Any, timestamps: Any,
+                  offsets: Optional[Any] = None) -> None:
+        """Queue many packets sliced out of one contiguous buffer."""
+        if not self._socket_initialized:
+            raise OSError("Socket not initialized")
         
-        # Wake up send thread
-        self._send_event.set()
+        data = memoryview(buffer).cast('B')
+        lengths = memoryview(lengths).tolist()
+        timestamps = memoryview(timestamps).tolist()
+        if offsets is None:
+            offsets, offset = [], 0
+            for length in lengths:
+                offsets.append(offset)
+                offset += length
+        else:
+            offsets = memoryview(offsets).tolist()
+        
+        if not len(lengths) == len(timestamps) == len(offsets):
+            raise ValueError("lengths, timestamps and offsets must be the same size.")
+        for i, (offset, length) in enumerate(zip(offsets, lengths)):
+            if length < 0 or offset < 0 or offset + length > len(data):
+                raise ValueError(f"Packet {i} is out of bounds.")
+        
+        self.send_batch([(bytes(data[offset:offset + length]), timestamp)
+                         for offset, length, timestamp
+                         in zip(offsets, lengths, timestamps)])
     
     def receive_data(self, timeout_ns: int) -> Tuple[bytes, int]:
         """Receive data with timeout."""
@@ -170,6 +502,9 @@ class RtUdpEmulated(RtUdpBase):
             raise OSError("Socket not initialized")
         
         timeout_s = timeout_ns / 1_000_000_000
+        if self._clock is not None:
+            self._run_until_received(self._clock.monotonic_ns() + timeout_ns)
+            timeout_s = 0
         
         try:
             data, timestamp = self._receive_queue.get(timeout=timeout_s)
@@ -186,12 +521,15 @@ class RtUdpEmulated(RtUdpBase):
         packets = []
         timeout_s = timeout_ns / 1_000_000_000
         end_time = time.monotonic() + timeout_s
+        if self._clock is not None:
+            end_ns = self._clock.monotonic_ns() + timeout_ns
         
         for _ in range(n_packets):
-            remaining = end_time - time.monotonic()
-            if remaining <= 0:
-                raise TimeoutError("Timed out waiting for data")
-            
+            # Packets already queued are taken even once the time is up.
+            remaining = max(end_time - time.monotonic(), 0)
+            if self._clock is not None:
+                self._run_until_received(end_ns)
+                remaining = 0
             try:
                 data, timestamp = self._receive_queue.get(timeout=remaining)
                 packets.append((data, timestamp))
@@ -201,6 +539,62 @@ class RtUdpEmulated(RtUdpBase):
         
         return packets
     
+    def receive_into(self, buffer: Any, lengths: Any, timestamps: Any,
+                     timeout_ns: int) -> int:
+        """Receive queued packets into caller-owned buffers."""
+        if not self._socket_initialized:
+            raise OSError("Socket not initialized")
+        
+        out = memoryview(buffer).cast('B')
+        out_len = memoryview(lengths)
+        out_ts = memoryview(timestamps)
+        n_max = min(len(out_len), len(out_ts))
+        
+        # Work on the queue under its own lock so a packet that does not fit
+        # can stay at the front, as it does in the ring buffer.
+        q = self._receive_queue
+        timeout_s = timeout_ns / 1_000_000_000
+        if self._clock is not None:
+            self._run_until_received(self._clock.monotonic_ns() + timeout_ns)
+            timeout_s = 0
+        n = 0
+        offset = 0
+        with q.not_empty:
+            if not q.not_empty.wait_for(lambda: q.queue, timeout=timeout_s):
+                raise TimeoutError("Receive timed out")
+            while n < n_max and q.queue:
+                data, timestamp = q.queue[0]
+                if offset + len(data) > len(out):
+                    break
+                q.queue.popleft()
+                out[offset:offset + len(data)] = data
+                offset += len(data)
+                out_len[n] = len(data)
+                out_ts[n] = timestamp
+                n += 1
+            q.emptied()
+            q.not_full.notify(n)
+        
+        if n == 0:
+            raise ValueError("Buffer too small for the next packet.")
+        self._stats['n_packets_rec'] += n
+        return n
+    
+    def replay_capture(self, path: str, start_ns: Optional[int] = None,
+                       speed: float = 1.0,
+                       direction: Optional[str] = None) -> int:
+        """Queue the UDP payloads of a capture, starting now on this
+        endpoint's clock by default."""
+        if start_ns is None:
+            start_ns = self._now_ns()
+        return super().replay_capture(path, start_ns, speed, direction)
+    
+    def fileno(self) -> int:
+        """Pipe that is readable while received packets are queued."""
+        if not self._socket_initialized:
+            raise OSError("Socket not initialized")
+        return self._receive_queue.fileno()
+    
     def get_packet_stats(self) -> Dict[str, Any]:
         """Get packet statistics."""
         stats = self._stats.copy()
@@ -211,12 +605,36 @@ class RtUdpEmulated(RtUdpBase):
         else:
             stats['avg_latency_ns'] = 0
         
+        if self._link is not None:
+            stats['n_link_lost'] = self._link.n_lost
+            stats['n_link_reordered'] = self._link.n_reordered
+            stats['n_link_duplicated'] = self._link.n_duplicated
+        
         # Fix min latency for display
         if stats['min_latency_ns'] == float('inf'):
             stats['min_latency_ns'] = 0
         
+        for key, q in (('p50', 0.50), ('p99', 0.99),
+                       ('p999', 0.999), ('p9999', 0.9999)):
+            stats[f'{key}_latency_ns'] = self._histogram.percentile(
+                q, stats['max_latency_ns'])
+        
         return stats
     
+    def get_tx_timestamps(self) -> List[Tuple[int, int, int]]:
+        """Collect the TX timestamps recorded since the last call."""
+        if not self.timestamping:
+            raise ValueError("Timestamping is not enabled.")
+        stamps = []
+        while self._tx_timestamps:
+            stamps.append(self._tx_timestamps.popleft())
+        return stamps
+    
+    def get_latency_histogram(self) -> Tuple[memoryview, memoryview]:
+        """Get the send latency histogram as (counts, edges)."""
+        counts = array('Q', self._histogram.counts)
+        return memoryview(counts), memoryview(self._histogram.edges).toreadonly()
+    
     def get_send_length(self) -> int:
         """Get number of packets in send queue."""
         with self._send_lock:
@@ -237,6 +655,8 @@ class RtUdpEmulated(RtUdpBase):
         # Clear send queue
         with self._send_lock:
             self._send_queue.clear()
+            self._flight.clear()
+            self._send_not_full.notify_all()
         
         # Clear receive queue
         if self._receive_queue:
@@ -255,53 +675,84 @@ class RtUdpEmulated(RtUdpBase):
         direction_str = {0: "send", 1: "recv", 2: "full"}[self.direction]
         return f"RtUdpEmulated[{direction_str}]({self.local_ip}:{self.local_port})"
     
+    def _now_ns(self) -> int:
+        """Current time on this endpoint's clock."""
+        if self._clock is not None:
+            return self._clock.monotonic_ns()
+        return time.monotonic_ns()
+    
+    def _run_until_received(self, deadline_ns: int) -> None:
+        """Run the virtual clock until a packet is queued for this endpoint
+        or ``deadline_ns`` has passed."""
+        self._clock._run(lambda: not self._receive_queue.empty(), deadline_ns)
+    
+    def _head(self) -> Optional[TimedPacket]:
+        """Earliest queued send or arrival. Call with ``_send_lock`` held."""
+        return min((h[0] for h in (self._send_queue, self._flight) if h),
+                   default=None)
+    
+    def _deliver(self, packet: TimedPacket, now: int) -> None:
+        """Put a due packet on the remote queue, or on the impaired link.
+        Call with ``_send_lock`` held."""
+        stats = self._stats
+        
+        # Check if packet was due before the worker got to it
+        if packet.timestamp_ns < now:
+            stats['n_immediate_packets'] += 1
+        
+        if self._link is not None:
+            for arrival in self._link.transmit(len(packet.data), now, len(self._flight)):
+                heapq.heappush(self._flight, TimedPacket(
+                    arrival, next(self._send_seq), packet.data))
+        else:
+            # Send to remote queue
+            try:
+                self._remote_queue.put_nowait((packet.data, now))
+            except queue.Full:
+                stats['n_tx_packets_dropped'] += 1
+                return
+        stats['n_packets_sent'] += 1
+        
+        # Update latency stats
+        latency = now - packet.timestamp_ns
+        stats['max_latency_ns'] = max(stats['max_latency_ns'], latency)
+        stats['min_latency_ns'] = min(stats['min_latency_ns'], latency)
+        stats['total_latency_ns'] += latency
+        self._histogram.record(latency)
+        if self.timestamping:
+            self._tx_timestamps.append(
+                (next(self._tx_id), packet.timestamp_ns, now))
+    
+    def _arrive(self, packet: TimedPacket, now: int) -> None:
+        """Put a packet that crossed the impaired link on the remote queue."""
+        try:
+            self._remote_queue.put_nowait((packet.data, now))
+        except queue.Full:
+            self._stats['n_tx_packets_dropped'] += 1
+    
     def _send_worker(self):
-        """Worker thread for sending packets."""
-        while self._running:
-            self._stats['n_send_ticks'] += 1
-            
-            # Wait for packets or timeout
-            self._send_event.wait(timeout=0.001)  # 1ms poll
-            self._send_event.clear()
-            
-            now = time.monotonic_ns()
-            
-            # Process all packets ready to send
-            with self._send_lock:
-                while self._send_queue and self._send_queue[0].timestamp_ns <= now:
-                    packet = heapq.heappop(self._send_queue)
-                    
-                    # Check if packet was scheduled for future
-                    if packet.timestamp_ns < now:
-                        self._stats['n_immediate_packets'] += 1
-                    
-                    # Send to remote queue
-                    try:
-                        self._remote_queue.put_nowait((packet.data, now))
-                        self._stats['n_packets_sent'] += 1
-                        
-                        # Update latency stats
-                        latency = now - packet.timestamp_ns
-                        self._stats['max_latency_ns'] = max(self._stats['max_latency_ns'], latency)
-                        self._stats['min_latency_ns'] = min(self._stats['min_latency_ns'], latency)
-                        self._stats['total_latency_ns'] += latency
-                        
-                    except queue.Full:
-                        self._stats['n_tx_packets_dropped'] += 1
-            
-            # Sleep until next packet is ready
-            with self._send_lock:
-                if self._send_queue:
-                    next_packet_time = self._send_queue[0].timestamp_ns
-                    sleep_time_ns = next_packet_time - time.monotonic_ns()
-                    if sleep_time_ns > 0:
-                        time.sleep(sleep_time_ns / 1_000_000_000)
-                        self._send_event.set()  # Wake ourselves up
-    
-    def _receive_worker(self):
-        """Worker thread for receiving packets (not used in basic implementation)."""
-        # In the emulated version, receiving is handled directly from the queue
-        # This thread could be used for statistics or packet processing if needed
-        while self._running:
-            self._stats['n_rec_ticks'] += 1
-            time.sleep(0.001)  # 1ms poll
\ No newline at end of file
+        """Worker thread for sending packets.
+        
+        Sleeps on ``_send_wake`` until the deadline at the head of the send
+        queue (or of the packets in flight on an impaired link), or until
+        notified while both are empty. Queueing a packet that becomes the
+        new head notifies it, so an earlier deadline is never missed.
+        """
+        q = self._send_queue
+        flight = self._flight
+        with self._send_lock:
+            while self._running:
+                self._stats['n_send_ticks'] += 1
+                now = time.monotonic_ns()
+                head = self._head()
+                if head is None or head.timestamp_ns > now:
+                    self._send_wake.wait(
+                        None if head is None else (head.timestamp_ns - now) / 1_000_000_000)
+                    continue
+                
+                # Process all packets ready to send, then those arriving
+                while q and q[0].timestamp_ns <= now:
+                    self._deliver(heapq.heappop(q), now)
+                while flight and flight[0].timestamp_ns <= now:
+                    self._arrive(heapq.heappop(flight), now)
+                self._send_not_full.notify_all()
@@ -0,0 +1,50 @@
+from typing import Any, Dict, List, Optional, Sequence
+from .rtudp import _RtUdpEngine
+
+
+class Engine:
+    """Worker threads shared by many socket endpoints.
+    
+    Without an engine every ``RtUdpSocket`` runs its own send and receive
+    threads. Endpoints created with ``engine=`` are served by the engine's
+    workers instead: each worker waits on the sockets, send queues and send
+    deadlines of all its endpoints at once with epoll and a single timer.
+    Endpoints are assigned to the least loaded worker when they ``start()``.
+    
+    Precision mode (``spin_margin``) and the ``cpu``/``rx_cpu`` options do
+    not apply to endpoints on an engine; pin the workers with ``cpus``.
+    The emulated implementation accepts ``engine=`` and ignores it.
+    """
+    
+    def __init__(self, n_workers: int = 1, cpus: Optional[Sequence[int]] = None):
+        """Start the worker threads.
+        
+        Args:
+            n_workers: Number of worker threads (default: 1)
+            cpus: Optional CPU core per worker to pin it to
+            
+        Raises:
+            ValueError: If n_workers is out of range or cpus has the wrong
+                length
+            OSError: If a worker could not be started
+        """
+        self._engine = _RtUdpEngine(n_workers, cpus)
+    
+    def close(self) -> None:
+        """Stop the worker threads.
+        
+        Raises:
+            ValueError: If an endpoint on the engine is still running
+        """
+        return self._engine.close()
+    
+    def get_stats(self) -> List[Dict[str, int]]:
+        """Per-worker counters: cpu, n_endpoints, n_wakeups, n_events and
+        n_timer_fires."""
+        return self._engine.get_stats()
+    
+    def __enter__(self) -> "Engine":
+        return self
+    
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -56,19 +56,30 @@ def create_rtudp_pair(
         port1: First endpoint port
         ip2: Second endpoint IP
         port2: Second endpoint port
-        **kwargs: Additional parameters (applied to both instances)
+        **kwargs: Additional parameters (applied to both instances). An
+            emulated ``impairment`` may also be a pair of Impairment
+            profiles (endpoint1 -> endpoint2, endpoint2 -> endpoint1), None
+            for an unimpaired direction.
         
     Returns:
         Tuple of (endpoint1, endpoint2) RtUdpBase instances
     """
+    impairments = kwargs.pop('impairment', None)
+    if not isinstance(impairments, (tuple, list)):
+        impairments = (impairments, impairments)
+    
     # Create sender (endpoint1 -> endpoint2)
     kwargs1 = kwargs.copy()
     kwargs1.setdefault('direction', 0)  # Send
+    if impairments[0] is not None:
+        kwargs1['impairment'] = impairments[0]
     endpoint1 = create_rtudp(implementation, ip1, port1, ip2, port2, **kwargs1)
     
     # Create receiver (endpoint2 -> endpoint1)
     kwargs2 = kwargs.copy()
     kwargs2.setdefault('direction', 1)  # Receive
+    if impairments[1] is not None:
+        kwargs2['impairment'] = impairments[1]
     endpoint2 = create_rtudp(implementation, ip2, port2, ip1, port1, **kwargs2)
     
     return endpoint1, endpoint2
\ No newline at end of file
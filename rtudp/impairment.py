@@ -0,0 +1,118 @@
+import random
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Impairment:
+    """Network impairment profile for one direction of an emulated link.
+
+    A packet is delayed by ``latency_ns`` plus normally distributed jitter
+    with standard deviation ``jitter_ns`` (never below zero, so jitter alone
+    reorders packets), after first waiting for a ``rate_bps`` link to become
+    free. Set ``loss`` for independent (Bernoulli) loss, or
+    ``gilbert_elliott`` for bursty loss from a two-state Markov chain
+    ``(p, r, loss_good, loss_bad)``: a packet moves from the good to the bad
+    state with probability ``p`` and back with ``r``, and is then lost with
+    the current state's probability. ``reorder`` is the probability that a
+    packet skips ``latency_ns`` and jitter and overtakes the ones in flight,
+    ``duplicate`` the probability that a second, independently delayed copy
+    is sent. At most ``limit`` packets are in flight; the link drops the
+    rest, as a full queue would.
+
+    ``seed`` makes a link's random draws repeatable; each direction and each
+    kind of draw gets its own stream derived from it.
+    """
+    latency_ns: int = 0
+    jitter_ns: int = 0
+    rate_bps: Optional[int] = None
+    loss: float = 0.0
+    gilbert_elliott: Optional[Tuple[float, float, float, float]] = None
+    reorder: float = 0.0
+    duplicate: float = 0.0
+    limit: int = 1000
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        if self.latency_ns < 0 or self.jitter_ns < 0:
+            raise ValueError("latency_ns and jitter_ns must not be negative.")
+        if self.rate_bps is not None and self.rate_bps <= 0:
+            raise ValueError("rate_bps must be positive or None.")
+        if self.limit < 1:
+            raise ValueError("limit must be at least 1.")
+        probabilities = [self.loss, self.reorder, self.duplicate]
+        if self.gilbert_elliott is not None:
+            if len(self.gilbert_elliott) != 4:
+                raise ValueError("gilbert_elliott must be (p, r, loss_good, loss_bad).")
+            if self.loss:
+                raise ValueError("Set either loss or gilbert_elliott, not both.")
+            probabilities.extend(self.gilbert_elliott)
+        if not all(0.0 <= p <= 1.0 for p in probabilities):
+            raise ValueError("Probabilities must be between 0 and 1.")
+
+
+class ImpairedLink:
+    """State of one direction of an emulated link with an Impairment."""
+
+    def __init__(self, profile: Impairment, name: str):
+        """Create the link.
+
+        Args:
+            profile: Impairment to apply
+            name: Distinguishes this link's random streams from others
+                seeded with the same ``profile.seed``
+        """
+        self.profile = profile
+
+        # One stream per kind of draw, so turning one impairment on does not
+        # shift the sequence another one sees.
+        def draws(kind):
+            seed = None if profile.seed is None else f"{profile.seed}/{name}/{kind}"
+            return random.Random(seed)
+
+        self._loss = draws("loss")
+        self._state = draws("state")
+        self._jitter = draws("jitter")
+        self._reorder = draws("reorder")
+        self._duplicate = draws("duplicate")
+        self._bad = False
+        self._free_ns = 0  # when the rate-limited link is idle again
+        self.n_lost = 0
+        self.n_reordered = 0
+        self.n_duplicated = 0
+
+    def _lost(self) -> bool:
+        ge = self.profile.gilbert_elliott
+        if ge is None:
+            return self.profile.loss > 0.0 and self._loss.random() < self.profile.loss
+        p, r, loss_good, loss_bad = ge
+        self._bad = self._state.random() < (1.0 - r if self._bad else p)
+        return self._loss.random() < (loss_bad if self._bad else loss_good)
+
+    def _delay(self) -> int:
+        profile = self.profile
+        if profile.reorder > 0.0 and self._reorder.random() < profile.reorder:
+            self.n_reordered += 1
+            return 0
+        delay = profile.latency_ns
+        if profile.jitter_ns:
+            delay += int(self._jitter.gauss(0.0, 1.0) * profile.jitter_ns)
+        return max(delay, 0)
+
+    def transmit(self, size: int, now: int, in_flight: int) -> List[int]:
+        """Arrival times of the copies of a ``size`` byte packet sent at
+        ``now``, none if it is lost."""
+        profile = self.profile
+        if in_flight >= profile.limit or self._lost():
+            self.n_lost += 1
+            return []
+        # The last bit leaves once the link has sent everything before it.
+        sent = now
+        if profile.rate_bps is not None:
+            sent = max(now, self._free_ns) + size * 8 * 1_000_000_000 // profile.rate_bps
+            self._free_ns = sent
+        arrivals = [sent + self._delay()]
+        if profile.duplicate > 0.0 and self._duplicate.random() < profile.duplicate:
+            self.n_duplicated += 1
+            arrivals.append(sent + self._delay())
+        return arrivals
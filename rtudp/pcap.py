@@ -0,0 +1,174 @@
+import struct
+from array import array
+from typing import NamedTuple, Optional, Tuple
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+
+PCAP_MAGIC_US = 0xA1B2C3D4
+PCAP_MAGIC_NS = 0xA1B23C4D
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_BOM = 0x1A2B3C4D
+PCAPNG_IDB = 1
+PCAPNG_EPB = 6
+
+EPB_INBOUND = 1
+EPB_OUTBOUND = 2
+
+
+class Capture(NamedTuple):
+    """UDP payloads of a capture, ready for ``send_from()``.
+
+    ``data`` is the whole file and each payload a slice of it, so loading
+    copies nothing per packet.
+    """
+    data: bytes
+    offsets: array     # int64, payload offsets into data
+    lengths: array     # int64, payload lengths
+    timestamps: array  # int64, capture times in ns since the epoch
+
+
+def _ip_offset(data: bytes, offset: int, linktype: int) -> Optional[int]:
+    """Offset of the IPv4 header in a frame, or None if there is none."""
+    if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        return offset
+    if linktype == LINKTYPE_ETHERNET:
+        offset += 12
+        ethertype = int.from_bytes(data[offset:offset + 2], "big")
+        while ethertype in (0x8100, 0x88A8):  # VLAN tags
+            offset += 4
+            ethertype = int.from_bytes(data[offset:offset + 2], "big")
+        return offset + 2 if ethertype == 0x0800 else None
+    if linktype == LINKTYPE_LINUX_SLL:
+        ethertype = int.from_bytes(data[offset + 14:offset + 16], "big")
+        return offset + 16 if ethertype == 0x0800 else None
+    return None
+
+
+def _udp_payload(data: bytes, offset: int, caplen: int,
+                 linktype: int) -> Optional[Tuple[int, int]]:
+    """(offset, length) of the UDP payload in a captured frame, or None if
+    the frame is not a whole, unfragmented IPv4/UDP datagram."""
+    end = offset + caplen
+    ip = _ip_offset(data, offset, linktype)
+    if ip is None or ip + 20 > end or data[ip] >> 4 != 4 or data[ip + 9] != 17:
+        return None
+    if int.from_bytes(data[ip + 6:ip + 8], "big") & 0x3FFF:
+        return None  # a fragment
+    udp = ip + (data[ip] & 0x0F) * 4
+    if udp + 8 > end:
+        return None
+    length = int.from_bytes(data[udp + 4:udp + 6], "big") - 8
+    if length < 0 or udp + 8 + length > end:
+        return None  # truncated by the snap length
+    return udp + 8, length
+
+
+def _load_pcap(data: bytes, capture: Capture) -> None:
+    little = int.from_bytes(data[:4], "little")
+    order = "<" if little in (PCAP_MAGIC_US, PCAP_MAGIC_NS) else ">"
+    magic = struct.unpack_from(order + "I", data)[0]
+    scale = 1 if magic == PCAP_MAGIC_NS else 1000
+    linktype = struct.unpack_from(order + "I", data, 20)[0] & 0xFFFF
+    record = struct.Struct(order + "IIII")
+    offset = 24
+    while offset + record.size <= len(data):
+        sec, frac, caplen, _ = record.unpack_from(data, offset)
+        offset += record.size
+        payload = _udp_payload(data, offset, caplen, linktype)
+        if payload:
+            capture.offsets.append(payload[0])
+            capture.lengths.append(payload[1])
+            capture.timestamps.append(sec * 1_000_000_000 + frac * scale)
+        offset += caplen
+
+
+def _options(data: bytes, offset: int, end: int, order: str):
+    """Yield (code, value offset, length) of the options in [offset, end)."""
+    while offset + 4 <= end:
+        code, length = struct.unpack_from(order + "HH", data, offset)
+        if code == 0:
+            return
+        yield code, offset + 4, length
+        offset += 4 + (length + 3) // 4 * 4
+
+
+def _load_pcapng(data: bytes, capture: Capture,
+                 direction: Optional[str]) -> None:
+    skip = {None: 0, "in": EPB_OUTBOUND, "out": EPB_INBOUND}[direction]
+    order = "<"
+    interfaces = []  # (linktype, timestamp units per second)
+    offset = 0
+    while offset + 12 <= len(data):
+        if struct.unpack_from("<I", data, offset)[0] == PCAPNG_SHB:
+            bom = struct.unpack_from("<I", data, offset + 8)[0]
+            order = "<" if bom == PCAPNG_BOM else ">"
+            interfaces = []
+        block_type, block_len = struct.unpack_from(order + "II", data, offset)
+        if block_len < 12:
+            raise ValueError(f"Corrupt pcapng block at offset {offset}.")
+        end = offset + block_len - 4
+        if block_type == PCAPNG_IDB:
+            linktype = struct.unpack_from(order + "H", data, offset + 8)[0]
+            units = 1_000_000
+            for code, at, _ in _options(data, offset + 16, end, order):
+                if code == 9:  # if_tsresol
+                    resol = data[at]
+                    units = 2 ** (resol & 0x7F) if resol & 0x80 else 10 ** resol
+            interfaces.append((linktype, units))
+        elif block_type == PCAPNG_EPB:
+            iface, ts_hi, ts_lo, caplen, _ = struct.unpack_from(
+                order + "IIIII", data, offset + 8)
+            linktype, units = interfaces[iface]
+            packet = offset + 28
+            flags = 0
+            for code, at, _ in _options(data, packet + (caplen + 3) // 4 * 4,
+                                        end, order):
+                if code == 2:  # epb_flags
+                    flags = struct.unpack_from(order + "I", data, at)[0]
+            payload = None
+            if not skip or flags & 3 != skip:
+                payload = _udp_payload(data, packet, caplen, linktype)
+            if payload:
+                capture.offsets.append(payload[0])
+                capture.lengths.append(payload[1])
+                capture.timestamps.append(
+                    ((ts_hi << 32) | ts_lo) * 1_000_000_000 // units)
+        offset += block_len
+
+
+def load_capture(path: str, direction: Optional[str] = None) -> Capture:
+    """Load the UDP payloads of a pcap or pcapng file in one read.
+
+    Reads classic pcap (microsecond or nanosecond) and pcapng files with
+    raw IP, Ethernet or Linux cooked link layers. Frames that are not whole
+    IPv4/UDP datagrams are skipped.
+
+    Args:
+        path: Capture file
+        direction: "out" or "in" to keep only packets a pcapng capture
+            marks as sent or received (as the ``capture=`` option does).
+            Packets without a direction are always kept. None keeps all.
+
+    Returns:
+        Capture with the payloads in file order
+
+    Raises:
+        ValueError: If the file is not a pcap or pcapng capture
+    """
+    if direction not in (None, "in", "out"):
+        raise ValueError("direction must be 'in', 'out' or None.")
+    with open(path, "rb") as f:
+        data = f.read()
+    capture = Capture(data, array('q'), array('q'), array('q'))
+    magics = {int.from_bytes(data[:4], "little"),
+              int.from_bytes(data[:4], "big")}
+    if PCAPNG_SHB in magics:
+        _load_pcapng(data, capture, direction)
+    elif magics & {PCAP_MAGIC_US, PCAP_MAGIC_NS}:
+        _load_pcap(data, capture)
+    else:
+        raise ValueError(f"{path} is not a pcap or pcapng file.")
+    return capture
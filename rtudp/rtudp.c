@@ -2,26 +2,79 @@
 #define PY_SSIZE_T_CLEAN
 #include <Python.h>
 #include <arpa/inet.h>
+#include <assert.h>
 #include <bits/time.h>
+#include <errno.h>
 #include <fcntl.h>
+#include <limits.h>
+#include <linux/errqueue.h>
+#include <linux/filter.h>
+#include <linux/futex.h>
+#include <linux/net_tstamp.h>
+#include <linux/rtnetlink.h>
+#if __has_include(<linux/io_uring.h>)
+#include <linux/io_uring.h>
+#endif
 #include <netinet/in.h>
+#include <netinet/udp.h>
 #include <poll.h>
 #include <pthread.h>
 #include <sched.h>
 #include <stdatomic.h>
 #include <stdbool.h>
+#include <stddef.h>
 #include <stdint.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <sys/epoll.h>
+#include <sys/eventfd.h>
+#include <sys/mman.h>
 #include <sys/socket.h>
+#include <sys/stat.h>
+#include <sys/syscall.h>
+#include <sys/timerfd.h>
 #include <time.h>
 #include <unistd.h>
 
 #define MAX(a, b) ((a) > (b) ? (a) : (b))
+#if defined(__x86_64__) || defined(__i386__)
+#define cpu_relax() __builtin_ia32_pause()
+#elif defined(__aarch64__)
+#define cpu_relax() __asm__ __volatile__("yield")
+#else
+#define cpu_relax()
+#endif
 #define MIN(a, b) ((a) > (b) ? (b) : (a))
 
-#define MAX_UDP_PAYLOAD 1500
+#define MAX_UDP_PAYLOAD 1500     // default per-instance payload limit
+#define UDP_PAYLOAD_LIMIT 65507  // largest IPv4 UDP payload
+#define UDP_MAX_SEGMENTS 64      // kernel cap on GSO segments per send
+#define SEND_BATCH_MAX 64 // max packets handed to a single sendmmsg()
+#define RX_BATCH_MAX 1024 // max recvmmsg() vector length
+#define GRO_BATCH 8          // recvmmsg() vector length with UDP_GRO
+#define GRO_BUF_BYTES 65536 // largest coalesced UDP_GRO read
+#define HISTO_BINS 128
+#define HISTO_START 100 // ns, default linear bin width
+#define HISTO_DIV 16    // default bins per octave
+#define RX_CTRL_LEN                                                            \
+  (CMSG_SPACE(sizeof(int)) +                                                   \
+   CMSG_SPACE(sizeof(struct scm_timestamping))) // UDP_GRO + SCM_TIMESTAMPING
+#define TX_CTRL_LEN                                                            \
+  (CMSG_SPACE(sizeof(struct sock_extended_err) + sizeof(struct sockaddr_in)) + \
+   CMSG_SPACE(sizeof(struct scm_timestamping)))
+#define TX_TS_WINDOW 4096 // TX timestamps awaiting collection, power of two
+#define TXTIME_LEAD 200000 // ns, default SO_TXTIME hand-off lead
+#define SPIN_MARGIN_MIN 1000    // ns, precision mode margin bounds
+#define SPIN_MARGIN_MAX 1000000
+#define CACHE_LINE 64
+#define TS_OFFSET_REFRESH_NS 1000000000LL // re-measure realtime offset
+#define ENGINE_WORKERS_MAX 64 // threads per shared engine
+#define ENGINE_EVENTS 64      // epoll events handled per wake-up
+#define ENGINE_RX_ROUNDS 4    // recvmmsg() calls per socket per wake-up
+#ifdef IORING_RECV_MULTISHOT // 6.0 headers: multishot recv, buffer rings
+#define HAVE_URING 1
+#endif
 
 char buff[100];
 
@@ -42,139 +95,1267 @@ static inline struct timespec future_ts(long long time_ns, clockid_t clock) {
   return ts_from_ns(future_ns);
 }
 
+/* Fixed ring slot. The payload area is sized per instance (max_payload). */
 typedef struct packet {
   long long ts;
-  char data[MAX_UDP_PAYLOAD];
   size_t len;
+  uint32_t flags; // RECORD_* bits, cleared by commit()
+  char data[];
 } Packet_t;
 
+#define RECORD_DONE 1 // consumed out of order, waiting to be released
+
+/* What send_data()/send_batch()/send_from() do when send_buff is full. */
+typedef enum {
+  BP_BLOCK,       // wait for room, up to send_timeout
+  BP_DROP_NEWEST, // discard the packet being queued
+  BP_DROP_OLDEST, // discard the oldest queued packet to make room
+  BP_RAISE,       // fail with BlockingIOError
+} BACKPRESSURE_t;
+
+/* How a reuseport group of receive shards spreads datagrams. */
+typedef enum {
+  STEER_HASH,    // kernel default, 4-tuple hash
+  STEER_CPU,     // shard = receiving cpu % shards
+  STEER_RANDOM,  // uniformly at random
+  STEER_PAYLOAD, // shard = first 4 payload bytes, big endian, % shards
+} STEER_t;
+
+static const char *steer_names[] = {"hash", "cpu", "random", "payload", NULL};
+
+/* How the socket workers do their I/O. */
+typedef enum {
+  BACKEND_POLL,  // poll()/recvmmsg() and sleeps to the deadlines
+  BACKEND_URING, // io_uring, falling back to BACKEND_POLL per worker
+} BACKEND_t;
+
+static const char *backend_names[] = {"poll", "io_uring", NULL};
+
+static const char *backpressure_names[] = {"block", "drop_newest",
+                                           "drop_oldest", "raise", NULL};
+
 typedef enum {
   DIR_SEND, // half duplex send
   DIR_RECV, // half duplex recieve
   DIR_FULL, // full duplex
 } DIRECTION_t;
 
+/* Statistics. Every thread that counts owns one StatBlock_t and is its only
+ * writer: the application thread queueing packets (STATS_API), the send
+ * worker (STATS_TX) and the receive worker (STATS_RX). An engine worker owns
+ * both worker blocks of the endpoints it serves. Counters are 64-bit and
+ * written with relaxed atomic stores, which cost the same as plain ones.
+ * Writers bracket each group of updates with stats_begin()/stats_end(), a
+ * seqlock, and readers copy a block until they see a group entirely or not
+ * at all. A snapshot combines the blocks by each counter's kind. */
+typedef enum {
+  ST_N_PACKETS_REQ,
+  ST_N_PACKETS_SENT,
+  ST_N_PACKETS_REC,
+  ST_N_RX_PACKETS_DROPPED,
+  ST_N_TX_PACKETS_DROPPED,
+  ST_MAX_LATENCY_NS,
+  ST_MIN_LATENCY_NS,
+  ST_TOTAL_LATENCY_NS,
+  ST_N_SEND_TICKS,
+  ST_N_REC_TICKS,
+  ST_N_IMEDIATE_PACKETS,
+  ST_N_SEND_SYSCALLS,
+  ST_N_RX_SYSCALLS,
+  ST_N_RX_WAKEUPS,
+  ST_N_TX_GSO_PACKETS,
+  ST_N_TX_GSO_SEGMENTS,
+  ST_N_RX_GRO_PACKETS,
+  ST_N_RX_GRO_SEGMENTS,
+  ST_N_RX_TRUNCATED, // datagrams longer than max_payload, dropped
+  ST_N_TX_TIMESTAMPS,
+  ST_N_TX_TIMESTAMPS_DROPPED,
+  ST_N_TX_TXTIME_PACKETS, // handed to the kernel with SCM_TXTIME
+  ST_N_TX_SLEEP_PACKETS,  // sent after sleeping to the deadline
+  ST_N_TIMED_WAITS,       // sleep_until() calls
+  ST_TOTAL_WAKE_ERROR_NS, // how late sleep_until() returned, summed
+  ST_MAX_WAKE_ERROR_NS,
+  ST_N_SPIN_SLEEPS, // precision mode sleeps that ended in a spin
+  ST_N_SPIN_LATE,   // ... that overslept the whole margin
+  ST_TOTAL_SPIN_NS, // time spent busy-waiting
+  ST_N_TX_OUT_OF_ORDER, // queued with an earlier deadline than the last
+  ST_N_TX_SPILLED,      // copied out of send_buff to free the packets behind
+  ST_N_CAPTURED,        // packets copied to the capture writer
+  ST_N_CAPTURE_DROPPED, // ... not copied, its ring was full
+  ST_N_RX_SPIN_POLLS,   // non-blocking receives while busy-polling
+  ST_N_RX_SPIN_IDLE,    // ... that found the socket empty
+  ST_TOTAL_RX_SPIN_NS,  // time spent busy-polling
+  ST_COUNT
+} STAT_t;
+
+typedef enum { STAT_SUM, STAT_MIN, STAT_MAX } STAT_KIND_t;
+
+typedef struct {
+  const char *name;
+  STAT_KIND_t kind;
+  long long init;
+} StatInfo_t;
+
+static const StatInfo_t stat_info[ST_COUNT] = {
+    [ST_N_PACKETS_REQ] = {"n_packets_req", STAT_SUM, 0},
+    [ST_N_PACKETS_SENT] = {"n_packets_sent", STAT_SUM, 0},
+    [ST_N_PACKETS_REC] = {"n_packets_rec", STAT_SUM, 0},
+    [ST_N_RX_PACKETS_DROPPED] = {"n_rx_packets_dropped", STAT_SUM, 0},
+    [ST_N_TX_PACKETS_DROPPED] = {"n_tx_packets_dropped", STAT_SUM, 0},
+    [ST_MAX_LATENCY_NS] = {"max_latency_ns", STAT_MAX, 0},
+    [ST_MIN_LATENCY_NS] = {"min_latency_ns", STAT_MIN, 1000000000LL},
+    [ST_TOTAL_LATENCY_NS] = {"total_latency_ns", STAT_SUM, 0},
+    [ST_N_SEND_TICKS] = {"n_send_ticks", STAT_SUM, 0},
+    [ST_N_REC_TICKS] = {"n_rec_ticks", STAT_SUM, 0},
+    [ST_N_IMEDIATE_PACKETS] = {"n_imediate_packets", STAT_SUM, 0},
+    [ST_N_SEND_SYSCALLS] = {"n_send_syscalls", STAT_SUM, 0},
+    [ST_N_RX_SYSCALLS] = {"n_rx_syscalls", STAT_SUM, 0},
+    [ST_N_RX_WAKEUPS] = {"n_rx_wakeups", STAT_SUM, 0},
+    [ST_N_TX_GSO_PACKETS] = {"n_tx_gso_packets", STAT_SUM, 0},
+    [ST_N_TX_GSO_SEGMENTS] = {"n_tx_gso_segments", STAT_SUM, 0},
+    [ST_N_RX_GRO_PACKETS] = {"n_rx_gro_packets", STAT_SUM, 0},
+    [ST_N_RX_GRO_SEGMENTS] = {"n_rx_gro_segments", STAT_SUM, 0},
+    [ST_N_RX_TRUNCATED] = {"n_rx_truncated", STAT_SUM, 0},
+    [ST_N_TX_TIMESTAMPS] = {"n_tx_timestamps", STAT_SUM, 0},
+    [ST_N_TX_TIMESTAMPS_DROPPED] = {"n_tx_timestamps_dropped", STAT_SUM, 0},
+    [ST_N_TX_TXTIME_PACKETS] = {"n_tx_txtime_packets", STAT_SUM, 0},
+    [ST_N_TX_SLEEP_PACKETS] = {"n_tx_sleep_packets", STAT_SUM, 0},
+    [ST_N_TIMED_WAITS] = {"n_timed_waits", STAT_SUM, 0},
+    [ST_TOTAL_WAKE_ERROR_NS] = {"total_wake_error_ns", STAT_SUM, 0},
+    [ST_MAX_WAKE_ERROR_NS] = {"max_wake_error_ns", STAT_MAX, 0},
+    [ST_N_SPIN_SLEEPS] = {"n_spin_sleeps", STAT_SUM, 0},
+    [ST_N_SPIN_LATE] = {"n_spin_late", STAT_SUM, 0},
+    [ST_TOTAL_SPIN_NS] = {"total_spin_ns", STAT_SUM, 0},
+    [ST_N_TX_OUT_OF_ORDER] = {"n_tx_out_of_order", STAT_SUM, 0},
+    [ST_N_TX_SPILLED] = {"n_tx_spilled", STAT_SUM, 0},
+    [ST_N_CAPTURED] = {"n_captured", STAT_SUM, 0},
+    [ST_N_CAPTURE_DROPPED] = {"n_capture_dropped", STAT_SUM, 0},
+    [ST_N_RX_SPIN_POLLS] = {"n_rx_spin_polls", STAT_SUM, 0},
+    [ST_N_RX_SPIN_IDLE] = {"n_rx_spin_idle", STAT_SUM, 0},
+    [ST_TOTAL_RX_SPIN_NS] = {"total_rx_spin_ns", STAT_SUM, 0},
+};
+
+typedef enum { STATS_API, STATS_TX, STATS_RX, STATS_BLOCKS } STATS_OWNER_t;
+
+typedef struct {
+  _Alignas(CACHE_LINE) atomic_uint seq; // seqlock, odd while the owner updates
+  atomic_llong v[ST_COUNT];
+  atomic_ullong histogram[HISTO_BINS]; // send latency (STATS_TX)
+} StatBlock_t;
+
 typedef struct PacketStats {
-  uint32_t n_packets_req;
-  uint32_t n_packets_sent;
-  uint32_t n_packets_rec;
-  uint32_t n_rx_packets_dropped;
-  uint32_t n_tx_packets_dropped;
-  long long max_latency_ns;
-  long long min_latency_ns;
-  uint64_t total_latency_ns;
-  uint32_t histo_start;
-  uint32_t histo_div;
-  uint32_t histogram[128];
-  uint32_t n_send_ticks;
-  uint32_t n_rec_ticks;
-  uint32_t n_imediate_packets;
+  uint32_t histo_start; // ns per bin in the linear first octave
+  uint32_t histo_div;   // bins per octave, power of two
+  StatBlock_t block[STATS_BLOCKS];
 } PacketStats_t;
 
+/* A consistent copy of all blocks, combined. */
+typedef struct {
+  long long v[ST_COUNT];
+  uint64_t histogram[HISTO_BINS];
+} StatSnapshot_t;
+
+static void stats_init(PacketStats_t *stats) {
+  for (int b = 0; b < STATS_BLOCKS; b++) {
+    atomic_init(&stats->block[b].seq, 0);
+    for (int i = 0; i < ST_COUNT; i++)
+      atomic_init(&stats->block[b].v[i], stat_info[i].init);
+    for (int i = 0; i < HISTO_BINS; i++)
+      atomic_init(&stats->block[b].histogram[i], 0);
+  }
+}
+
+/* Owner: start a group of updates. */
+static inline void stats_begin(StatBlock_t *b) {
+  unsigned seq = atomic_load_explicit(&b->seq, memory_order_relaxed);
+  atomic_store_explicit(&b->seq, seq + 1, memory_order_relaxed);
+  atomic_thread_fence(memory_order_release);
+}
+
+/* Owner: publish the group. */
+static inline void stats_end(StatBlock_t *b) {
+  unsigned seq = atomic_load_explicit(&b->seq, memory_order_relaxed);
+  atomic_store_explicit(&b->seq, seq + 1, memory_order_release);
+}
+
+/* Owner, between stats_begin() and stats_end(). */
+static inline long long stat_get(StatBlock_t *b, STAT_t id) {
+  return atomic_load_explicit(&b->v[id], memory_order_relaxed);
+}
+
+static inline void stat_set(StatBlock_t *b, STAT_t id, long long v) {
+  atomic_store_explicit(&b->v[id], v, memory_order_relaxed);
+}
+
+static inline void stat_add(StatBlock_t *b, STAT_t id, long long v) {
+  stat_set(b, id, stat_get(b, id) + v);
+}
+
+static inline void stat_max(StatBlock_t *b, STAT_t id, long long v) {
+  if (v > stat_get(b, id))
+    stat_set(b, id, v);
+}
+
+static inline void stat_min(StatBlock_t *b, STAT_t id, long long v) {
+  if (v < stat_get(b, id))
+    stat_set(b, id, v);
+}
+
+/* Owner: a lone update, in a group of its own. */
+static inline void stat_count(StatBlock_t *b, STAT_t id, long long v) {
+  stats_begin(b);
+  stat_add(b, id, v);
+  stats_end(b);
+}
+
+/* Copy every block consistently and combine them. Any thread. */
+static void stats_snapshot(PacketStats_t *stats, StatSnapshot_t *snap) {
+  StatSnapshot_t copy;
+  for (int i = 0; i < ST_COUNT; i++)
+    snap->v[i] = stat_info[i].init;
+  memset(snap->histogram, 0, sizeof(snap->histogram));
+
+  for (int b = 0; b < STATS_BLOCKS; b++) {
+    StatBlock_t *blk = &stats->block[b];
+    unsigned before, after;
+    do {
+      before = atomic_load_explicit(&blk->seq, memory_order_acquire);
+      for (int i = 0; i < ST_COUNT; i++)
+        copy.v[i] = atomic_load_explicit(&blk->v[i], memory_order_relaxed);
+      for (int i = 0; i < HISTO_BINS; i++)
+        copy.histogram[i] =
+            atomic_load_explicit(&blk->histogram[i], memory_order_relaxed);
+      atomic_thread_fence(memory_order_acquire);
+      after = atomic_load_explicit(&blk->seq, memory_order_relaxed);
+    } while ((before & 1) || before != after);
+
+    for (int i = 0; i < ST_COUNT; i++) {
+      if (stat_info[i].kind == STAT_SUM)
+        snap->v[i] += copy.v[i];
+      else if (stat_info[i].kind == STAT_MAX)
+        snap->v[i] = MAX(snap->v[i], copy.v[i]);
+      else
+        snap->v[i] = MIN(snap->v[i], copy.v[i]);
+    }
+    for (int i = 0; i < HISTO_BINS; i++)
+      snap->histogram[i] += copy.histogram[i];
+  }
+}
+
+/* Log-linear (HDR-style) latency bins. Values are counted in units of
+ * histo_start ns. The first histo_div bins are one unit wide. Every octave
+ * after that is split into histo_div / 2 bins of equal width, so the relative
+ * error stays under 2 / histo_div. The last bin also takes everything beyond
+ * the covered range. */
+static inline unsigned histo_index(const PacketStats_t *stats, long long v) {
+  uint64_t u = v > 0 ? (uint64_t)v / stats->histo_start : 0;
+  uint64_t div = stats->histo_div;
+  if (u < div)
+    return u;
+  unsigned octave = (63 - __builtin_clzll(u)) - __builtin_ctzll(div) + 1;
+  uint64_t idx = div + (octave - 1) * (div / 2) + ((u >> octave) - div / 2);
+  return MIN(idx, HISTO_BINS - 1);
+}
+
+/* Lower edge of bin idx in ns. idx == HISTO_BINS gives the top of the range. */
+static inline long long histo_edge(const PacketStats_t *stats, unsigned idx) {
+  uint64_t div = stats->histo_div;
+  if (idx < div)
+    return (long long)idx * stats->histo_start;
+  unsigned j = idx - div;
+  unsigned octave = j / (div / 2) + 1;
+  uint64_t sub = j % (div / 2) + div / 2;
+  return (long long)(sub << octave) * stats->histo_start;
+}
+
+/* Whether every edge, up to the top of the range, fits in an int64. With
+ * fewer than 8 bins per octave the range spans more than 63 octaves. */
+static bool histo_fits(uint32_t start, uint32_t div) {
+  unsigned j = HISTO_BINS - div;
+  unsigned octave = j / (div / 2) + 1;
+  uint64_t sub = j % (div / 2) + div / 2;
+  long long top;
+  return octave + (64 - __builtin_clzll(sub)) <= 63 &&
+         !__builtin_mul_overflow((long long)(sub << octave), (long long)start,
+                                 &top);
+}
+
+/* Owner of blk, between stats_begin() and stats_end(). */
+static inline void histo_record(const PacketStats_t *stats, StatBlock_t *blk,
+                                long long v) {
+  atomic_ullong *bin = &blk->histogram[histo_index(stats, v)];
+  atomic_store_explicit(
+      bin, atomic_load_explicit(bin, memory_order_relaxed) + 1,
+      memory_order_relaxed);
+}
+
+/* Latency below which a fraction q of the recorded sends fall, reported as
+ * the upper edge of the bin holding that rank and capped at max_ns. */
+static long long histo_percentile(const PacketStats_t *stats,
+                                  const uint64_t *counts, uint64_t total,
+                                  double q, long long max_ns) {
+  if (total == 0)
+    return 0;
+  uint64_t rank = (uint64_t)(q * total + 0.5);
+  uint64_t seen = 0;
+  for (unsigned i = 0; i < HISTO_BINS; i++) {
+    seen += counts[i];
+    if (seen >= MAX(rank, 1))
+      return MIN(histo_edge(stats, i + 1), max_ns);
+  }
+  return max_ns;
+}
+
+typedef enum {
+  RING_FIXED, // one Packet_t slot per packet
+  RING_SLAB,  // variable-length records packed into a byte array
+} RING_KIND_t;
+
+/* Slab record header. The payload follows directly and the whole record is
+ * padded to SLAB_ALIGN bytes. A header with len == SLAB_WRAP marks the unused
+ * tail of the byte array; the next record starts at offset 0. */
+typedef struct {
+  uint32_t len;
+  uint32_t flags; // RECORD_* bits, cleared by commit()
+  long long ts;
+} SlabHdr_t;
+
+#define SLAB_ALIGN 16
+#define SLAB_WRAP UINT32_MAX
+
+static inline size_t slab_record_size(size_t len) {
+  return (sizeof(SlabHdr_t) + len + SLAB_ALIGN - 1) & ~(size_t)(SLAB_ALIGN - 1);
+}
+
+/* Payload of a tx_ts_buff record; the record's ts is the kernel send time. */
+typedef struct {
+  uint32_t id; // SOF_TIMESTAMPING_OPT_ID, the datagram's index on the socket
+  uint32_t reserved;
+  long long sched_ns;
+} TxStamp_t;
+
+/* Zero-copy reference to a queued packet. Valid until release(). */
+typedef struct {
+  long long ts;
+  size_t len;
+  char *data;
+} PacketRef_t;
+
+/* Parking spot for one side of a ring (an event count). The low bit of seq
+ * says someone may be asleep on it. A side that has to wait sets the bit,
+ * re-checks its condition and sleeps on seq. The other side only makes a
+ * syscall when it finds the bit set, and clears it by bumping seq, so a ring
+ * whose consumer keeps up never enters the kernel. */
+typedef struct {
+  atomic_uint seq;       // futex word, low bit: waiters present
+  atomic_size_t n_wakes; // notifies that had to make the FUTEX_WAKE syscall
+} Waiter_t;
+
+static inline long futex(atomic_uint *uaddr, int op, unsigned val,
+                         const struct timespec *timeout, unsigned val3) {
+  return syscall(SYS_futex, uaddr, op, val, timeout, NULL, val3);
+}
+
+/* Announce the intent to sleep. Returns the key to pass to waiter_sleep();
+ * the caller must re-check its condition in between and simply not sleep if
+ * it already holds. */
+static inline unsigned waiter_prepare(Waiter_t *w) {
+  return atomic_fetch_or_explicit(&w->seq, 1, memory_order_seq_cst) | 1;
+}
+
+/* Sleep until notified or until deadline_ns on CLOCK_MONOTONIC (LLONG_MAX
+ * waits forever). Returns false on timeout. */
+static inline bool waiter_sleep(Waiter_t *w, unsigned key,
+                                long long deadline_ns, int futex_flags) {
+  struct timespec ts_deadline = ts_from_ns(deadline_ns);
+  long ret = futex(&w->seq, FUTEX_WAIT_BITSET | futex_flags, key,
+                   deadline_ns == LLONG_MAX ? NULL : &ts_deadline,
+                   FUTEX_BITSET_MATCH_ANY);
+  return !(ret < 0 && errno == ETIMEDOUT);
+}
+
+/* Wake the other side if it may be asleep. The fence pairs with the seq_cst
+ * read-modify-write in waiter_prepare(): either the waiter sees the state
+ * change made before this call, or this call sees the waiter's bit. Returns
+ * whether there was anyone to wake. */
+static inline bool waiter_notify(Waiter_t *w, int futex_flags) {
+  atomic_thread_fence(memory_order_seq_cst);
+  if (!(atomic_load_explicit(&w->seq, memory_order_relaxed) & 1))
+    return false;
+  atomic_fetch_add_explicit(&w->seq, 1, memory_order_release); // clears bit
+  atomic_fetch_add_explicit(&w->n_wakes, 1, memory_order_relaxed);
+  futex(&w->seq, FUTEX_WAKE | futex_flags, INT_MAX, NULL, 0);
+  return true;
+}
+
+/* Shared state of a ring. Each side writes only its own cache line, so the
+ * producer and the consumer never invalidate each other's lines except when
+ * one of them has to look at the other's index. */
+typedef struct {
+  // producer line
+  _Alignas(CACHE_LINE) atomic_size_t head;
+  atomic_size_t n_published; // packet count, RING_SLAB only
+  size_t cached_tail;        // producer's last look at tail
+  // consumer line
+  _Alignas(CACHE_LINE) atomic_size_t tail;
+  atomic_size_t n_released;
+  size_t cached_head; // consumer's last look at head
+  _Alignas(CACHE_LINE) Waiter_t not_empty; // the consumer parks here
+  atomic_bool interrupted; // set by buff_interrupt() to end consumer waits
+  _Alignas(CACHE_LINE) Waiter_t not_full; // the producer parks here
+  _Alignas(CACHE_LINE) pthread_mutex_t consumer_lock; // see lock_consumer
+  pthread_mutex_t producer_lock; // one producer (thread or process) at a time
+} RingCtl_t;
+
+/* Single-producer single-consumer ring buffer.
+ *
+ * head and tail are free-running positions and the ring size is a power of
+ * two, so a position maps to its slot or byte offset with a mask.
+ * RING_FIXED: positions count slots, all capacity slots are usable.
+ * RING_SLAB: positions count bytes. Memory scales with the real payload
+ * sizes.
+ *
+ * Both sides work through a private cursor: the producer reserve()s and
+ * commit()s records from its cursor and publish()es them in one go, the
+ * consumer peek()s records from its cursor and release()s them in one go.
+ * Each side caches the other's index and only re-reads it when the cached
+ * value says the ring is full (or empty).
+ *
+ * A producer that discards old records with drop_oldest() moves the tail
+ * itself. On such rings (lock_consumer) the consumer holds consumer_lock
+ * from peek() until release(), so records do not vanish under it. */
 typedef struct {
-  unsigned capacity;
-  atomic_size_t head;
-  atomic_size_t tail;
-  pthread_cond_t cond_not_full;
-  pthread_cond_t cond_not_empty;
-  pthread_mutex_t cond_mutex;
-  Packet_t *data;
+  RING_KIND_t kind;
+  unsigned capacity; // slots (RING_FIXED)
+  size_t size;       // bytes (RING_SLAB)
+  size_t mask;       // capacity - 1 or size - 1
+  size_t max_len;    // largest payload a record can hold
+  size_t stride;     // bytes per slot (RING_FIXED)
+  int futex_flags;   // FUTEX_PRIVATE_FLAG unless shared between processes
+  int event_fd;      // eventfd signalled along with not_empty, or -1
+  bool lock_consumer; // the producer may drop_oldest(), see consumer_lock
+  bool shared;        // ctl and records live in a shared-memory segment
+  RingCtl_t *ctl;
+  char *slots;
+  char *slab;
 } Ringbuffer;
 
-int buff_init(Ringbuffer *buff, size_t capacity) {
-  pthread_cond_t cond_not_full = PTHREAD_COND_INITIALIZER;
-  pthread_cond_t cond_not_empty = PTHREAD_COND_INITIALIZER;
-  pthread_mutex_t cond_mutex = PTHREAD_MUTEX_INITIALIZER;
+static inline size_t next_pow2(size_t v) {
+  return v <= 2 ? 2 : (size_t)1 << (64 - __builtin_clzll(v - 1));
+}
+
+/* Work out the geometry of a ring. capacity is a packet count for
+ * RING_FIXED and a byte count for RING_SLAB, max_len the largest payload the
+ * ring has to take. Both are rounded up to a power of two. Returns the bytes
+ * of record storage the ring needs. */
+static size_t buff_shape(Ringbuffer *buff, RING_KIND_t kind, size_t capacity,
+                         size_t max_len) {
+  buff->kind = kind;
+  buff->max_len = max_len;
+  buff->futex_flags = FUTEX_PRIVATE_FLAG;
+  buff->event_fd = -1;
+  buff->lock_consumer = false;
+  buff->shared = false;
+  buff->ctl = NULL;
+  buff->slots = NULL;
+  buff->slab = NULL;
+  if (kind == RING_SLAB) {
+    buff->size = next_pow2(MAX(capacity, SLAB_ALIGN));
+    buff->capacity = 0;
+    buff->mask = buff->size - 1;
+    buff->stride = 0;
+    return buff->size;
+  }
+  buff->capacity = next_pow2(capacity);
+  buff->size = 0;
+  buff->mask = buff->capacity - 1;
+  buff->stride = (sizeof(Packet_t) + max_len + SLAB_ALIGN - 1) &
+                 ~(size_t)(SLAB_ALIGN - 1);
+  return buff->capacity * buff->stride;
+}
 
-  buff->capacity = capacity;
-  buff->tail = 0;
-  buff->head = 0;
+/* Zero a ring's shared state. Rings shared between processes get robust,
+ * process-shared mutexes, so a process dying with one held does not wedge
+ * the others. */
+static void ring_ctl_init(RingCtl_t *ctl, bool shared) {
+  pthread_mutexattr_t attr;
+  memset(ctl, 0, sizeof(RingCtl_t));
+  pthread_mutexattr_init(&attr);
+  if (shared) {
+    pthread_mutexattr_setpshared(&attr, PTHREAD_PROCESS_SHARED);
+    pthread_mutexattr_setrobust(&attr, PTHREAD_MUTEX_ROBUST);
+  }
+  pthread_mutex_init(&ctl->consumer_lock, &attr);
+  pthread_mutex_init(&ctl->producer_lock, &attr);
+  pthread_mutexattr_destroy(&attr);
+}
 
-  buff->cond_not_full = cond_not_full;
-  buff->cond_not_empty = cond_not_empty;
-  buff->cond_mutex = cond_mutex;
+/* Point a shaped ring at its shared state and record storage. */
+static void buff_attach(Ringbuffer *buff, RingCtl_t *ctl, char *data,
+                        bool shared) {
+  buff->ctl = ctl;
+  buff->shared = shared;
+  if (shared)
+    buff->futex_flags = 0;
+  if (buff->kind == RING_SLAB)
+    buff->slab = data;
+  else
+    buff->slots = data;
+}
 
-  buff->data = malloc(capacity * sizeof(Packet_t));
-  if (buff->data == NULL) {
+int buff_init(Ringbuffer *buff, RING_KIND_t kind, size_t capacity,
+              size_t max_len) {
+  size_t data_bytes = buff_shape(buff, kind, capacity, max_len);
+  RingCtl_t *ctl = aligned_alloc(CACHE_LINE, sizeof(RingCtl_t));
+  char *data = malloc(data_bytes);
+  if (ctl == NULL || data == NULL) {
+    free(ctl);
+    free(data);
     return -1;
   }
+  ring_ctl_init(ctl, false);
+  buff_attach(buff, ctl, data, false);
   return 0;
 }
 
-static inline bool queue_is_full(Ringbuffer *buff) {
-  size_t head = atomic_load_explicit(&buff->head, memory_order_relaxed);
-  size_t tail = atomic_load_explicit(&buff->tail, memory_order_acquire);
-  return ((head + 1) % buff->capacity) == tail;
+/* Shared rings only give up the eventfd; their memory belongs to the
+ * segment. */
+void buff_free(Ringbuffer *buff) {
+  if (buff->ctl && buff->event_fd >= 0)
+    close(buff->event_fd);
+  buff->event_fd = -1;
+  if (buff->ctl && !buff->shared) {
+    pthread_mutex_destroy(&buff->ctl->consumer_lock);
+    pthread_mutex_destroy(&buff->ctl->producer_lock);
+    free(buff->slots);
+    free(buff->slab);
+    free(buff->ctl);
+  }
+  buff->slots = NULL;
+  buff->slab = NULL;
+  buff->ctl = NULL;
+}
+
+static inline Packet_t *slot_at(Ringbuffer *buff, size_t i) {
+  return (Packet_t *)(buff->slots + (i & buff->mask) * buff->stride);
+}
+
+/* Drop everything queued. Only safe while neither side is running. */
+static inline void buff_reset(Ringbuffer *buff) {
+  RingCtl_t *ctl = buff->ctl;
+  ctl->head = 0;
+  ctl->tail = 0;
+  ctl->n_published = 0;
+  ctl->n_released = 0;
+  ctl->cached_head = 0;
+  ctl->cached_tail = 0;
 }
 
 static inline bool queue_is_empty(Ringbuffer *buff) {
-  size_t head = atomic_load_explicit(&buff->head, memory_order_acquire);
-  size_t tail = atomic_load_explicit(&buff->tail, memory_order_relaxed);
+  size_t head = atomic_load_explicit(&buff->ctl->head, memory_order_acquire);
+  size_t tail = atomic_load_explicit(&buff->ctl->tail, memory_order_relaxed);
   return head == tail;
 }
 
 static inline size_t length(Ringbuffer *buff) {
-  size_t head = atomic_load_explicit(&buff->head, memory_order_acquire);
-  size_t tail = atomic_load_explicit(&buff->tail, memory_order_acquire);
-  return (head + buff->capacity - tail) % buff->capacity;
+  RingCtl_t *ctl = buff->ctl;
+  if (buff->kind == RING_SLAB) {
+    size_t released =
+        atomic_load_explicit(&ctl->n_released, memory_order_acquire);
+    size_t published =
+        atomic_load_explicit(&ctl->n_published, memory_order_acquire);
+    return published - released;
+  }
+  size_t head = atomic_load_explicit(&ctl->head, memory_order_acquire);
+  size_t tail = atomic_load_explicit(&ctl->tail, memory_order_acquire);
+  return head - tail;
 }
 
-static inline bool enqueue(Ringbuffer *buff, Packet_t packet) {
-  size_t head;
-  size_t tail;
-  size_t next;
+/* Cursors to start producing/consuming from. */
+static inline size_t write_cursor(Ringbuffer *buff) {
+  return atomic_load_explicit(&buff->ctl->head, memory_order_relaxed);
+}
 
-  head = atomic_load_explicit(&buff->head, memory_order_relaxed);
-  tail = atomic_load_explicit(&buff->tail, memory_order_acquire);
-  next = (head + 1) % buff->capacity;
-  if (next == tail) { // queue is full
-    pthread_mutex_lock(&buff->cond_mutex);
-    while (queue_is_full(buff)) {
-      pthread_cond_wait(&buff->cond_not_full, &buff->cond_mutex);
-    }
-    pthread_mutex_unlock(&buff->cond_mutex);
+static inline size_t read_cursor(Ringbuffer *buff) {
+  return atomic_load_explicit(&buff->ctl->tail, memory_order_relaxed);
+}
+
+/* Bytes a record of len bytes takes at cursor, including any skip to the
+ * start of the slab. */
+static inline size_t slab_needed(Ringbuffer *buff, size_t cursor, size_t len) {
+  size_t rec = slab_record_size(len);
+  size_t to_end = buff->size - (cursor & buff->mask);
+  return rec > to_end ? to_end + rec : rec;
+}
+
+static inline bool fits(Ringbuffer *buff, size_t cursor, size_t tail,
+                        size_t len) {
+  if (buff->kind == RING_SLAB)
+    return cursor - tail + slab_needed(buff, cursor, len) <= buff->size;
+  return cursor - tail < buff->capacity;
+}
+
+/* Producer: whether a record of len bytes fits at cursor. */
+static inline bool has_room(Ringbuffer *buff, size_t cursor, size_t len) {
+  RingCtl_t *ctl = buff->ctl;
+  if (fits(buff, cursor, ctl->cached_tail, len))
+    return true;
+  ctl->cached_tail = atomic_load_explicit(&ctl->tail, memory_order_acquire);
+  return fits(buff, cursor, ctl->cached_tail, len);
+}
+
+/* Safe from any thread, unlike has_room(). */
+static inline bool queue_is_full(Ringbuffer *buff) {
+  size_t tail = atomic_load_explicit(&buff->ctl->tail, memory_order_acquire);
+  return !fits(buff, write_cursor(buff), tail, buff->max_len);
+}
+
+/* Producer: start a record of up to len bytes at cursor. Returns where the
+ * payload goes, or NULL if the ring has no room for it. */
+static inline char *reserve(Ringbuffer *buff, size_t *cursor, size_t len) {
+  if (!has_room(buff, *cursor, len))
+    return NULL;
+  if (buff->kind == RING_FIXED)
+    return slot_at(buff, *cursor)->data;
+
+  size_t offset = *cursor & buff->mask;
+  if (slab_record_size(len) > buff->size - offset) {
+    ((SlabHdr_t *)(buff->slab + offset))->len = SLAB_WRAP;
+    *cursor += buff->size - offset;
+    offset = 0;
+  }
+  return buff->slab + offset + sizeof(SlabHdr_t);
+}
+
+/* Producer: finish the record started by reserve(). len may be smaller than
+ * the reserved length. */
+static inline void commit(Ringbuffer *buff, size_t *cursor, size_t len,
+                          long long ts) {
+  if (buff->kind == RING_FIXED) {
+    Packet_t *packet = slot_at(buff, *cursor);
+    packet->len = len;
+    packet->flags = 0;
+    packet->ts = ts;
+    *cursor += 1;
+    return;
+  }
+  SlabHdr_t *hdr = (SlabHdr_t *)(buff->slab + (*cursor & buff->mask));
+  hdr->len = len;
+  hdr->flags = 0;
+  hdr->ts = ts;
+  *cursor += slab_record_size(len);
+}
+
+/* Producer: make the n records committed up to cursor visible. */
+static inline void publish(Ringbuffer *buff, size_t cursor, size_t n) {
+  if (n == 0)
+    return;
+  if (buff->kind == RING_SLAB)
+    atomic_fetch_add_explicit(&buff->ctl->n_published, n,
+                              memory_order_release);
+  atomic_store_explicit(&buff->ctl->head, cursor, memory_order_release);
+  if (waiter_notify(&buff->ctl->not_empty, buff->futex_flags) &&
+      buff->event_fd >= 0)
+    eventfd_write(buff->event_fd, 1);
+}
+
+/* Reference the packet at cursor and step over it, as long as cursor is
+ * short of head. */
+static inline bool peek_until(Ringbuffer *buff, size_t *cursor,
+                              PacketRef_t *ref, size_t head) {
+  if (*cursor == head)
+    return false;
+
+  if (buff->kind == RING_FIXED) {
+    Packet_t *packet = slot_at(buff, *cursor);
+    ref->ts = packet->ts;
+    ref->len = packet->len;
+    ref->data = packet->data;
+    *cursor += 1;
+    return true;
   }
 
-  buff->data[head] = packet;
-  atomic_store_explicit(&buff->head, next, memory_order_release);
-  pthread_cond_signal(&buff->cond_not_empty);
+  SlabHdr_t *hdr = (SlabHdr_t *)(buff->slab + (*cursor & buff->mask));
+  if (hdr->len == SLAB_WRAP) {
+    *cursor += buff->size - (*cursor & buff->mask);
+    if (*cursor == head)
+      return false;
+    hdr = (SlabHdr_t *)buff->slab;
+  }
+  ref->ts = hdr->ts;
+  ref->len = hdr->len;
+  ref->data = (char *)(hdr + 1);
+  *cursor += slab_record_size(hdr->len);
+  return true;
+}
+
+/* Consumer: reference the packet at cursor and step over it. Returns false
+ * once the cursor catches up with the producer. */
+static inline bool peek(Ringbuffer *buff, size_t *cursor, PacketRef_t *ref) {
+  RingCtl_t *ctl = buff->ctl;
+  // Not just ==: drop_oldest() can move the cursor past a stale cache.
+  if ((ptrdiff_t)(ctl->cached_head - *cursor) <= 0)
+    ctl->cached_head = atomic_load_explicit(&ctl->head, memory_order_acquire);
+  return peek_until(buff, cursor, ref, ctl->cached_head);
+}
+
+/* Consumer: hand the n packets peeked up to cursor back to the producer. */
+static inline void release(Ringbuffer *buff, size_t cursor, size_t n) {
+  if (n == 0)
+    return;
+  if (buff->kind == RING_SLAB)
+    atomic_fetch_add_explicit(&buff->ctl->n_released, n, memory_order_release);
+  atomic_store_explicit(&buff->ctl->tail, cursor, memory_order_release);
+  waiter_notify(&buff->ctl->not_full, buff->futex_flags);
+}
+
+/* Producer: block until a record of len bytes fits, or until deadline_ns on
+ * CLOCK_MONOTONIC (LLONG_MAX waits forever). Returns false on timeout. */
+static inline bool wait_not_full_until(Ringbuffer *buff, size_t len,
+                                       long long deadline_ns) {
+  Waiter_t *w = &buff->ctl->not_full;
+  while (!has_room(buff, write_cursor(buff), len)) {
+    unsigned key = waiter_prepare(w);
+    if (has_room(buff, write_cursor(buff), len))
+      return true;
+    if (!waiter_sleep(w, key, deadline_ns, buff->futex_flags))
+      return has_room(buff, write_cursor(buff), len);
+  }
   return true;
 }
 
-static inline Packet_t dequeue(Ringbuffer *buff, long long timeout_ns) {
-  Packet_t packet;
+/* Producer: block until a record of len bytes fits. */
+static inline void wait_not_full(Ringbuffer *buff, size_t len) {
+  wait_not_full_until(buff, len, LLONG_MAX);
+}
 
+/* Block until at least one packet is queued. Returns false on timeout. */
+static inline bool wait_not_empty(Ringbuffer *buff, long long timeout_ns) {
   assert(timeout_ns >= 0);
-  struct timespec ts_timout = future_ts(timeout_ns, CLOCK_REALTIME);
+  Waiter_t *w = &buff->ctl->not_empty;
+  long long deadline_ns = 0;
+  while (queue_is_empty(buff)) {
+    if (deadline_ns == 0)
+      deadline_ns = now_ns(CLOCK_MONOTONIC) + timeout_ns;
+    unsigned key = waiter_prepare(w);
+    if (!queue_is_empty(buff))
+      return true;
+    if (!waiter_sleep(w, key, deadline_ns, buff->futex_flags))
+      return !queue_is_empty(buff);
+  }
+  return true;
+}
 
-  size_t head = atomic_load_explicit(&buff->head, memory_order_acquire);
-  size_t tail = atomic_load_explicit(&buff->tail, memory_order_relaxed);
-  int ret;
+/* Consumer: block until something is published beyond cursor, or until
+ * deadline_ns on CLOCK_MONOTONIC. Returns false on timeout. May also return
+ * true on a spurious wake-up or after buff_interrupt(), so callers re-check. */
+static inline bool wait_published(Ringbuffer *buff, size_t cursor,
+                                  long long deadline_ns) {
+  RingCtl_t *ctl = buff->ctl;
+  if (atomic_load_explicit(&ctl->head, memory_order_acquire) != cursor ||
+      ctl->interrupted)
+    return true;
 
-  if (head == tail) {
-    // Queue is empty: wait
-    pthread_mutex_lock(&buff->cond_mutex);
-    while (queue_is_empty(buff)) {
-      ret = pthread_cond_timedwait(&buff->cond_not_empty, &buff->cond_mutex,
-                                   &ts_timout);
-
-      if (ret == ETIMEDOUT) {
-        packet.ts = -2;
-        pthread_mutex_unlock(&buff->cond_mutex);
-        return packet;
-      }
-    }
-    pthread_mutex_unlock(&buff->cond_mutex);
+  unsigned key = waiter_prepare(&ctl->not_empty);
+  if (atomic_load_explicit(&ctl->head, memory_order_acquire) != cursor ||
+      ctl->interrupted)
+    return true;
+  return waiter_sleep(&ctl->not_empty, key, deadline_ns, buff->futex_flags) ||
+         atomic_load_explicit(&ctl->head, memory_order_acquire) != cursor;
+}
+
+/* Consumer: clear the ring's eventfd, having seen everything up to cursor,
+ * and park on not_empty so the next publish() signals it again. */
+static inline void buff_event_arm(Ringbuffer *buff, size_t cursor) {
+  eventfd_t value;
+  eventfd_read(buff->event_fd, &value); // non-blocking, resets the count
+  waiter_prepare(&buff->ctl->not_empty);
+  if (atomic_load_explicit(&buff->ctl->head, memory_order_acquire) != cursor)
+    eventfd_write(buff->event_fd, 1);
+}
+
+/* Make wait_published() return at once until interrupted is cleared, and
+ * wake a consumer parked on the eventfd. */
+static inline void buff_interrupt(Ringbuffer *buff) {
+  atomic_store(&buff->ctl->interrupted, true);
+  if (waiter_notify(&buff->ctl->not_empty, buff->futex_flags) &&
+      buff->event_fd >= 0)
+    eventfd_write(buff->event_fd, 1);
+}
+
+/* FUTEX_WAKE syscalls made on behalf of this ring. */
+static inline size_t buff_wakes(Ringbuffer *buff) {
+  if (buff->ctl == NULL)
+    return 0;
+  return atomic_load_explicit(&buff->ctl->not_empty.n_wakes,
+                              memory_order_relaxed) +
+         atomic_load_explicit(&buff->ctl->not_full.n_wakes,
+                              memory_order_relaxed);
+}
+
+/* Consumer: flags word of a peeked record. A consumer that finishes records
+ * out of order sets RECORD_DONE and releases with release_done(). */
+static inline uint32_t *record_flags(Ringbuffer *buff, const PacketRef_t *ref) {
+  if (buff->kind == RING_FIXED)
+    return &((Packet_t *)(ref->data - offsetof(Packet_t, data)))->flags;
+  return &((SlabHdr_t *)(ref->data - sizeof(SlabHdr_t)))->flags;
+}
+
+/* Consumer: release the run of RECORD_DONE records at the read cursor.
+ * Returns how many were released. */
+static inline size_t release_done(Ringbuffer *buff) {
+  size_t cursor = read_cursor(buff);
+  size_t next = cursor;
+  size_t n = 0;
+  PacketRef_t ref;
+  while (peek(buff, &next, &ref) && (*record_flags(buff, &ref) & RECORD_DONE)) {
+    cursor = next;
+    n++;
+  }
+  release(buff, cursor, n);
+  return n;
+}
+
+/* Copy one packet in. Returns false if the ring is full. */
+static inline bool enqueue(Ringbuffer *buff, const char *data, size_t len,
+                           long long ts) {
+  size_t cursor = write_cursor(buff);
+  char *dst = reserve(buff, &cursor, len);
+  if (dst == NULL)
+    return false;
+  memcpy(dst, data, len);
+  commit(buff, &cursor, len, ts);
+  publish(buff, cursor, 1);
+  return true;
+}
+
+/* Lock a ring mutex. A process that died holding one of a shared ring's
+ * locks leaves at most records peeked but not released, which the next
+ * holder simply sees again. */
+static inline void ring_mutex_lock(pthread_mutex_t *mutex) {
+  if (pthread_mutex_lock(mutex) == EOWNERDEAD)
+    pthread_mutex_consistent(mutex);
+}
+
+static inline void consumer_lock(Ringbuffer *buff) {
+  if (buff->lock_consumer)
+    ring_mutex_lock(&buff->ctl->consumer_lock);
+}
+
+static inline void consumer_unlock(Ringbuffer *buff) {
+  if (buff->lock_consumer)
+    pthread_mutex_unlock(&buff->ctl->consumer_lock);
+}
+
+/* Several threads, or with a shared ring several processes, may produce into
+ * a ring, one at a time. Callers holding the GIL must drop it before taking
+ * the lock, or use producer_lock_gil(). */
+static inline void producer_lock(Ringbuffer *buff) {
+  ring_mutex_lock(&buff->ctl->producer_lock);
+}
+
+static inline void producer_unlock(Ringbuffer *buff) {
+  pthread_mutex_unlock(&buff->ctl->producer_lock);
+}
+
+/* producer_lock() with the GIL held: a free lock is taken at once, a busy
+ * one is waited for without the GIL, since its holder may need it back. */
+static inline void producer_lock_gil(Ringbuffer *buff) {
+  int ret = pthread_mutex_trylock(&buff->ctl->producer_lock);
+  if (ret == EOWNERDEAD) {
+    pthread_mutex_consistent(&buff->ctl->producer_lock);
+  } else if (ret != 0) {
+    Py_BEGIN_ALLOW_THREADS producer_lock(buff);
+    Py_END_ALLOW_THREADS
+  }
+}
+
+/* Producer: throw away the oldest packet at the read end, if any, with the
+ * consumer lock held. Leaves the consumer's cached head alone. *ref is set
+ * to the record dropped (valid until the producer overwrites it). */
+static inline bool drop_oldest_locked(Ringbuffer *buff, PacketRef_t *ref) {
+  size_t cursor = read_cursor(buff);
+  size_t head = atomic_load_explicit(&buff->ctl->head, memory_order_acquire);
+  if (!peek_until(buff, &cursor, ref, head))
+    return false;
+  release(buff, cursor, 1);
+  return true;
+}
+
+/* Producer: throw away the oldest packet, if any. Only on lock_consumer
+ * rings. */
+static inline bool drop_oldest(Ringbuffer *buff) {
+  PacketRef_t ref;
+  ring_mutex_lock(&buff->ctl->consumer_lock);
+  bool dropped = drop_oldest_locked(buff, &ref);
+  pthread_mutex_unlock(&buff->ctl->consumer_lock);
+  return dropped;
+}
+
+/* Shared-memory segment holding a socket's rings, so that other processes
+ * can attach to them (_RtUdpShmRing). Offsets are from the start of the
+ * segment:
+ *
+ *   ShmHeader_t            at 0
+ *   RingCtl_t of ring i    at ring[i].ctl_offset, cache-line aligned
+ *   records of ring i      at ring[i].data_offset, page aligned
+ *
+ * Ring SHM_RX is the receive ring, SHM_TX the send ring, both in the record
+ * formats above. magic is written last, so a half-built segment does not
+ * validate. RingCtl_t holds pthread mutexes, so only builds of this module
+ * with the same ctl_size can attach. */
+#define SHM_MAGIC "RTUDPSHM"
+#define SHM_VERSION 1
+#define SHM_PAGE 4096
+
+enum { SHM_RX, SHM_TX, SHM_RINGS };
+
+typedef struct {
+  uint32_t kind;     // RING_KIND_t
+  uint32_t capacity; // slots (RING_FIXED)
+  uint64_t size;     // bytes (RING_SLAB)
+  uint64_t max_len;  // largest payload a record can hold
+  uint64_t stride;   // bytes per slot (RING_FIXED)
+  uint64_t ctl_offset;
+  uint64_t data_offset;
+  uint64_t data_bytes;
+} ShmRing_t;
+
+typedef struct {
+  char magic[8];
+  uint32_t version;
+  uint32_t header_size; // sizeof(ShmHeader_t)
+  uint32_t ctl_size;    // sizeof(RingCtl_t)
+  uint32_t n_rings;
+  uint64_t total_bytes;
+  ShmRing_t ring[SHM_RINGS];
+} ShmHeader_t;
+
+static inline size_t align_up(size_t v, size_t align) {
+  return (v + align - 1) & ~(align - 1);
+}
+
+/* shm_open() wants a leading slash; accept names with or without. */
+static char *shm_path(const char *name) {
+  char *path = malloc(strlen(name) + 2);
+  if (path)
+    sprintf(path, "%s%s", name[0] == '/' ? "" : "/", name);
+  return path;
+}
+
+/* Create the segment at path with rings of the given shape and point rings[]
+ * into it. Returns the mapping and stores its size in *bytes, or returns
+ * NULL with errno set. The segment must not exist yet. */
+static void *shm_create(const char *path, Ringbuffer *rings[SHM_RINGS],
+                        RING_KIND_t kind, size_t capacity, size_t max_len,
+                        size_t *bytes) {
+  ShmHeader_t hdr = {.version = SHM_VERSION,
+                     .header_size = sizeof(ShmHeader_t),
+                     .ctl_size = sizeof(RingCtl_t),
+                     .n_rings = SHM_RINGS};
+  size_t offset = align_up(sizeof(ShmHeader_t), CACHE_LINE);
+  for (int i = 0; i < SHM_RINGS; i++) {
+    ShmRing_t *desc = &hdr.ring[i];
+    desc->data_bytes = buff_shape(rings[i], kind, capacity, max_len);
+    desc->kind = kind;
+    desc->capacity = rings[i]->capacity;
+    desc->size = rings[i]->size;
+    desc->max_len = max_len;
+    desc->stride = rings[i]->stride;
+    desc->ctl_offset = offset;
+    desc->data_offset = align_up(offset + sizeof(RingCtl_t), SHM_PAGE);
+    offset = align_up(desc->data_offset + desc->data_bytes, CACHE_LINE);
+  }
+  hdr.total_bytes = offset;
+
+  int fd = shm_open(path, O_CREAT | O_EXCL | O_RDWR | O_CLOEXEC, 0600);
+  if (fd < 0)
+    return NULL;
+  char *mem = MAP_FAILED;
+  if (ftruncate(fd, hdr.total_bytes) == 0)
+    mem = mmap(NULL, hdr.total_bytes, PROT_READ | PROT_WRITE, MAP_SHARED, fd,
+               0);
+  int saved = errno;
+  close(fd);
+  if (mem == MAP_FAILED) {
+    shm_unlink(path);
+    errno = saved;
+    return NULL;
+  }
+
+  for (int i = 0; i < SHM_RINGS; i++) {
+    RingCtl_t *ctl = (RingCtl_t *)(mem + hdr.ring[i].ctl_offset);
+    ring_ctl_init(ctl, true);
+    buff_attach(rings[i], ctl, mem + hdr.ring[i].data_offset, true);
+  }
+  memcpy(mem, &hdr, sizeof(hdr));
+  atomic_thread_fence(memory_order_release);
+  memcpy(((ShmHeader_t *)mem)->magic, SHM_MAGIC, sizeof(hdr.magic));
+  *bytes = hdr.total_bytes;
+  return mem;
+}
+
+/* Deadline-ordered view of a ring, private to its consumer. Every published
+ * packet is pushed onto a 4-ary min-heap keyed on (ts, arrival order) and
+ * stays where it is in the ring. Packets leave the heap in deadline order,
+ * are flagged RECORD_DONE, and release_done() frees the ring up to the
+ * oldest packet still waiting. In-order arrivals cost one comparison.
+ * Packets a producer drops from under the heap (drop_oldest()) are left in
+ * it and skipped when they come up.
+ *
+ * A packet queued far ahead of the ones behind it would keep them all in
+ * the ring after they are sent. Once that fills the ring, sched_spill()
+ * copies the waiting packets out of the way, up to a ring's worth of
+ * bytes, and the ring is freed past them. */
+#define SCHED_ARITY 4
+
+typedef struct {
+  PacketRef_t ref;
+  uint64_t seq; // arrival order, so equal deadlines stay FIFO
+  size_t pos;   // ring position of the record
+  char *spill;  // private copy of the packet, NULL while it is in the ring
+} SchedEntry_t;
+
+typedef struct {
+  SchedEntry_t *heap;
+  size_t n;
+  size_t cap;        // twice the ring's records: half of it for spills
+  size_t ingest;     // ring cursor after the last packet pushed
+  uint64_t next_seq; // seq of the next packet pushed
+  long long last_ts; // deadline of the last packet pushed
+  atomic_size_t n_held; // sent, but still in the ring behind a later one
+  atomic_size_t n_spilled; // copied out of the ring, not yet sent
+  size_t spill_bytes;      // payload bytes spilled
+  size_t spill_max;        // limit on spill_bytes
+} Scheduler_t;
+
+/* Room for every record the ring can hold at once, and for as many spilled
+ * packets of as many bytes. */
+static int sched_init(Scheduler_t *sched, Ringbuffer *ring) {
+  sched->cap = 2 * (ring->kind == RING_FIXED ? ring->capacity
+                                              : ring->size / SLAB_ALIGN);
+  sched->heap = malloc(sched->cap * sizeof(SchedEntry_t));
+  sched->n = 0;
+  sched->n_held = 0;
+  sched->n_spilled = 0;
+  sched->spill_bytes = 0;
+  sched->spill_max = ring->kind == RING_FIXED ? ring->capacity * ring->max_len
+                                               : ring->size;
+  return sched->heap ? 0 : -1;
+}
+
+/* Forget every packet, spilled ones included. */
+static void sched_purge(Scheduler_t *sched) {
+  for (size_t i = 0; i < sched->n; i++)
+    free(sched->heap[i].spill);
+  sched->n = 0;
+  sched->n_spilled = 0;
+  sched->spill_bytes = 0;
+}
+
+static void sched_free(Scheduler_t *sched) {
+  if (sched->heap)
+    sched_purge(sched);
+  free(sched->heap);
+  sched->heap = NULL;
+}
+
+static inline bool sched_before(const SchedEntry_t *a, const SchedEntry_t *b) {
+  return a->ref.ts < b->ref.ts || (a->ref.ts == b->ref.ts && a->seq < b->seq);
+}
+
+static inline void sched_push(Scheduler_t *sched, const SchedEntry_t *entry) {
+  size_t i = sched->n++;
+  while (i > 0) {
+    size_t parent = (i - 1) / SCHED_ARITY;
+    if (!sched_before(entry, &sched->heap[parent]))
+      break;
+    sched->heap[i] = sched->heap[parent];
+    i = parent;
+  }
+  sched->heap[i] = *entry;
+}
+
+/* Start over from the ring's read cursor. Spilled packets are no longer in
+ * the ring, so they stay. */
+static void sched_reset(Scheduler_t *sched, Ringbuffer *ring) {
+  size_t n = sched->n;
+  sched->n = 0;
+  for (size_t i = 0; i < n; i++) {
+    SchedEntry_t entry = sched->heap[i];
+    if (entry.spill)
+      sched_push(sched, &entry);
+  }
+  sched->ingest = read_cursor(ring);
+  sched->next_seq = 0;
+  sched->last_ts = LLONG_MIN;
+}
+
+/* Packets queued in ring or spilled, and not yet sent. */
+static inline size_t sched_pending(Scheduler_t *sched, Ringbuffer *ring) {
+  size_t held = atomic_load_explicit(&sched->n_held, memory_order_relaxed);
+  size_t queued = length(ring);
+  return (queued > held ? queued - held : 0) +
+         atomic_load_explicit(&sched->n_spilled, memory_order_relaxed);
+}
+
+/* Take the earliest packet off the heap. Returns its private copy if it was
+ * spilled, for sched_finish(). */
+static inline char *sched_pop(Scheduler_t *sched, PacketRef_t *ref) {
+  char *spill = sched->heap[0].spill;
+  *ref = sched->heap[0].ref;
+  if (--sched->n == 0)
+    return spill;
+  SchedEntry_t last = sched->heap[sched->n];
+  size_t i = 0;
+  for (;;) {
+    size_t child = i * SCHED_ARITY + 1;
+    if (child >= sched->n)
+      break;
+    size_t end = MIN(child + SCHED_ARITY, sched->n);
+    size_t best = child;
+    for (size_t c = child + 1; c < end; c++)
+      if (sched_before(&sched->heap[c], &sched->heap[best]))
+        best = c;
+    if (!sched_before(&sched->heap[best], &last))
+      break;
+    sched->heap[i] = sched->heap[best];
+    i = best;
+  }
+  sched->heap[i] = last;
+  return spill;
+}
+
+/* Done with a packet sched_pop() returned: flag its record RECORD_DONE, or
+ * free its spilled copy. Returns whether the record is still in the ring. */
+static inline bool sched_finish(Scheduler_t *sched, Ringbuffer *ring,
+                                const PacketRef_t *ref, char *spill) {
+  if (!spill) {
+    *record_flags(ring, ref) |= RECORD_DONE;
+    return true;
+  }
+  free(spill);
+  sched->spill_bytes -= ref->len;
+  atomic_fetch_sub_explicit(&sched->n_spilled, 1, memory_order_relaxed);
+  return false;
+}
+
+/* Whether the packet on top of the heap was dropped by the producer. */
+static inline bool sched_stale(Scheduler_t *sched, Ringbuffer *ring) {
+  return !sched->heap[0].spill &&
+         (ptrdiff_t)(sched->heap[0].pos - read_cursor(ring)) < 0;
+}
+
+/* Throw out every dropped packet and rebuild the heap. Only needed once
+ * dropped packets fill it up. */
+static void sched_compact(Scheduler_t *sched, Ringbuffer *ring) {
+  size_t tail = read_cursor(ring);
+  size_t n = sched->n;
+  sched->n = 0;
+  for (size_t i = 0; i < n; i++) {
+    SchedEntry_t entry = sched->heap[i];
+    if (entry.spill || (ptrdiff_t)(entry.pos - tail) >= 0)
+      sched_push(sched, &entry);
   }
+}
 
-  packet = buff->data[tail];
-  size_t next = (tail + 1) % buff->capacity;
-  atomic_store_explicit(&buff->tail, next, memory_order_release);
+/* With the ring full and sent packets held in it, copy the unsent ones
+ * ahead of the last held packet out of the ring, within spill_max, and flag
+ * their records RECORD_DONE. Returns how many were spilled. A ring full of
+ * unsent packets is left alone: that is backpressure. */
+static size_t sched_spill(Scheduler_t *sched, Ringbuffer *ring) {
+  size_t held = atomic_load_explicit(&sched->n_held, memory_order_relaxed);
+  size_t budget = sched->spill_max - sched->spill_bytes;
+  size_t slots = sched->cap / 2 -
+                 atomic_load_explicit(&sched->n_spilled, memory_order_relaxed);
+  size_t tail = read_cursor(ring);
+  size_t cursor = tail, end = tail;
+  size_t n = 0;
+  PacketRef_t ref;
+
+  if (held == 0 || !queue_is_full(ring))
+    return 0;
+  // How far the ring can be freed.
+  while (held > 0 && peek_until(ring, &cursor, &ref, sched->ingest)) {
+    if (*record_flags(ring, &ref) & RECORD_DONE) {
+      held--;
+      end = cursor;
+    } else if (ref.len > budget || slots == 0) {
+      break;
+    } else {
+      budget -= ref.len;
+      slots--;
+    }
+  }
+  for (size_t i = 0; i < sched->n; i++) {
+    SchedEntry_t *entry = &sched->heap[i];
+    if (entry->spill || (ptrdiff_t)(entry->pos - tail) < 0 ||
+        (ptrdiff_t)(entry->pos - end) >= 0)
+      continue;
+    char *copy = malloc(MAX(entry->ref.len, 1));
+    if (!copy)
+      break;
+    memcpy(copy, entry->ref.data, entry->ref.len);
+    *record_flags(ring, &entry->ref) |= RECORD_DONE;
+    entry->ref.data = copy;
+    entry->spill = copy;
+    sched->spill_bytes += entry->ref.len;
+    n++;
+  }
+  atomic_fetch_add_explicit(&sched->n_spilled, n, memory_order_relaxed);
+  return n;
+}
 
-  pthread_cond_signal(&buff->cond_not_full);
-  return packet;
+/* Push everything published since the last call. Returns how many packets
+ * arrived with an earlier deadline than the one queued before them. */
+static size_t sched_ingest(Scheduler_t *sched, Ringbuffer *ring) {
+  SchedEntry_t entry;
+  size_t out_of_order = 0;
+  size_t tail = read_cursor(ring);
+  if ((ptrdiff_t)(sched->ingest - tail) < 0)
+    sched->ingest = tail; // dropped before they were seen
+  for (entry.pos = sched->ingest; peek(ring, &sched->ingest, &entry.ref);
+       entry.pos = sched->ingest) {
+    if (*record_flags(ring, &entry.ref) & RECORD_DONE)
+      continue; // sent before the worker was restarted
+    if (entry.ref.ts < sched->last_ts)
+      out_of_order++;
+    sched->last_ts = entry.ref.ts;
+    entry.seq = sched->next_seq++;
+    entry.spill = NULL;
+    if (sched->n == sched->cap)
+      sched_compact(sched, ring);
+    sched_push(sched, &entry);
+  }
+  return out_of_order;
 }
 
+/* In-worker packet capture. The workers copy every packet they send or
+ * receive, with its timestamps, into a capture ring per direction, and a
+ * writer thread of normal priority turns the records into pcapng blocks off
+ * the hot path. A full capture ring loses the copy, never the packet. */
+#define CAPTURE_RING_BYTES (1 << 22) // per direction
+#define CAPTURE_RELEASE_BATCH 64     // records written per release()
+#define CAPTURE_FLUSH_MS 100         // longest a record waits when idle
+
+typedef enum { CAP_RX, CAP_TX, CAP_RINGS } CAPTURE_DIR_t;
+
+/* Slab record payload of a capture ring, followed by the packet. The
+ * record's ts is when the packet went out or came in. */
+typedef struct {
+  long long sched_ns; // the packet's ts in send_buff or rec_buff
+  uint32_t dir;       // CAPTURE_DIR_t
+  uint32_t reserved;
+} CaptureHdr_t;
+
+typedef struct {
+  FILE *file;
+  pthread_t writer; // 0 while not running
+  atomic_bool running;
+  int event_fd; // signalled by publish() on either ring
+  Ringbuffer rings[CAP_RINGS];
+} Capture_t;
+
 typedef enum {
   UDPCOM_EC_OK = 0,
   UDPCOM_EC_SOCK_RECV = 0,
@@ -199,12 +1380,54 @@ typedef struct {
   UDPCOM_EC error;
   pthread_t send_worker;
   pthread_t receive_worker;
-  int cpu;
+  int cpu;    // send worker cpu (or the only worker's), -1 = no affinity
+  int rx_cpu; // receive worker cpu, -1 = same as cpu
+  int rx_batch; // recvmmsg vector length, 0 = one recvfrom per datagram
+  int max_payload; // largest datagram (or GSO/GRO super-datagram) in bytes
+  int gso_size;    // UDP_SEGMENT size for sends, 0 = off
+  int gro;         // UDP_GRO on receive
+  char *gro_buf;   // GRO_BATCH reads of GRO_BUF_BYTES, split into rec_buff
+  int timestamping;        // SO_TIMESTAMPING (software) RX/TX timestamps
+  int txtime;              // SO_TXTIME requested
+  int txtime_active;       // SO_TXTIME accepted by the socket
+  long long txtime_lead;   // how early packets are handed to the kernel, ns
+  long long spin_margin;   // precision mode: spin this long before deadlines
+  long long rx_spin;       // busy-poll receive: spin this long after data, ns
+  long long busy_poll;     // SO_BUSY_POLL budget, ns, 0 = off
+  BACKPRESSURE_t backpressure; // policy when send_buff is full
+  int shards;                  // size of our reuseport receive group, 0 = none
+  STEER_t steer;               // how the group spreads datagrams
+  long long send_timeout;      // BP_BLOCK wait limit in ns, -1 = forever
+  long long overshoot_avg; // smoothed clock_nanosleep overshoot, ns
+  long long overshoot_dev; // its mean deviation, ns
+  int rx_cmsg;             // receive control messages (gro || timestamping)
+  long long ts_offset_ns;  // CLOCK_MONOTONIC - CLOCK_REALTIME
+  long long ts_offset_at;  // when ts_offset_ns was measured (monotonic)
+  uint32_t tx_id;          // OPT_ID the kernel gives the next datagram
+  atomic_llong *tx_sched;  // scheduled send time by OPT_ID % TX_TS_WINDOW
+  Ringbuffer tx_ts_buff;   // TxStamp_t records, ts = kernel send time
+  Scheduler_t sched;       // send_buff in deadline order (send worker)
   clockid_t clkid;
   Ringbuffer rec_buff;
   Ringbuffer send_buff;
+  PyObject *engine;                   // shared _RtUdpEngine, or NULL
+  struct EngineWorker *engine_worker; // the engine thread serving us
+  unsigned engine_slot;               // our slot in engine_worker
+  char *shm_path; // shared-memory segment holding the rings, or NULL
+  void *shm;      // its mapping
+  size_t shm_bytes;
+  Capture_t *capture; // pcapng capture of the worker traffic, or NULL
+  BACKEND_t backend;  // requested I/O backend
+  int uring_tx;       // the send worker last ran on io_uring
+  int uring_rx;       // the receive worker last ran on io_uring
 } RtUdp;
 
+static PyTypeObject EngineType;
+
+static inline StatBlock_t *stats_of(RtUdp *obj, STATS_OWNER_t owner) {
+  return &obj->stats.block[owner];
+}
+
 static inline long long nic_timestamp(RtUdp *com) {
   struct timespec ts;
   clock_gettime(com->clkid, &ts);
@@ -218,30 +1441,526 @@ static inline long long nic_2_monotonic_ts(RtUdp *com, long long nic_time) {
   return nic_time + offset;
 }
 
-static int RtUdp_init(PyObject *self, PyObject *args, PyObject *kwds) {
-  const char *local_ip = NULL;
-  int local_port = 0;
-  const char *remote_ip = NULL;
-  int remote_port = 0;
-  int cpu_set = -1;
-  int do_bind = 1;                 // default
-  int do_connect = 0;              // default
-  int capacity = 1024;             // default
-  long long timeout = 10000000000; // 10s
-  // const char* clock_path = "/dev/ptp0"; // TODO: Maybe this could be moved
+/* Worker: copy a packet sent or received at wire_ns into the capture ring
+ * for dir. Returns false if the ring had no room. */
+static bool capture_packet(RtUdp *obj, CAPTURE_DIR_t dir, const char *data,
+                           size_t len, long long sched_ns, long long wire_ns) {
+  Ringbuffer *ring = &obj->capture->rings[dir];
+  size_t cursor = write_cursor(ring);
+  CaptureHdr_t *hdr =
+      (CaptureHdr_t *)reserve(ring, &cursor, sizeof(CaptureHdr_t) + len);
+  if (hdr == NULL)
+    return false;
+  hdr->sched_ns = sched_ns;
+  hdr->dir = dir;
+  hdr->reserved = 0;
+  memcpy(hdr + 1, data, len);
+  commit(ring, &cursor, sizeof(CaptureHdr_t) + len, wire_ns);
+  publish(ring, cursor, 1);
+  return true;
+}
+
+/* pcapng output of the capture writer: one section with one LINKTYPE_RAW
+ * interface in nanoseconds, and an Enhanced Packet Block per packet with an
+ * IPv4/UDP header made up from the socket's addresses, the direction in
+ * epb_flags and, for sent packets, the scheduled time in a comment. */
+#define PCAPNG_SHB 0x0A0D0D0A
+#define PCAPNG_IDB 1
+#define PCAPNG_EPB 6
+#define PCAPNG_BOM 0x1A2B3C4D
+#define LINKTYPE_RAW 101 // bare IP packets
+#define IPV4_UDP_HDR 28  // IPv4 header without options plus UDP header
+
+/* Append option code with len bytes of value, padded to 32 bits. */
+static char *pcapng_option(char *p, uint16_t code, const void *value,
+                           uint16_t len) {
+  size_t padded = align_up(len, 4);
+  memcpy(p, &code, sizeof(code));
+  memcpy(p + 2, &len, sizeof(len));
+  memcpy(p + 4, value, len);
+  memset(p + 4 + len, 0, padded - len);
+  return p + 4 + padded;
+}
+
+/* Write a block of the given type around body, filling in both lengths. */
+static void pcapng_block(FILE *file, uint32_t type, const char *body,
+                         size_t len) {
+  uint32_t head[2] = {type, 12 + len};
+  fwrite(head, sizeof(head), 1, file);
+  fwrite(body, len, 1, file);
+  fwrite(&head[1], sizeof(head[1]), 1, file);
+}
+
+static void pcapng_write_header(FILE *file, const char *if_name) {
+  char body[512];
+  char *p = body;
+  uint32_t bom = PCAPNG_BOM;
+  uint16_t version[2] = {1, 0};
+  int64_t section_len = -1; // unknown
+  uint8_t tsresol = 9;      // 10^-9 s
+  memcpy(p, &bom, 4);
+  memcpy(p + 4, version, 4);
+  memcpy(p + 8, &section_len, 8);
+  p = pcapng_option(p + 16, 4, "rtudp", 5); // shb_userappl
+  p = pcapng_option(p, 0, NULL, 0);
+  pcapng_block(file, PCAPNG_SHB, body, p - body);
+
+  uint16_t link[2] = {LINKTYPE_RAW, 0};
+  uint32_t snaplen = 0; // no limit
+  p = body;
+  memcpy(p, link, 4);
+  memcpy(p + 4, &snaplen, 4);
+  p = pcapng_option(p + 8, 2, if_name, MIN(strlen(if_name), 256)); // if_name
+  p = pcapng_option(p, 9, &tsresol, 1); // if_tsresol
+  p = pcapng_option(p, 0, NULL, 0);
+  pcapng_block(file, PCAPNG_IDB, body, p - body);
+}
+
+/* IPv4 and UDP header for a len-byte datagram from src to dst. */
+static void ipv4_udp_header(uint8_t *out, const struct sockaddr_in *src,
+                            const struct sockaddr_in *dst, size_t len) {
+  uint16_t total = htons(IPV4_UDP_HDR + len);
+  uint16_t udp_len = htons(8 + len);
+  uint32_t sum = 0;
+  memset(out, 0, IPV4_UDP_HDR);
+  out[0] = 0x45; // version 4, 5 words
+  memcpy(out + 2, &total, 2);
+  out[6] = 0x40; // don't fragment
+  out[8] = 64;   // ttl
+  out[9] = IPPROTO_UDP;
+  memcpy(out + 12, &src->sin_addr, 4);
+  memcpy(out + 16, &dst->sin_addr, 4);
+  for (int i = 0; i < 20; i += 2)
+    sum += (out[i] << 8) | out[i + 1];
+  sum = (sum & 0xffff) + (sum >> 16);
+  sum = ~((sum & 0xffff) + (sum >> 16)) & 0xffff;
+  out[10] = sum >> 8;
+  out[11] = sum & 0xff;
+  memcpy(out + 20, &src->sin_port, 2);
+  memcpy(out + 22, &dst->sin_port, 2);
+  memcpy(out + 24, &udp_len, 2); // checksum 0: none
+}
+
+/* Write one capture record as an Enhanced Packet Block. realtime_ns is
+ * CLOCK_REALTIME - CLOCK_MONOTONIC. */
+static void capture_write(RtUdp *obj, const PacketRef_t *rec,
+                          long long realtime_ns) {
+  FILE *file = obj->capture->file;
+  const CaptureHdr_t *hdr = (const CaptureHdr_t *)rec->data;
+  size_t len = rec->len - sizeof(CaptureHdr_t);
+  bool tx = hdr->dir == CAP_TX;
+  uint64_t wire = rec->ts + realtime_ns;
+  uint32_t fixed[5] = {0, wire >> 32, (uint32_t)wire, IPV4_UDP_HDR + len,
+                       IPV4_UDP_HDR + len};
+  uint8_t ip_udp[IPV4_UDP_HDR];
+  uint32_t flags = tx ? 2 : 1; // outbound : inbound
+  char opts[64];
+  char *p = pcapng_option(opts, 2, &flags, sizeof(flags)); // epb_flags
+  if (tx) {
+    char comment[40];
+    int n = snprintf(comment, sizeof(comment), "scheduled_ns=%lld",
+                     hdr->sched_ns + realtime_ns);
+    p = pcapng_option(p, 1, comment, n); // opt_comment
+  }
+  p = pcapng_option(p, 0, NULL, 0);
+
+  size_t pad = align_up(IPV4_UDP_HDR + len, 4) - (IPV4_UDP_HDR + len);
+  uint32_t head[2] = {PCAPNG_EPB,
+                      12 + sizeof(fixed) + IPV4_UDP_HDR + len + pad +
+                          (p - opts)};
+  static const char zeros[4];
+  if (tx)
+    ipv4_udp_header(ip_udp, &obj->local_addr, &obj->remote_addr, len);
+  else
+    ipv4_udp_header(ip_udp, &obj->remote_addr, &obj->local_addr, len);
+  fwrite(head, sizeof(head), 1, file);
+  fwrite(fixed, sizeof(fixed), 1, file);
+  fwrite(ip_udp, sizeof(ip_udp), 1, file);
+  fwrite(hdr + 1, len, 1, file);
+  fwrite(zeros, pad, 1, file);
+  fwrite(opts, p - opts, 1, file);
+  fwrite(&head[1], sizeof(head[1]), 1, file);
+}
+
+/* Writer: write out everything queued in both capture rings, merged in
+ * time order. Returns how many records were written. */
+static size_t capture_drain(RtUdp *obj) {
+  Ringbuffer *rings = obj->capture->rings;
+  size_t cursor[CAP_RINGS], next[CAP_RINGS], n[CAP_RINGS];
+  PacketRef_t rec[CAP_RINGS];
+  bool have[CAP_RINGS];
+  size_t total = 0;
+  long long realtime_ns = now_ns(CLOCK_REALTIME) - now_ns(CLOCK_MONOTONIC);
+
+  for (int i = 0; i < CAP_RINGS; i++) {
+    cursor[i] = next[i] = read_cursor(&rings[i]);
+    n[i] = 0;
+    have[i] = peek(&rings[i], &next[i], &rec[i]);
+  }
+  while (have[CAP_RX] || have[CAP_TX]) {
+    int i = !have[CAP_RX] || (have[CAP_TX] && rec[CAP_TX].ts < rec[CAP_RX].ts)
+                ? CAP_TX
+                : CAP_RX;
+    capture_write(obj, &rec[i], realtime_ns);
+    cursor[i] = next[i];
+    if (++n[i] == CAPTURE_RELEASE_BATCH) {
+      release(&rings[i], cursor[i], n[i]);
+      total += n[i];
+      n[i] = 0;
+    }
+    have[i] = peek(&rings[i], &next[i], &rec[i]);
+  }
+  for (int i = 0; i < CAP_RINGS; i++) {
+    release(&rings[i], cursor[i], n[i]);
+    total += n[i];
+  }
+  return total;
+}
+
+/* Writer: sleep until either capture ring has records, stop() or the flush
+ * interval passes. */
+static void capture_wait(Capture_t *cap) {
+  struct pollfd pfd = {.fd = cap->event_fd, .events = POLLIN};
+  eventfd_t value;
+  eventfd_read(cap->event_fd, &value); // non-blocking, resets the count
+  for (int i = 0; i < CAP_RINGS; i++)
+    waiter_prepare(&cap->rings[i].ctl->not_empty);
+  for (int i = 0; i < CAP_RINGS; i++)
+    if (!queue_is_empty(&cap->rings[i]))
+      return;
+  if (atomic_load(&cap->running))
+    poll(&pfd, 1, CAPTURE_FLUSH_MS);
+}
+
+static void *capture_writer(void *arg) {
+  RtUdp *obj = (RtUdp *)arg;
+  Capture_t *cap = obj->capture;
+  while (atomic_load(&cap->running)) {
+    if (capture_drain(obj))
+      continue;
+    fflush(cap->file);
+    capture_wait(cap);
+  }
+  capture_drain(obj); // what the workers left before they stopped
+  fflush(cap->file);
+  return NULL;
+}
+
+/* Create the capture file at path and its rings. Returns -1 with errno
+ * set on failure. */
+static int capture_open(RtUdp *obj, const char *path) {
+  Capture_t *cap = calloc(1, sizeof(Capture_t));
+  if (!cap)
+    return -1;
+  obj->capture = cap;
+  cap->event_fd = -1;
+  size_t max_len = sizeof(CaptureHdr_t) + obj->max_payload;
+  for (int i = 0; i < CAP_RINGS; i++)
+    if (buff_init(&cap->rings[i], RING_SLAB, CAPTURE_RING_BYTES, max_len) < 0)
+      return -1;
+  cap->event_fd = eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC);
+  if (cap->event_fd < 0)
+    return -1;
+  for (int i = 0; i < CAP_RINGS; i++)
+    cap->rings[i].event_fd = cap->event_fd;
+  cap->file = fopen(path, "wb");
+  if (!cap->file)
+    return -1;
+  setvbuf(cap->file, NULL, _IOFBF, 1 << 20);
+  pcapng_write_header(cap->file, obj->NAME);
+  return 0;
+}
+
+static int capture_start(RtUdp *obj) {
+  Capture_t *cap = obj->capture;
+  if (!cap || cap->writer)
+    return 0;
+  atomic_store(&cap->running, true);
+  int ret = pthread_create(&cap->writer, NULL, capture_writer, obj);
+  if (ret != 0) {
+    cap->writer = 0;
+    errno = ret;
+    return -1;
+  }
+  return 0;
+}
+
+/* Stop the writer once the workers are gone, so the file ends with their
+ * last packet. */
+static void capture_stop(RtUdp *obj) {
+  Capture_t *cap = obj->capture;
+  if (!cap || !cap->writer)
+    return;
+  atomic_store(&cap->running, false);
+  eventfd_write(cap->event_fd, 1);
+  pthread_join(cap->writer, NULL);
+  cap->writer = 0;
+}
+
+static void capture_free(RtUdp *obj) {
+  Capture_t *cap = obj->capture;
+  if (!cap)
+    return;
+  capture_stop(obj);
+  if (cap->file)
+    fclose(cap->file);
+  for (int i = 0; i < CAP_RINGS; i++) {
+    cap->rings[i].event_fd = -1; // shared, closed below
+    buff_free(&cap->rings[i]);
+  }
+  if (cap->event_fd >= 0)
+    close(cap->event_fd);
+  free(cap);
+  obj->capture = NULL;
+}
+
+/* io_uring backend (backend="io_uring"). The workers talk to the kernel
+ * through a ring of their own, set up with the raw syscalls:
+ *
+ * - The send worker copies each packet due within URING_TX_HORIZON out of
+ *   send_buff into a slot of its own and submits a sendmsg, behind a linked
+ *   absolute timeout when it is not due yet, so the kernel times the send
+ *   and many packets take one io_uring_enter().
+ * - The receive worker offers the free rec_buff slots to the kernel as a
+ *   provided buffer ring, in ring order, and keeps one multishot recv
+ *   armed. Datagrams land in the slots they will be read from, so each
+ *   completion is just a commit().
+ *
+ * A worker whose ring cannot be set up, or whose socket uses a feature the
+ * loop does not handle, runs the poll loop instead. */
+#define URING_ENTRIES 256          // submission queue size
+#define URING_TX_SLOTS 64          // sends in flight
+#define URING_TX_HORIZON 1000000LL // ns, how early sends are submitted
+#define URING_WAIT_NS 10000000LL   // longest wait before checking running
+#define URING_RX_BUFS_MAX 32768    // largest provided buffer ring
+#define URING_BGID 0               // buffer group of rec_buff
+
+/* user_data of a request: what it is and, for sends, the slot. */
+enum { UD_SEND, UD_TIMEOUT, UD_WAKE, UD_RECV, UD_CANCEL };
+#define UD_SHIFT 8
+
+#ifdef HAVE_URING
+typedef struct {
+  int fd;
+  void *rings; // SQ and CQ rings, one mapping
+  size_t rings_bytes;
+  struct io_uring_sqe *sqes;
+  size_t sqes_bytes;
+  _Atomic unsigned *sq_head;
+  _Atomic unsigned *sq_tail;
+  unsigned *sq_array;
+  unsigned sq_mask;
+  unsigned sq_entries;
+  unsigned sq_local; // tail including the SQEs not yet submitted
+  _Atomic unsigned *cq_head;
+  _Atomic unsigned *cq_tail;
+  unsigned cq_mask;
+  struct io_uring_cqe *cqes;
+} Uring_t;
+
+static void uring_free(Uring_t *u) {
+  if (u->sqes && u->sqes != MAP_FAILED)
+    munmap(u->sqes, u->sqes_bytes);
+  if (u->rings && u->rings != MAP_FAILED)
+    munmap(u->rings, u->rings_bytes);
+  if (u->fd >= 0)
+    close(u->fd);
+  u->fd = -1;
+  u->sqes = NULL;
+  u->rings = NULL;
+}
+
+/* Set up a ring for the calling thread, its only submitter. Returns -1
+ * with errno set if the kernel lacks io_uring or a feature we rely on. */
+static int uring_setup(Uring_t *u, unsigned entries) {
+  struct io_uring_params p;
+  memset(u, 0, sizeof(*u));
+  memset(&p, 0, sizeof(p));
+  // No interrupts to run completion work; we are in io_uring_enter()
+  // whenever it matters. (IORING_SETUP_DEFER_TASKRUN would return from
+  // waits with the completion still pending, one more syscall per send.)
+  p.flags = IORING_SETUP_SINGLE_ISSUER | IORING_SETUP_COOP_TASKRUN;
+  u->fd = syscall(SYS_io_uring_setup, entries, &p);
+  if (u->fd < 0 && errno == EINVAL) { // before 6.0
+    memset(&p, 0, sizeof(p));
+    u->fd = syscall(SYS_io_uring_setup, entries, &p);
+  }
+  if (u->fd < 0)
+    return -1;
+  if (!(p.features & IORING_FEAT_SINGLE_MMAP) ||
+      !(p.features & IORING_FEAT_EXT_ARG) ||
+      !(p.features & IORING_FEAT_CQE_SKIP)) {
+    uring_free(u);
+    errno = ENOSYS;
+    return -1;
+  }
+
+  u->rings_bytes =
+      MAX(p.sq_off.array + p.sq_entries * sizeof(unsigned),
+          p.cq_off.cqes + p.cq_entries * sizeof(struct io_uring_cqe));
+  u->rings = mmap(NULL, u->rings_bytes, PROT_READ | PROT_WRITE,
+                  MAP_SHARED | MAP_POPULATE, u->fd, IORING_OFF_SQ_RING);
+  u->sqes_bytes = p.sq_entries * sizeof(struct io_uring_sqe);
+  u->sqes = mmap(NULL, u->sqes_bytes, PROT_READ | PROT_WRITE,
+                 MAP_SHARED | MAP_POPULATE, u->fd, IORING_OFF_SQES);
+  if (u->rings == MAP_FAILED || u->sqes == MAP_FAILED) {
+    int err = errno;
+    uring_free(u);
+    errno = err;
+    return -1;
+  }
+
+  char *r = u->rings;
+  u->sq_head = (_Atomic unsigned *)(r + p.sq_off.head);
+  u->sq_tail = (_Atomic unsigned *)(r + p.sq_off.tail);
+  u->sq_array = (unsigned *)(r + p.sq_off.array);
+  u->sq_mask = *(unsigned *)(r + p.sq_off.ring_mask);
+  u->sq_entries = p.sq_entries;
+  u->sq_local = atomic_load_explicit(u->sq_tail, memory_order_relaxed);
+  u->cq_head = (_Atomic unsigned *)(r + p.cq_off.head);
+  u->cq_tail = (_Atomic unsigned *)(r + p.cq_off.tail);
+  u->cq_mask = *(unsigned *)(r + p.cq_off.ring_mask);
+  u->cqes = (struct io_uring_cqe *)(r + p.cq_off.cqes);
+  return 0;
+}
+
+/* Submit the queued SQEs and wait for min_complete completions, at most
+ * timeout_ns. A timeout or a signal is not a failure. */
+static int uring_enter(Uring_t *u, unsigned min_complete,
+                       long long timeout_ns) {
+  unsigned submit =
+      u->sq_local - atomic_load_explicit(u->sq_tail, memory_order_relaxed);
+  struct __kernel_timespec ts = {.tv_sec = timeout_ns / 1000000000LL,
+                                 .tv_nsec = timeout_ns % 1000000000LL};
+  struct io_uring_getevents_arg arg = {.ts = (uintptr_t)&ts};
+  unsigned flags = IORING_ENTER_EXT_ARG;
+  if (min_complete)
+    flags |= IORING_ENTER_GETEVENTS;
+  atomic_store_explicit(u->sq_tail, u->sq_local, memory_order_release);
+  if (syscall(SYS_io_uring_enter, u->fd, submit, min_complete, flags, &arg,
+              sizeof(arg)) < 0 &&
+      errno != ETIME && errno != EINTR)
+    return -1;
+  return 0;
+}
+
+/* A zeroed SQE to fill in, submitted by the next uring_enter(). */
+static struct io_uring_sqe *uring_sqe(Uring_t *u) {
+  while (u->sq_local -
+             atomic_load_explicit(u->sq_head, memory_order_acquire) >=
+         u->sq_entries)
+    uring_enter(u, 0, 0); // full, hand what we have to the kernel
+  unsigned idx = u->sq_local++ & u->sq_mask;
+  struct io_uring_sqe *sqe = &u->sqes[idx];
+  memset(sqe, 0, sizeof(*sqe));
+  u->sq_array[idx] = idx;
+  return sqe;
+}
+
+/* The oldest completion not yet seen, or NULL. */
+static inline struct io_uring_cqe *uring_cqe(Uring_t *u) {
+  unsigned head = atomic_load_explicit(u->cq_head, memory_order_relaxed);
+  if (head == atomic_load_explicit(u->cq_tail, memory_order_acquire))
+    return NULL;
+  return &u->cqes[head & u->cq_mask];
+}
+
+static inline void uring_cqe_seen(Uring_t *u) {
+  atomic_fetch_add_explicit(u->cq_head, 1, memory_order_release);
+}
+
+/* Whether the kernel has io_uring with the operations both loops use.
+ * Checked once, with the GIL held. */
+static bool uring_supported(void) {
+  static const int ops[] = {IORING_OP_SENDMSG, IORING_OP_TIMEOUT,
+                            IORING_OP_POLL_ADD, IORING_OP_RECV,
+                            IORING_OP_ASYNC_CANCEL};
+  static int supported = -1;
+  if (supported >= 0)
+    return supported;
+
+  Uring_t u;
+  supported = 0;
+  if (uring_setup(&u, 4) < 0)
+    return false;
+  size_t bytes = sizeof(struct io_uring_probe) +
+                 256 * sizeof(struct io_uring_probe_op);
+  struct io_uring_probe *probe = calloc(1, bytes);
+  if (probe &&
+      syscall(SYS_io_uring_register, u.fd, IORING_REGISTER_PROBE, probe,
+              256) == 0) {
+    supported = 1;
+    for (size_t i = 0; i < sizeof(ops) / sizeof(ops[0]); i++)
+      if (ops[i] > probe->last_op ||
+          !(probe->ops[ops[i]].flags & IO_URING_OP_SUPPORTED))
+        supported = 0;
+  }
+  free(probe);
+  uring_free(&u);
+  return supported;
+}
+#else
+static bool uring_supported(void) { return false; }
+#endif
+
+static int RtUdp_init(PyObject *self, PyObject *args, PyObject *kwds) {
+  const char *local_ip = NULL;
+  int local_port = 0;
+  const char *remote_ip = NULL;
+  int remote_port = 0;
+  int cpu_set = -1;
+  int rx_cpu = -1; // follow cpu_set
+  unsigned int histo_start = HISTO_START;
+  unsigned int histo_div = HISTO_DIV;
+  int do_bind = 1;                 // default
+  int do_connect = 0;              // default
+  int capacity = 1024;             // default
+  long long timeout = 10000000000; // 10s
+  // const char* clock_path = "/dev/ptp0"; // TODO: Maybe this could be moved
   // into global scope to save a pointer de-refference??
   const char *name = "RtUdp"; // default
   int direction = 0;          // sender
+  int rx_batch = 0;           // recvfrom per datagram
+  Py_ssize_t ring_bytes = 0;  // fixed Packet_t slots
+  int max_payload = MAX_UDP_PAYLOAD;
+  int gso_size = 0; // no segmentation offload
+  int gro = 0;
+  int timestamping = 0;
+  int txtime = 0;
+  long long txtime_lead = TXTIME_LEAD;
+  long long spin_margin = 0; // plain clock_nanosleep
+  const char *backpressure = "block";
+  long long send_timeout = -1; // wait forever
+  PyObject *engine = Py_None;  // own worker threads
+  int shards = 0;              // not a receive shard
+  const char *steer = "hash";
+  const char *shm_name = NULL; // rings in private memory
+  const char *capture = NULL;  // no pcapng capture
+  const char *backend = "poll";
+  long long rx_spin = 0;   // block in poll() between datagrams
+  long long busy_poll = 0; // no SO_BUSY_POLL
 
   static char *kwlist[] = {"local_ip",    "local_port", "remote_ip",
                            "remote_port", "bind",       "connect",
                            "capacity",    "name",       "direction",
-                           "cpu",         "timeout",    NULL};
+                           "cpu",         "timeout",    "rx_batch",
+                           "ring_bytes",  "max_payload", "gso_size",
+                           "gro",         "rx_cpu",     "histo_start",
+                           "histo_div",   "timestamping", "txtime",
+                           "txtime_lead", "spin_margin", "backpressure",
+                           "send_timeout", "engine",    "shards",
+                           "steer",       "shm_name",  "capture",
+                           "backend",     "rx_spin",   "busy_poll",
+                           NULL};
 
   if (!PyArg_ParseTupleAndKeywords(
-          args, kwds, "sisi|$iiisiiL", kwlist, &local_ip, &local_port,
-          &remote_ip, &remote_port, &do_bind, &do_connect, &capacity, &name,
-          &direction, &cpu_set, &timeout)) {
+          args, kwds, "sisi|$iiisiiLiniipiIIppLLsLOiszzsLL", kwlist, &local_ip,
+          &local_port, &remote_ip, &remote_port, &do_bind, &do_connect,
+          &capacity, &name, &direction, &cpu_set, &timeout, &rx_batch,
+          &ring_bytes, &max_payload, &gso_size, &gro, &rx_cpu, &histo_start,
+          &histo_div, &timestamping, &txtime, &txtime_lead, &spin_margin,
+          &backpressure, &send_timeout, &engine, &shards, &steer,
+          &shm_name, &capture, &backend, &rx_spin, &busy_poll)) {
     return -1; // Signal failure
   }
 
@@ -270,32 +1989,239 @@ static int RtUdp_init(PyObject *self, PyObject *args, PyObject *kwds) {
 
   */
 
-  /* Data Direction (sender/reciever) */
-  if ((direction < 0) || (direction > 1)) {
-    PyErr_SetFromErrno(PyExc_ValueError);
-    perror("Unsupported direction");
-    return 1;
+  /* Data Direction (sender/reciever/full duplex) */
+  if ((direction < DIR_SEND) || (direction > DIR_FULL)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "direction must be 0 (send), 1 (receive) or 2 (full).");
+    return -1;
   }
   obj->DIRECTION = direction;
 
+  if ((rx_batch < 0) || (rx_batch > RX_BATCH_MAX)) {
+    snprintf(buff, sizeof(buff), "rx_batch must be between 0 and %d.",
+             RX_BATCH_MAX);
+    PyErr_SetString(PyExc_ValueError, buff);
+    return -1;
+  }
+  obj->rx_batch = rx_batch;
+
+  /* Latency histogram range */
+  if (histo_start < 1 || histo_div < 8 || histo_div > HISTO_BINS ||
+      (histo_div & (histo_div - 1))) {
+    snprintf(buff, sizeof(buff),
+             "histo_start must be >= 1 and histo_div a power of two between 8 "
+             "and %d.",
+             HISTO_BINS);
+    PyErr_SetString(PyExc_ValueError, buff);
+    return -1;
+  }
+  if (!histo_fits(histo_start, histo_div)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "The latency histogram range exceeds 2**63 ns, use a "
+                    "smaller histo_start or a larger histo_div.");
+    return -1;
+  }
+
+  /* Payload limit and segmentation offload */
+  if ((max_payload < 1) || (max_payload > UDP_PAYLOAD_LIMIT)) {
+    snprintf(buff, sizeof(buff), "max_payload must be between 1 and %d.",
+             UDP_PAYLOAD_LIMIT);
+    PyErr_SetString(PyExc_ValueError, buff);
+    return -1;
+  }
+  if ((gso_size < 0) || (gso_size > max_payload) ||
+      (gso_size && max_payload > gso_size * UDP_MAX_SEGMENTS)) {
+    snprintf(buff, sizeof(buff),
+             "gso_size must be 0 or between %d and max_payload.",
+             (max_payload + UDP_MAX_SEGMENTS - 1) / UDP_MAX_SEGMENTS);
+    PyErr_SetString(PyExc_ValueError, buff);
+    return -1;
+  }
+  obj->max_payload = max_payload;
+  obj->gso_size = gso_size;
+  obj->gro = gro;
+  obj->timestamping = timestamping;
+  obj->rx_cmsg = gro || timestamping;
+  if (txtime_lead < 0) {
+    PyErr_SetString(PyExc_ValueError, "txtime_lead must not be negative.");
+    return -1;
+  }
+  obj->txtime = txtime;
+  obj->txtime_lead = txtime_lead;
+  if (spin_margin && (spin_margin < SPIN_MARGIN_MIN ||
+                      spin_margin > SPIN_MARGIN_MAX)) {
+    snprintf(buff, sizeof(buff),
+             "spin_margin must be 0 or between %d and %d ns.",
+             SPIN_MARGIN_MIN, SPIN_MARGIN_MAX);
+    PyErr_SetString(PyExc_ValueError, buff);
+    return -1;
+  }
+  obj->spin_margin = spin_margin;
+
+  /* Busy-poll receive */
+  if (rx_spin < 0) {
+    PyErr_SetString(PyExc_ValueError, "rx_spin must not be negative.");
+    return -1;
+  }
+  if (busy_poll < 0 || busy_poll > INT_MAX * 1000LL) {
+    snprintf(buff, sizeof(buff), "busy_poll must be between 0 and %lld ns.",
+             INT_MAX * 1000LL);
+    PyErr_SetString(PyExc_ValueError, buff);
+    return -1;
+  }
+  obj->rx_spin = rx_spin;
+  obj->busy_poll = busy_poll;
+
+  /* Send backpressure */
+  int policy = 0;
+  while (backpressure_names[policy] &&
+         strcmp(backpressure_names[policy], backpressure) != 0)
+    policy++;
+  if (!backpressure_names[policy]) {
+    PyErr_SetString(PyExc_ValueError,
+                    "backpressure must be 'block', 'drop_newest', "
+                    "'drop_oldest' or 'raise'.");
+    return -1;
+  }
+  obj->backpressure = policy;
+  obj->send_timeout = send_timeout < 0 ? -1 : send_timeout;
+
+  /* Receive sharding over a reuseport group */
+  int steering = 0;
+  while (steer_names[steering] && strcmp(steer_names[steering], steer) != 0)
+    steering++;
+  if (!steer_names[steering]) {
+    PyErr_SetString(PyExc_ValueError,
+                    "steer must be 'hash', 'cpu', 'random' or 'payload'.");
+    return -1;
+  }
+  if (shards < 0 || (shards > 0 && direction != DIR_RECV)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "shards must be 0, or positive with direction 1 "
+                    "(receive).");
+    return -1;
+  }
+  obj->shards = shards;
+  obj->steer = steering;
+
+  /* I/O backend of the workers */
+  int backend_id = 0;
+  while (backend_names[backend_id] &&
+         strcmp(backend_names[backend_id], backend) != 0)
+    backend_id++;
+  if (!backend_names[backend_id]) {
+    PyErr_SetString(PyExc_ValueError, "backend must be 'poll' or 'io_uring'.");
+    return -1;
+  }
+  if (backend_id == BACKEND_URING && !uring_supported()) {
+    if (PyErr_WarnEx(PyExc_RuntimeWarning, "io_uring unavailable, using poll.",
+                     1) < 0)
+      return -1;
+    backend_id = BACKEND_POLL;
+  }
+  obj->backend = backend_id;
+
+  /* Shared engine instead of per-socket worker threads */
+  if (engine != Py_None && !PyObject_TypeCheck(engine, &EngineType)) {
+    PyErr_SetString(PyExc_TypeError,
+                    "engine must be an _RtUdpEngine or None.");
+    return -1;
+  }
+  Py_XDECREF(obj->engine);
+  obj->engine = engine == Py_None ? NULL : engine;
+  Py_XINCREF(obj->engine);
+  if (obj->engine && shm_name) {
+    // Other processes cannot signal the engine's eventfds.
+    PyErr_SetString(PyExc_ValueError,
+                    "shm_name cannot be combined with an engine.");
+    return -1;
+  }
+  if (obj->engine && rx_spin) {
+    // A spinning engine worker would starve the endpoints it shares.
+    PyErr_SetString(PyExc_ValueError,
+                    "rx_spin cannot be combined with an engine.");
+    return -1;
+  }
+
+  /* Ring layout: fixed slots of `capacity` packets or a slab of `ring_bytes` */
+  RING_KIND_t ring_kind = RING_FIXED;
+  size_t ring_capacity = capacity;
+  if (ring_bytes > 0) {
+    if ((size_t)ring_bytes < 2 * slab_record_size(max_payload)) {
+      snprintf(buff, sizeof(buff), "ring_bytes must be at least %zu.",
+               2 * slab_record_size(max_payload));
+      PyErr_SetString(PyExc_ValueError, buff);
+      return -1;
+    }
+    ring_kind = RING_SLAB;
+    ring_capacity = ring_bytes;
+  } else if (capacity < 2) {
+    PyErr_SetString(PyExc_ValueError, "capacity must be at least 2.");
+    return -1;
+  }
+
   /* Generic input arguements */
   obj->TIMEOUT = timeout;
   obj->BIND = do_bind;
   obj->CONNECT = do_connect;
   obj->NAME = strdup(name);
-  obj->stats.min_latency_ns = 1000000000LL;
-  obj->stats.max_latency_ns = 0;
+  stats_init(&obj->stats);
+  obj->stats.histo_start = histo_start;
+  obj->stats.histo_div = histo_div;
   obj->cpu = cpu_set;
+  obj->rx_cpu = rx_cpu;
   obj->sock_fd = -1; // default to error code for un-initialised
   obj->running = false;
 
-  if (buff_init(&obj->send_buff, capacity) < 0) {
+  if (shm_name) {
+    // Both rings in a shared-memory segment other processes can attach to
+    Ringbuffer *rings[SHM_RINGS] = {&obj->rec_buff, &obj->send_buff};
+    obj->shm_path = shm_path(shm_name);
+    if (obj->shm_path)
+      obj->shm = shm_create(obj->shm_path, rings, ring_kind, ring_capacity,
+                            max_payload, &obj->shm_bytes);
+    if (!obj->shm) {
+      PyErr_SetFromErrnoWithFilename(PyExc_OSError, shm_name);
+      free(obj->shm_path);
+      obj->shm_path = NULL;
+      return -1;
+    }
+  } else {
+    if (buff_init(&obj->send_buff, ring_kind, ring_capacity, max_payload) <
+        0) {
+      PyErr_SetFromErrno(PyExc_OSError);
+      return -1;
+    }
+
+    if (buff_init(&obj->rec_buff, ring_kind, ring_capacity, max_payload) <
+        0) {
+      PyErr_SetFromErrno(PyExc_OSError);
+      return -1;
+    }
+  }
+  // The receive worker drops the oldest packet when rec_buff is full.
+  obj->rec_buff.lock_consumer = true;
+  obj->send_buff.lock_consumer = obj->backpressure == BP_DROP_OLDEST;
+  if (sched_init(&obj->sched, &obj->send_buff) < 0) {
     PyErr_SetFromErrno(PyExc_OSError);
     return -1;
   }
-
-  if (buff_init(&obj->rec_buff, capacity) < 0) {
-    PyErr_SetFromErrno(PyExc_OSError);
+  if (gro && !(obj->gro_buf = malloc((size_t)GRO_BATCH * GRO_BUF_BYTES))) {
+    PyErr_NoMemory();
+    return -1;
+  }
+  if (timestamping) {
+    obj->tx_sched = calloc(TX_TS_WINDOW, sizeof(atomic_llong));
+    if (!obj->tx_sched || buff_init(&obj->tx_ts_buff, RING_FIXED, TX_TS_WINDOW,
+                                    sizeof(TxStamp_t)) < 0) {
+      PyErr_SetFromErrno(PyExc_OSError);
+      return -1;
+    }
+    obj->tx_ts_buff.lock_consumer = true;
+  }
+  if (capture && capture_open(obj, capture) < 0) {
+    PyErr_SetFromErrnoWithFilename(PyExc_OSError, capture);
+    capture_free(obj);
     return -1;
   }
 
@@ -313,87 +2239,1628 @@ static int RtUdp_init(PyObject *self, PyObject *args, PyObject *kwds) {
       .sin_addr.s_addr = inet_addr(remote_ip),
   };
 
-  obj->remote_addr = remote_addr;
+  obj->remote_addr = remote_addr;
+
+  return 0; // Success
+}
+
+/* Remember when each of n datagrams is due, keyed by the id the kernel will
+ * report its TX timestamp under. This has to happen before they are handed
+ * over: in full duplex the receive worker may read the report while
+ * sendmmsg() is still running. */
+static void tx_sched_fill(RtUdp *obj, const PacketRef_t *batch, size_t n) {
+  for (size_t i = 0; i < n; i++)
+    atomic_store_explicit(
+        &obj->tx_sched[(obj->tx_id + i) & (TX_TS_WINDOW - 1)], batch[i].ts,
+        memory_order_release);
+}
+
+/* Hand n packets to the kernel, retrying the remainder after a partial
+ * sendmmsg(). Returns the number of packets that could not be sent and adds
+ * the syscalls made to *n_syscalls. */
+static size_t send_packets(RtUdp *obj, struct mmsghdr *msgs,
+                           const PacketRef_t *batch, size_t n,
+                           size_t *n_syscalls) {
+  size_t done = 0;
+  size_t failed = 0;
+  bool filled = false;
+
+  while (done < n) {
+    if (obj->timestamping && !filled) {
+      tx_sched_fill(obj, &batch[done], n - done);
+      filled = true;
+    }
+    int ret = sendmmsg(obj->sock_fd, &msgs[done], n - done, 0);
+    (*n_syscalls)++;
+    if (ret < 0) {
+      if (errno == EINTR)
+        continue;
+      failed++; // skip the datagram the kernel refused
+      done++;
+      filled = false; // it took no id, so the ones after it move down
+      continue;
+    }
+    obj->tx_id += ret;
+    done += ret;
+  }
+  return failed;
+}
+
+/* Map a CLOCK_REALTIME kernel timestamp onto CLOCK_MONOTONIC. The offset
+ * between the clocks is cached and re-measured at most once a second. */
+static long long kernel_ts_to_monotonic(RtUdp *obj,
+                                        const struct timespec *kernel_ts) {
+  long long mono = now_ns(CLOCK_MONOTONIC);
+  if (mono - obj->ts_offset_at > TS_OFFSET_REFRESH_NS) {
+    long long real = now_ns(CLOCK_REALTIME);
+    long long mono_after = now_ns(CLOCK_MONOTONIC);
+    obj->ts_offset_ns = mono + (mono_after - mono) / 2 - real;
+    obj->ts_offset_at = mono_after;
+  }
+  return kernel_ts->tv_sec * 1000000000LL + kernel_ts->tv_nsec +
+         obj->ts_offset_ns;
+}
+
+/* Move TX timestamps from the socket error queue into tx_ts_buff. Only one
+ * worker calls this: the receive worker in full duplex, else the sender. */
+static void drain_tx_timestamps(RtUdp *obj) {
+  Ringbuffer *ring = &obj->tx_ts_buff;
+  StatBlock_t *st = stats_of(obj, obj->DIRECTION == DIR_FULL ? STATS_RX
+                                                               : STATS_TX);
+  char ctrl[TX_CTRL_LEN];
+  struct msghdr msg;
+  struct cmsghdr *cmsg;
+
+  for (;;) {
+    memset(&msg, 0, sizeof(msg));
+    msg.msg_control = ctrl;
+    msg.msg_controllen = sizeof(ctrl);
+    if (recvmsg(obj->sock_fd, &msg, MSG_ERRQUEUE | MSG_DONTWAIT) < 0)
+      return;
+
+    struct scm_timestamping *tss = NULL;
+    struct sock_extended_err *serr = NULL;
+    for (cmsg = CMSG_FIRSTHDR(&msg); cmsg; cmsg = CMSG_NXTHDR(&msg, cmsg)) {
+      if (cmsg->cmsg_level == SOL_SOCKET &&
+          cmsg->cmsg_type == SCM_TIMESTAMPING)
+        tss = (struct scm_timestamping *)CMSG_DATA(cmsg);
+      else if (cmsg->cmsg_level == SOL_IP && cmsg->cmsg_type == IP_RECVERR)
+        serr = (struct sock_extended_err *)CMSG_DATA(cmsg);
+    }
+    if (!tss || !serr || serr->ee_origin != SO_EE_ORIGIN_TIMESTAMPING ||
+        serr->ee_info != SCM_TSTAMP_SND)
+      continue;
+
+    TxStamp_t stamp = {
+        .id = serr->ee_data,
+        .sched_ns = atomic_load_explicit(
+            &obj->tx_sched[serr->ee_data & (TX_TS_WINDOW - 1)],
+            memory_order_acquire),
+    };
+    size_t cursor = write_cursor(ring);
+    char *dst = reserve(ring, &cursor, sizeof(stamp));
+    if (!dst) { // nobody is collecting them
+      stat_count(st, ST_N_TX_TIMESTAMPS_DROPPED, 1);
+      continue;
+    }
+    memcpy(dst, &stamp, sizeof(stamp));
+    commit(ring, &cursor, sizeof(stamp),
+           kernel_ts_to_monotonic(obj, &tss->ts[0]));
+    publish(ring, cursor, 1);
+    stat_count(st, ST_N_TX_TIMESTAMPS, 1);
+  }
+}
+
+/* Account for a timed wait that ended error ns after its target. */
+static inline void record_wake_error(RtUdp *obj, long long error) {
+  StatBlock_t *st = stats_of(obj, STATS_TX);
+  stats_begin(st);
+  stat_add(st, ST_N_TIMED_WAITS, 1);
+  stat_add(st, ST_TOTAL_WAKE_ERROR_NS, error);
+  stat_max(st, ST_MAX_WAKE_ERROR_NS, error);
+  stats_end(st);
+}
+
+/* Wait until target on CLOCK_MONOTONIC. Returns false early if a new packet
+ * is published meanwhile, since it may be due sooner, or on stop(). In precision mode,
+ * sleep until spin_margin before the target and busy-wait the rest. The
+ * margin follows the observed wake-up overshoot: its smoothed mean plus four
+ * mean deviations. */
+static bool sleep_until(RtUdp *obj, long long target) {
+  Ringbuffer *ring = &obj->send_buff;
+  StatBlock_t *st = stats_of(obj, STATS_TX);
+  size_t seen = obj->sched.ingest;
+  long long now;
+
+  if (!obj->spin_margin) {
+    if (wait_published(ring, seen, target))
+      return false;
+    now = now_ns(CLOCK_MONOTONIC);
+  } else {
+    long long wake = target - obj->spin_margin;
+    now = now_ns(CLOCK_MONOTONIC);
+    if (wake > now) {
+      if (wait_published(ring, seen, wake))
+        return false;
+      now = now_ns(CLOCK_MONOTONIC);
+
+      long long overshoot = now - wake;
+      stats_begin(st);
+      stat_add(st, ST_N_SPIN_SLEEPS, 1);
+      if (now > target)
+        stat_add(st, ST_N_SPIN_LATE, 1); // overslept the whole margin
+      stats_end(st);
+      if (stat_get(st, ST_N_SPIN_SLEEPS) == 1) {
+        obj->overshoot_avg = overshoot;
+        obj->overshoot_dev = overshoot / 2;
+      } else {
+        long long err = overshoot - obj->overshoot_avg;
+        obj->overshoot_avg += err / 8;
+        obj->overshoot_dev += (llabs(err) - obj->overshoot_dev) / 4;
+      }
+      obj->spin_margin =
+          MIN(MAX(obj->overshoot_avg + 4 * obj->overshoot_dev, SPIN_MARGIN_MIN),
+              SPIN_MARGIN_MAX);
+    }
+    long long spin_start = now;
+    while (now < target) {
+      if (atomic_load_explicit(&ring->ctl->head, memory_order_acquire) !=
+              seen ||
+          !obj->running) {
+        stat_count(st, ST_TOTAL_SPIN_NS, now - spin_start);
+        return false;
+      }
+      cpu_relax();
+      now = now_ns(CLOCK_MONOTONIC);
+    }
+    stat_count(st, ST_TOTAL_SPIN_NS, now - spin_start);
+  }
+
+  record_wake_error(obj, now - target);
+  return true;
+}
+
+/* Per-thread scratch space for building sendmmsg() batches. */
+typedef struct {
+  PacketRef_t batch[SEND_BATCH_MAX];
+  struct mmsghdr msgs[SEND_BATCH_MAX];
+  struct iovec iovs[SEND_BATCH_MAX];
+  char tx_ctrl[SEND_BATCH_MAX][CMSG_SPACE(sizeof(uint64_t))];
+  bool txtime[SEND_BATCH_MAX];
+  char *spill[SEND_BATCH_MAX]; // from sched_pop()
+} SendCtx_t;
+
+static void send_ctx_init(SendCtx_t *ctx) {
+  memset(ctx->msgs, 0, sizeof(ctx->msgs));
+  memset(ctx->tx_ctrl, 0, sizeof(ctx->tx_ctrl));
+  for (int i = 0; i < SEND_BATCH_MAX; i++) {
+    ctx->msgs[i].msg_hdr.msg_iov = &ctx->iovs[i];
+    ctx->msgs[i].msg_hdr.msg_iovlen = 1;
+  }
+}
+
+/* How early packets may be handed to the kernel. */
+static inline long long send_lead(RtUdp *obj) {
+  return obj->txtime_active ? obj->txtime_lead : 0;
+}
+
+/* Pull newly published packets into the deadline heap, discard any dropped
+ * ones on top of it, and spill packets that keep a full send_buff from being
+ * released. With the send_buff consumer lock held. */
+static inline void send_ingest(RtUdp *obj) {
+  Ringbuffer *ring = &obj->send_buff;
+  Scheduler_t *sched = &obj->sched;
+  PacketRef_t ref;
+  size_t out_of_order = sched_ingest(sched, ring);
+  if (out_of_order)
+    stat_count(stats_of(obj, STATS_TX), ST_N_TX_OUT_OF_ORDER, out_of_order);
+  while (sched->n > 0 && sched_stale(sched, ring))
+    sched_pop(sched, &ref);
+  size_t spilled = sched_spill(sched, ring);
+  if (spilled) {
+    atomic_fetch_add_explicit(&sched->n_held, spilled, memory_order_relaxed);
+    size_t released = release_done(ring);
+    atomic_fetch_sub_explicit(&sched->n_held, released, memory_order_relaxed);
+    stat_count(stats_of(obj, STATS_TX), ST_N_TX_SPILLED, spilled);
+  }
+}
+
+/* Send one batch: everything due by now (or within the lead window) and at
+ * least the packet with deadline first_ts, earliest deadline first, in one
+ * syscall. slept says whether we waited for first_ts. With the send_buff
+ * consumer lock held. Returns how many packets went out. */
+static size_t send_ready(RtUdp *obj, SendCtx_t *ctx, long long first_ts,
+                         bool slept) {
+  Ringbuffer *ring = &obj->send_buff;
+  Scheduler_t *sched = &obj->sched;
+  PacketRef_t *batch = ctx->batch;
+  struct mmsghdr *msgs = ctx->msgs;
+  StatBlock_t *st = stats_of(obj, STATS_TX);
+  long long lead = send_lead(obj);
+  long long now = now_ns(CLOCK_MONOTONIC);
+  size_t n = 0, n_txtime = 0, n_syscalls = 0;
+
+  while (n < SEND_BATCH_MAX && sched->n > 0 &&
+         sched->heap[0].ref.ts <= MAX(now + lead, first_ts)) {
+    bool stale = sched_stale(sched, ring);
+    ctx->spill[n] = sched_pop(sched, &batch[n]);
+    n += !stale;
+  }
+  if (n == 0)
+    return 0; // dropped while we slept
+
+  for (size_t i = 0; i < n; i++) {
+    msgs[i].msg_hdr.msg_name = &obj->remote_addr;
+    msgs[i].msg_hdr.msg_namelen = sizeof(obj->remote_addr);
+    ctx->iovs[i].iov_base = batch[i].data;
+    ctx->iovs[i].iov_len = batch[i].len;
+    ctx->txtime[i] = lead && batch[i].ts > now;
+    if (ctx->txtime[i]) {
+      struct cmsghdr *cmsg = (struct cmsghdr *)ctx->tx_ctrl[i];
+      uint64_t deadline = batch[i].ts;
+      cmsg->cmsg_level = SOL_SOCKET;
+      cmsg->cmsg_type = SCM_TXTIME;
+      cmsg->cmsg_len = CMSG_LEN(sizeof(deadline));
+      memcpy(CMSG_DATA(cmsg), &deadline, sizeof(deadline));
+      msgs[i].msg_hdr.msg_control = ctx->tx_ctrl[i];
+      msgs[i].msg_hdr.msg_controllen = sizeof(ctx->tx_ctrl[i]);
+      n_txtime++;
+    } else {
+      msgs[i].msg_hdr.msg_control = NULL;
+      msgs[i].msg_hdr.msg_controllen = 0;
+    }
+  }
+
+  size_t failed = send_packets(obj, msgs, batch, n, &n_syscalls);
+
+  long long send_time_ns = now_ns(CLOCK_MONOTONIC);
+  bool first_slept = slept && !ctx->txtime[0];
+  stats_begin(st);
+  stat_add(st, ST_N_SEND_SYSCALLS, n_syscalls);
+  stat_add(st, ST_N_TX_TXTIME_PACKETS, n_txtime);
+  stat_add(st, ST_N_TX_SLEEP_PACKETS, first_slept);
+  stat_add(st, ST_N_IMEDIATE_PACKETS, n - n_txtime - first_slept);
+  for (size_t i = 0; i < n; i++) {
+    if (!ctx->txtime[i]) { // the kernel times the rest; see get_tx_timestamps()
+      long long latency = send_time_ns - batch[i].ts;
+      stat_max(st, ST_MAX_LATENCY_NS, latency);
+      stat_min(st, ST_MIN_LATENCY_NS, latency);
+      stat_add(st, ST_TOTAL_LATENCY_NS, latency);
+      histo_record(&obj->stats, st, latency);
+    }
+    if (obj->gso_size && batch[i].len > (size_t)obj->gso_size) {
+      stat_add(st, ST_N_TX_GSO_PACKETS, 1);
+      stat_add(st, ST_N_TX_GSO_SEGMENTS,
+               (batch[i].len + obj->gso_size - 1) / obj->gso_size);
+    }
+  }
+  stat_add(st, ST_N_PACKETS_SENT, n - failed);
+  stat_add(st, ST_N_TX_PACKETS_DROPPED, failed);
+  for (size_t i = 0; obj->capture && i < n; i++)
+    stat_add(st,
+             capture_packet(obj, CAP_TX, batch[i].data, batch[i].len,
+                            batch[i].ts, send_time_ns)
+                 ? ST_N_CAPTURED
+                 : ST_N_CAPTURE_DROPPED,
+             1);
+  stats_end(st);
+  size_t n_ring = 0;
+  for (size_t i = 0; i < n; i++)
+    n_ring += sched_finish(sched, ring, &batch[i], ctx->spill[i]);
+  size_t released = release_done(ring);
+  atomic_fetch_add_explicit(&sched->n_held, n_ring, memory_order_relaxed);
+  atomic_fetch_sub_explicit(&sched->n_held, released, memory_order_relaxed);
+  return n;
+}
+
+#ifdef HAVE_URING
+/* One send handed to the kernel. The payload is a private copy, so the
+ * packet can leave send_buff (and be dropped or purged) right away. */
+typedef struct {
+  struct msghdr msg;
+  struct iovec iov;
+  struct __kernel_timespec deadline;
+  long long ts; // scheduled send time, LLONG_MAX while the slot is free
+  char *data;   // max_payload bytes
+} UringSend_t;
+
+typedef struct {
+  Uring_t ring;
+  UringSend_t slots[URING_TX_SLOTS];
+  unsigned free[URING_TX_SLOTS]; // stack of free slots
+  unsigned n_free;
+  bool wake_armed; // a poll on send_buff's eventfd is pending
+  char *buffers;
+} UringTx_t;
+
+/* Copy a packet into a free slot and queue its sendmsg, linked behind an
+ * absolute CLOCK_MONOTONIC timeout if it is not due by now. The timeout
+ * counts firing as success and then posts no completion, so a timed send
+ * wakes us once, like any other. */
+static void uring_send_submit(RtUdp *obj, UringTx_t *tx,
+                              const PacketRef_t *ref, long long now) {
+  unsigned slot = tx->free[--tx->n_free];
+  UringSend_t *s = &tx->slots[slot];
+  struct io_uring_sqe *sqe;
+
+  memcpy(s->data, ref->data, ref->len);
+  s->iov.iov_len = ref->len;
+  s->ts = ref->ts;
+  if (ref->ts > now) {
+    s->deadline.tv_sec = ref->ts / 1000000000LL;
+    s->deadline.tv_nsec = ref->ts % 1000000000LL;
+    sqe = uring_sqe(&tx->ring);
+    sqe->opcode = IORING_OP_TIMEOUT;
+    sqe->fd = -1;
+    sqe->addr = (uintptr_t)&s->deadline;
+    sqe->len = 1;
+    sqe->timeout_flags = IORING_TIMEOUT_ABS | IORING_TIMEOUT_ETIME_SUCCESS;
+    sqe->flags = IOSQE_IO_HARDLINK | IOSQE_CQE_SKIP_SUCCESS;
+    sqe->user_data = UD_TIMEOUT | (uint64_t)slot << UD_SHIFT;
+  }
+  sqe = uring_sqe(&tx->ring);
+  sqe->opcode = IORING_OP_SENDMSG;
+  sqe->fd = obj->sock_fd;
+  sqe->addr = (uintptr_t)&s->msg;
+  sqe->len = 1;
+  sqe->user_data = UD_SEND | (uint64_t)slot << UD_SHIFT;
+}
+
+/* Account for the sends that completed and free their slots. Returns the
+ * earliest deadline still in flight. */
+static long long uring_send_reap(RtUdp *obj, UringTx_t *tx) {
+  StatBlock_t *st = stats_of(obj, STATS_TX);
+  long long now = now_ns(CLOCK_MONOTONIC);
+  long long earliest = LLONG_MAX;
+  struct io_uring_cqe *cqe;
+
+  stats_begin(st);
+  while ((cqe = uring_cqe(&tx->ring)) != NULL) {
+    unsigned slot = cqe->user_data >> UD_SHIFT;
+    UringSend_t *s = &tx->slots[slot];
+    switch (cqe->user_data & ((1 << UD_SHIFT) - 1)) {
+    case UD_SEND:
+      if (cqe->res >= 0) {
+        long long latency = now - s->ts;
+        stat_add(st, ST_N_PACKETS_SENT, 1);
+        stat_max(st, ST_MAX_LATENCY_NS, latency);
+        stat_min(st, ST_MIN_LATENCY_NS, latency);
+        stat_add(st, ST_TOTAL_LATENCY_NS, latency);
+        histo_record(&obj->stats, st, latency);
+      } else {
+        stat_add(st, ST_N_TX_PACKETS_DROPPED, 1);
+      }
+      if (obj->gso_size && s->iov.iov_len > (size_t)obj->gso_size) {
+        stat_add(st, ST_N_TX_GSO_PACKETS, 1);
+        stat_add(st, ST_N_TX_GSO_SEGMENTS,
+                 (s->iov.iov_len + obj->gso_size - 1) / obj->gso_size);
+      }
+      if (obj->capture)
+        stat_add(st,
+                 capture_packet(obj, CAP_TX, s->data, s->iov.iov_len, s->ts,
+                                now)
+                     ? ST_N_CAPTURED
+                     : ST_N_CAPTURE_DROPPED,
+                 1);
+      s->ts = LLONG_MAX;
+      tx->free[tx->n_free++] = slot;
+      break;
+    case UD_WAKE:
+      tx->wake_armed = false;
+      break;
+    default: // UD_TIMEOUT, only if cancelled
+      break;
+    }
+    uring_cqe_seen(&tx->ring);
+  }
+  stats_end(st);
+
+  for (unsigned i = 0; i < URING_TX_SLOTS; i++)
+    earliest = MIN(earliest, tx->slots[i].ts);
+  return earliest;
+}
+
+/* Send worker loop on io_uring. Returns -1 if it cannot run, or stopped
+ * working, with obj->running still set; the poll loop takes over. */
+static int uring_send_loop(RtUdp *obj) {
+  Ringbuffer *ring = &obj->send_buff;
+  Scheduler_t *sched = &obj->sched;
+  StatBlock_t *st = stats_of(obj, STATS_TX);
+
+  // Other processes producing into a shared ring do not signal our
+  // eventfd, and the features below need the poll loop's send path.
+  if (obj->shm || obj->timestamping || obj->txtime_active ||
+      obj->spin_margin)
+    return -1;
+  if (ring->event_fd < 0 &&
+      (ring->event_fd = eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC)) < 0)
+    return -1;
+  UringTx_t *tx = calloc(1, sizeof(*tx));
+  if (!tx)
+    return -1;
+  tx->buffers = malloc((size_t)URING_TX_SLOTS * obj->max_payload);
+  if (!tx->buffers || uring_setup(&tx->ring, URING_ENTRIES) < 0) {
+    free(tx->buffers);
+    free(tx);
+    return -1;
+  }
+  for (unsigned i = 0; i < URING_TX_SLOTS; i++) {
+    UringSend_t *s = &tx->slots[i];
+    s->data = tx->buffers + (size_t)i * obj->max_payload;
+    s->iov.iov_base = s->data;
+    s->msg.msg_name = &obj->remote_addr;
+    s->msg.msg_namelen = sizeof(obj->remote_addr);
+    s->msg.msg_iov = &s->iov;
+    s->msg.msg_iovlen = 1;
+    s->ts = LLONG_MAX;
+    tx->free[i] = i;
+  }
+  tx->n_free = URING_TX_SLOTS;
+  obj->uring_tx = 1;
+
+  // Packets are submitted in deadline order. One whose deadline has passed
+  // but which is still in flight holds the rest back, so a later packet
+  // cannot overtake it in the kernel.
+  long long earliest = LLONG_MAX;
+  bool failed = false;
+  sched_reset(sched, ring);
+  while (obj->running) {
+    stat_count(st, ST_N_SEND_TICKS, 1);
+    long long now = now_ns(CLOCK_MONOTONIC);
+    size_t n = 0, n_timed = 0, n_ring = 0;
+    PacketRef_t ref;
+
+    consumer_lock(ring);
+    send_ingest(obj);
+    while (tx->n_free > 0 && earliest > now && sched->n > 0 &&
+           sched->heap[0].ref.ts <= now + URING_TX_HORIZON) {
+      bool stale = sched_stale(sched, ring);
+      char *spill = sched_pop(sched, &ref);
+      if (stale)
+        continue;
+      uring_send_submit(obj, tx, &ref, now);
+      n_ring += sched_finish(sched, ring, &ref, spill);
+      n_timed += ref.ts > now;
+      n++;
+    }
+    size_t released = n ? release_done(ring) : 0;
+    atomic_fetch_add_explicit(&sched->n_held, n_ring, memory_order_relaxed);
+    atomic_fetch_sub_explicit(&sched->n_held, released, memory_order_relaxed);
+    long long next = sched->n > 0 ? sched->heap[0].ref.ts : LLONG_MAX;
+    consumer_unlock(ring);
+
+    if (!tx->wake_armed) { // publish() signals the eventfd once we park
+      struct io_uring_sqe *sqe = uring_sqe(&tx->ring);
+      buff_event_arm(ring, sched->ingest);
+      sqe->opcode = IORING_OP_POLL_ADD;
+      sqe->fd = ring->event_fd;
+      sqe->poll32_events = POLLIN;
+      sqe->user_data = UD_WAKE;
+      tx->wake_armed = true;
+    }
+
+    // Wait for a completion, which picks up whatever came within the
+    // horizon meanwhile, or until the next packet is half the horizon away.
+    // Only a completion helps if a full flight table or an overdue send
+    // holds us up.
+    long long wait = URING_WAIT_NS;
+    if (tx->n_free > 0 && earliest > now && next != LLONG_MAX)
+      wait = MIN(wait, MAX(next - URING_TX_HORIZON / 2 - now, 0));
+    if (uring_enter(&tx->ring, 1, wait) < 0) {
+      failed = true;
+      break;
+    }
+    stats_begin(st);
+    stat_add(st, ST_N_SEND_SYSCALLS, 1);
+    stat_add(st, ST_N_TX_SLEEP_PACKETS, n_timed);
+    stat_add(st, ST_N_IMEDIATE_PACKETS, n - n_timed);
+    stats_end(st);
+    earliest = uring_send_reap(obj, tx);
+  }
+
+  // What the kernel still holds is due within URING_TX_HORIZON.
+  while (tx->n_free < URING_TX_SLOTS &&
+         uring_enter(&tx->ring, 1, URING_WAIT_NS) == 0)
+    uring_send_reap(obj, tx);
+  uring_free(&tx->ring);
+  free(tx->buffers);
+  free(tx);
+  if (failed)
+    obj->uring_tx = 0;
+  return failed ? -1 : 0;
+}
+
+typedef struct {
+  Uring_t ring;
+  struct io_uring_buf_ring *bufs; // rec_buff slots on offer to the kernel
+  size_t bufs_bytes;
+  size_t provided;    // rec_buff position after the last slot offered
+  uint16_t bufs_tail; // bufs position after the last slot offered
+  bool armed;         // the multishot recv is active
+  bool polling;       // a poll for a datagram to drop the oldest for
+  int error;          // last error the recv ended with
+  size_t n_received;
+} UringRx_t;
+
+/* Offer every rec_buff slot the consumer has released, in ring order, so
+ * the kernel fills them in the order they are read. */
+static void uring_provide(RtUdp *obj, UringRx_t *rx) {
+  Ringbuffer *ring = &obj->rec_buff;
+  size_t limit = atomic_load_explicit(&ring->ctl->tail, memory_order_acquire) +
+                 ring->capacity;
+  uint16_t tail = rx->bufs_tail;
+  for (; rx->provided != limit; rx->provided++, tail++) {
+    struct io_uring_buf *buf = &rx->bufs->bufs[tail & ring->mask];
+    buf->addr = (uintptr_t)slot_at(ring, rx->provided)->data;
+    buf->len = obj->max_payload;
+    buf->bid = rx->provided & ring->mask;
+  }
+  if (tail != rx->bufs_tail)
+    atomic_store_explicit((_Atomic uint16_t *)&rx->bufs->tail, tail,
+                          memory_order_release);
+  rx->bufs_tail = tail;
+}
+
+/* Commit and publish what the multishot recv delivered. */
+static void uring_receive_reap(RtUdp *obj, UringRx_t *rx) {
+  Ringbuffer *ring = &obj->rec_buff;
+  StatBlock_t *st = stats_of(obj, STATS_RX);
+  long long now = now_ns(CLOCK_MONOTONIC);
+  size_t cursor = write_cursor(ring);
+  size_t n = 0;
+  struct io_uring_cqe *cqe;
+
+  stats_begin(st);
+  stat_add(st, ST_N_RX_SYSCALLS, 1);
+  while ((cqe = uring_cqe(&rx->ring)) != NULL) {
+    if (cqe->user_data == UD_RECV) {
+      if (cqe->res >= 0 && (cqe->flags & IORING_CQE_F_BUFFER)) {
+        char *data = slot_at(ring, cursor)->data;
+        assert((cqe->flags >> IORING_CQE_BUFFER_SHIFT) ==
+               (cursor & ring->mask));
+        commit(ring, &cursor, cqe->res, now);
+        n++;
+        if (obj->capture)
+          stat_add(st,
+                   capture_packet(obj, CAP_RX, data, cqe->res, now, now)
+                       ? ST_N_CAPTURED
+                       : ST_N_CAPTURE_DROPPED,
+                   1);
+      } else if (cqe->res < 0 && cqe->res != -ENOBUFS) { // out of slots
+        rx->error = -cqe->res;
+      }
+      if (!(cqe->flags & IORING_CQE_F_MORE))
+        rx->armed = false;
+    } else if (cqe->user_data == UD_WAKE) {
+      rx->polling = false;
+    }
+    uring_cqe_seen(&rx->ring);
+  }
+  stat_add(st, ST_N_PACKETS_REC, n);
+  stat_add(st, ST_N_RX_WAKEUPS, n > 0);
+  stats_end(st);
+  publish(ring, cursor, n);
+  rx->n_received += n;
+}
+
+/* Receive worker loop on io_uring. Returns -1 if it cannot run, or stopped
+ * working, with obj->running still set; the poll loop takes over. */
+static int uring_receive_loop(RtUdp *obj) {
+  Ringbuffer *ring = &obj->rec_buff;
+  StatBlock_t *st = stats_of(obj, STATS_RX);
+  struct io_uring_sqe *sqe;
+  UringRx_t rx;
+
+  // Buffer rings hand out whole slots and carry no control messages.
+  // Busy-polling is the poll loop's.
+  if (ring->kind != RING_FIXED || obj->rx_cmsg || obj->rx_spin ||
+      ring->capacity > URING_RX_BUFS_MAX)
+    return -1;
+  memset(&rx, 0, sizeof(rx));
+  rx.bufs_bytes =
+      align_up(ring->capacity * sizeof(struct io_uring_buf), SHM_PAGE);
+  rx.bufs = mmap(NULL, rx.bufs_bytes, PROT_READ | PROT_WRITE,
+                 MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+  if (rx.bufs == MAP_FAILED)
+    return -1;
+  struct io_uring_buf_reg reg = {.ring_addr = (uintptr_t)rx.bufs,
+                                 .ring_entries = ring->capacity,
+                                 .bgid = URING_BGID};
+  if (uring_setup(&rx.ring, URING_ENTRIES) < 0 ||
+      syscall(SYS_io_uring_register, rx.ring.fd, IORING_REGISTER_PBUF_RING,
+              &reg, 1) < 0) {
+    uring_free(&rx.ring);
+    munmap(rx.bufs, rx.bufs_bytes);
+    return -1;
+  }
+  rx.provided = write_cursor(ring);
+  obj->uring_rx = 1;
+
+  bool failed = false;
+  while (obj->running) {
+    stat_count(st, ST_N_REC_TICKS, 1);
+    if (!rx.armed) {
+      if (rx.error == EINVAL && rx.n_received == 0) {
+        failed = true; // no multishot recv, before 6.0
+        break;
+      }
+      uring_provide(obj, &rx);
+      // The ring is full: drop the oldest packet once a datagram waits.
+      if (rx.provided == write_cursor(ring) && !rx.polling) {
+        if (recv(obj->sock_fd, NULL, 0, MSG_PEEK | MSG_DONTWAIT) >= 0) {
+          drop_oldest(ring);
+          stat_count(st, ST_N_RX_PACKETS_DROPPED, 1);
+          uring_provide(obj, &rx);
+        } else {
+          sqe = uring_sqe(&rx.ring);
+          sqe->opcode = IORING_OP_POLL_ADD;
+          sqe->fd = obj->sock_fd;
+          sqe->poll32_events = POLLIN;
+          sqe->user_data = UD_WAKE;
+          rx.polling = true;
+        }
+      }
+      if (rx.provided != write_cursor(ring)) {
+        sqe = uring_sqe(&rx.ring);
+        sqe->opcode = IORING_OP_RECV;
+        sqe->fd = obj->sock_fd;
+        sqe->ioprio = IORING_RECV_MULTISHOT;
+        sqe->flags = IOSQE_BUFFER_SELECT;
+        sqe->buf_group = URING_BGID;
+        sqe->user_data = UD_RECV;
+        rx.armed = true;
+      }
+    }
+    if (uring_enter(&rx.ring, 1, URING_WAIT_NS) < 0) {
+      failed = true;
+      break;
+    }
+    uring_receive_reap(obj, &rx);
+    uring_provide(obj, &rx);
+  }
+
+  // Make sure the kernel is done with the slots before anyone reuses them.
+  if (rx.armed) {
+    sqe = uring_sqe(&rx.ring);
+    sqe->opcode = IORING_OP_ASYNC_CANCEL;
+    sqe->fd = -1;
+    sqe->addr = UD_RECV;
+    sqe->user_data = UD_CANCEL;
+    while (rx.armed && uring_enter(&rx.ring, 1, URING_WAIT_NS) == 0)
+      uring_receive_reap(obj, &rx);
+  }
+  uring_free(&rx.ring);
+  munmap(rx.bufs, rx.bufs_bytes);
+  if (failed)
+    obj->uring_rx = 0;
+  return failed ? -1 : 0;
+}
+#else
+static int uring_send_loop(RtUdp *obj) { return -1; }
+static int uring_receive_loop(RtUdp *obj) { return -1; }
+#endif
+
+void *send_worker(void *arg) {
+  RtUdp *obj = (RtUdp *)arg;
+  Ringbuffer *ring = &obj->send_buff;
+  SendCtx_t ctx;
+  long long lead = send_lead(obj);
+  Scheduler_t *sched = &obj->sched;
+
+  if (obj->backend == BACKEND_URING && uring_send_loop(obj) == 0)
+    return NULL;
+
+  // With backpressure="drop_oldest" the producer may drop queued packets,
+  // so everything between ingesting and releasing happens under the
+  // consumer lock. It is let go while waiting.
+  send_ctx_init(&ctx);
+  sched_reset(sched, ring);
+  while (obj->running) {
+    stat_count(stats_of(obj, STATS_TX), ST_N_SEND_TICKS, 1);
+    consumer_lock(ring);
+    send_ingest(obj);
+    if (sched->n == 0) {
+      consumer_unlock(ring);
+      if (!wait_published(ring, sched->ingest,
+                          now_ns(CLOCK_MONOTONIC) + 100000000) && // timeout
+          obj->timestamping && obj->DIRECTION == DIR_SEND)
+        drain_tx_timestamps(obj); // stragglers from the last burst
+      continue;
+    }
+
+    // With SO_TXTIME the kernel holds packets until their deadline, so they
+    // can be handed over up to txtime_lead early.
+    bool slept = false;
+    long long first_ts = sched->heap[0].ref.ts;
+    if (first_ts - lead >= now_ns(CLOCK_MONOTONIC)) {
+      consumer_unlock(ring);
+      if (!sleep_until(obj, first_ts - lead))
+        continue; // something new arrived, it may be due first
+      slept = true;
+      consumer_lock(ring);
+    }
+
+    size_t n = send_ready(obj, &ctx, first_ts, slept);
+    consumer_unlock(ring);
+    if (n && obj->timestamping && obj->DIRECTION == DIR_SEND)
+      drain_tx_timestamps(obj);
+  }
+  return NULL;
+}
+
+/* Handle a received datagram's control messages: account for UDP_GRO
+ * coalescing and replace *ts with the kernel receive time, if present.
+ * Returns the UDP_GRO segment size, 0 if there is none. Within a STATS_RX
+ * stats_begin()/stats_end() group. */
+static int rx_control(RtUdp *obj, struct msghdr *msg, size_t len,
+                      long long *ts) {
+  struct cmsghdr *cmsg;
+  int segment = 0;
+
+  for (cmsg = CMSG_FIRSTHDR(msg); cmsg; cmsg = CMSG_NXTHDR(msg, cmsg)) {
+    if (cmsg->cmsg_level == SOL_UDP && cmsg->cmsg_type == UDP_GRO) {
+      memcpy(&segment, CMSG_DATA(cmsg), sizeof(segment));
+    } else if (cmsg->cmsg_level == SOL_SOCKET &&
+               cmsg->cmsg_type == SCM_TIMESTAMPING) {
+      struct scm_timestamping tss;
+      memcpy(&tss, CMSG_DATA(cmsg), sizeof(tss));
+      *ts = kernel_ts_to_monotonic(obj, &tss.ts[0]);
+    }
+  }
+  if (segment > 0 && len > (size_t)segment) {
+    StatBlock_t *st = stats_of(obj, STATS_RX);
+    stat_add(st, ST_N_RX_GRO_PACKETS, 1);
+    stat_add(st, ST_N_RX_GRO_SEGMENTS, (len + segment - 1) / segment);
+  }
+  return segment;
+}
+
+/* receive_mmsg() for UDP_GRO sockets. Coalesced reads land in gro_buf and
+ * are split back into their segments, one rec_buff record each, so callers
+ * see the datagrams the peer sent. Segments longer than max_payload are
+ * dropped as truncated. */
+static size_t receive_gro(RtUdp *obj, struct mmsghdr *msgs,
+                          struct iovec *iovs, unsigned batch,
+                          unsigned max_rounds) {
+  Ringbuffer *ring = &obj->rec_buff;
+  StatBlock_t *st = stats_of(obj, STATS_RX);
+  unsigned vlen = MIN(batch, GRO_BATCH);
+  size_t n = 0;
+
+  for (unsigned i = 0; i < vlen; i++) {
+    iovs[i].iov_base = obj->gro_buf + (size_t)i * GRO_BUF_BYTES;
+    iovs[i].iov_len = GRO_BUF_BYTES;
+  }
+  for (unsigned round = 0; max_rounds == 0 || round < max_rounds; round++) {
+    for (unsigned i = 0; i < vlen; i++)
+      msgs[i].msg_hdr.msg_controllen = RX_CTRL_LEN;
+    int ret = recvmmsg(obj->sock_fd, msgs, vlen, MSG_DONTWAIT, NULL);
+    if (ret <= 0) { // EAGAIN: nothing left to read
+      stat_count(st, ST_N_RX_SYSCALLS, 1);
+      return n;
+    }
+
+    long long now = now_ns(CLOCK_MONOTONIC);
+    size_t cursor = write_cursor(ring);
+    size_t pending = 0;
+    stats_begin(st);
+    stat_add(st, ST_N_RX_SYSCALLS, 1);
+    for (int i = 0; i < ret; i++) {
+      const char *data = iovs[i].iov_base;
+      size_t len = msgs[i].msg_len;
+      long long ts = now;
+      size_t segment = rx_control(obj, &msgs[i].msg_hdr, len, &ts);
+      if (msgs[i].msg_hdr.msg_flags & MSG_TRUNC) {
+        stat_add(st, ST_N_RX_TRUNCATED, 1);
+        continue;
+      }
+      if (segment == 0)
+        segment = len;
+      for (size_t off = 0; off < len; off += segment) {
+        size_t seg_len = MIN(segment, len - off);
+        if (seg_len > (size_t)obj->max_payload) {
+          stat_add(st, ST_N_RX_TRUNCATED, 1);
+          continue;
+        }
+        char *dst;
+        while ((dst = reserve(ring, &cursor, seg_len)) == NULL) {
+          // drop_oldest() only sees published records.
+          publish(ring, cursor, pending);
+          pending = 0;
+          drop_oldest(ring);
+          stat_add(st, ST_N_RX_PACKETS_DROPPED, 1);
+        }
+        memcpy(dst, data + off, seg_len);
+        commit(ring, &cursor, seg_len, ts);
+        pending++;
+        stat_add(st, ST_N_PACKETS_REC, 1);
+        if (obj->capture)
+          stat_add(st,
+                   capture_packet(obj, CAP_RX, dst, seg_len, ts, ts)
+                       ? ST_N_CAPTURED
+                       : ST_N_CAPTURE_DROPPED,
+                   1);
+      }
+    }
+    stats_end(st);
+    publish(ring, cursor, pending);
+    n += ret;
+
+    if ((unsigned)ret < vlen) // socket drained
+      return n;
+  }
+  return n;
+}
+
+/* Drain the socket with recvmmsg() vectors of up to batch datagrams,
+ * receiving straight into the free space of rec_buff. Returns once the socket
+ * is empty, or after max_rounds vectors (or dropped packets) if that is not
+ * 0, with the number of datagrams received. */
+static size_t receive_mmsg(RtUdp *obj, struct mmsghdr *msgs,
+                           struct iovec *iovs, unsigned batch,
+                           unsigned max_rounds) {
+  Ringbuffer *ring = &obj->rec_buff;
+  StatBlock_t *st = stats_of(obj, STATS_RX);
+  size_t n = 0;
+  char *dst;
+
+  if (obj->gro)
+    return receive_gro(obj, msgs, iovs, batch, max_rounds);
+  for (unsigned round = 0; max_rounds == 0 || round < max_rounds; round++) {
+    size_t start = write_cursor(ring);
+    size_t cursor = start;
+    unsigned vlen = 0;
+
+    // Reserve room for up to batch full-size datagrams.
+    while (vlen < batch &&
+           (dst = reserve(ring, &cursor, obj->max_payload)) != NULL) {
+      iovs[vlen].iov_base = dst;
+      iovs[vlen].iov_len = obj->max_payload;
+      msgs[vlen].msg_hdr.msg_controllen = obj->rx_cmsg ? RX_CTRL_LEN : 0;
+      commit(ring, &cursor, obj->max_payload, 0);
+      vlen++;
+    }
+    if (vlen == 0) {
+      if (recv(obj->sock_fd, NULL, 0, MSG_PEEK | MSG_DONTWAIT) < 0)
+        return n; // nothing waiting, keep what we have
+      drop_oldest(ring);
+      stat_count(st, ST_N_RX_PACKETS_DROPPED, 1);
+      continue;
+    }
+
+    int ret = recvmmsg(obj->sock_fd, msgs, vlen, MSG_DONTWAIT, NULL);
+    if (ret <= 0) { // EAGAIN: nothing left to read
+      stat_count(st, ST_N_RX_SYSCALLS, 1);
+      return n;
+    }
+
+    // Commit what arrived. Slab records shrink to their real size, so later
+    // payloads move back to close the gap (never further than they are long).
+    // Truncated datagrams are left out.
+    long long now = now_ns(CLOCK_MONOTONIC);
+    size_t n_rec = 0;
+    cursor = start;
+    stats_begin(st);
+    stat_add(st, ST_N_RX_SYSCALLS, 1);
+    for (int i = 0; i < ret; i++) {
+      size_t len = msgs[i].msg_len;
+      long long ts = now;
+      if (obj->rx_cmsg)
+        rx_control(obj, &msgs[i].msg_hdr, len, &ts);
+      if (msgs[i].msg_hdr.msg_flags & MSG_TRUNC) {
+        stat_add(st, ST_N_RX_TRUNCATED, 1);
+        continue;
+      }
+      dst = reserve(ring, &cursor, len);
+      if (dst != iovs[i].iov_base)
+        memmove(dst, iovs[i].iov_base, len);
+      commit(ring, &cursor, len, ts);
+      n_rec++;
+      if (obj->capture)
+        stat_add(st,
+                 capture_packet(obj, CAP_RX, dst, len, ts, ts)
+                     ? ST_N_CAPTURED
+                     : ST_N_CAPTURE_DROPPED,
+                 1);
+    }
+    stat_add(st, ST_N_PACKETS_REC, n_rec);
+    stats_end(st);
+    publish(ring, cursor, n_rec);
+    n += ret;
+
+    if ((unsigned)ret < vlen) // socket drained
+      return n;
+  }
+  return n;
+}
+
+void *receive_worker(void *arg) {
+  RtUdp *obj = (RtUdp *)arg;
+  Ringbuffer *ring = &obj->rec_buff;
+  StatBlock_t *st = stats_of(obj, STATS_RX);
+  struct pollfd pfds;
+  pfds.fd = obj->sock_fd;
+  pfds.events = POLLIN;
+  struct mmsghdr msgs[RX_BATCH_MAX];
+  struct iovec iovs[RX_BATCH_MAX];
+  char ctrl[RX_BATCH_MAX][RX_CTRL_LEN];
+
+  if (obj->backend == BACKEND_URING && uring_receive_loop(obj) == 0)
+    return NULL;
+
+  // The recvfrom-style path is simply a vector of one.
+  int n_msgs = MAX(obj->rx_batch, 1);
+  memset(msgs, 0, sizeof(msgs));
+  for (int i = 0; i < n_msgs; i++) {
+    msgs[i].msg_hdr.msg_iov = &iovs[i];
+    msgs[i].msg_hdr.msg_iovlen = 1;
+    if (obj->rx_cmsg)
+      msgs[i].msg_hdr.msg_control = ctrl[i];
+  }
+
+  // Busy-poll mode: for rx_spin ns after each datagram keep receiving
+  // without blocking, so the next one arrives without a wake-up.
+  long long spin_until = 0;
+  while (obj->running) {
+    if (obj->rx_spin) {
+      long long start = now_ns(CLOCK_MONOTONIC);
+      if (start < spin_until) {
+        size_t n = receive_mmsg(obj, msgs, iovs, n_msgs, 0);
+        if (n == 0)
+          cpu_relax();
+        long long end = now_ns(CLOCK_MONOTONIC);
+        if (n > 0)
+          spin_until = end + obj->rx_spin;
+        stats_begin(st);
+        stat_add(st, ST_N_RX_SPIN_POLLS, 1);
+        stat_add(st, ST_N_RX_SPIN_IDLE, n == 0);
+        stat_add(st, ST_TOTAL_RX_SPIN_NS, end - start);
+        stats_end(st);
+        continue;
+      }
+    }
+    stat_count(st, ST_N_REC_TICKS, 1);
+    int ready = poll(&pfds, 1, 10); // 1ms timeout
+    assert(ready != -1);
+    if (ready == 0) { // timout
+      continue;
+    } else { // ready
+      // Pending TX timestamps raise POLLERR; in full duplex they are ours.
+      if (obj->timestamping && (pfds.revents & POLLERR)) {
+        if (obj->DIRECTION == DIR_FULL)
+          drain_tx_timestamps(obj);
+        if (!(pfds.revents & POLLIN))
+          continue;
+      }
+      if (pfds.revents & POLLIN) {
+        stat_count(st, ST_N_RX_WAKEUPS, 1);
+        if (obj->rx_spin)
+          spin_until = now_ns(CLOCK_MONOTONIC) + obj->rx_spin;
+        if (obj->rx_batch > 0 || obj->gro) {
+          receive_mmsg(obj, msgs, iovs, n_msgs, 0);
+          continue;
+        }
+        struct msghdr *msg = &msgs[0].msg_hdr;
+        size_t cursor = write_cursor(ring);
+        char *dst;
+        while ((dst = reserve(ring, &cursor, obj->max_payload)) == NULL) {
+          drop_oldest(ring); // drop oldest packet
+          stat_count(st, ST_N_RX_PACKETS_DROPPED, 1);
+        }
+        iovs[0].iov_base = dst;
+        iovs[0].iov_len = obj->max_payload;
+        if (obj->rx_cmsg)
+          msg->msg_controllen = RX_CTRL_LEN;
+        ssize_t len = recvmsg(pfds.fd, msg, 0);
+        if (len < 0) {
+          stat_count(st, ST_N_RX_SYSCALLS, 1);
+          continue;
+        }
+        long long ts = now_ns(CLOCK_MONOTONIC);
+        stats_begin(st);
+        stat_add(st, ST_N_RX_SYSCALLS, 1);
+        if (obj->rx_cmsg)
+          rx_control(obj, msg, len, &ts);
+        if (msg->msg_flags & MSG_TRUNC) {
+          stat_add(st, ST_N_RX_TRUNCATED, 1);
+          stats_end(st);
+          continue;
+        }
+        stat_add(st, ST_N_PACKETS_REC, 1);
+        if (obj->capture)
+          stat_add(st,
+                   capture_packet(obj, CAP_RX, dst, len, ts, ts)
+                       ? ST_N_CAPTURED
+                       : ST_N_CAPTURE_DROPPED,
+                   1);
+        stats_end(st);
+        commit(ring, &cursor, len, ts);
+        publish(ring, cursor, 1);
+      } else { /* POLLERR | POLLHUP */
+        assert(close(pfds.fd) == -1);
+        return NULL;
+      }
+    }
+  }
+  // long long monotinoc_timestamp = nic_2_monotonic_ts(obj, nic_timestamp); //
+  // TODO: Move to hardware time-stamps.
+  return NULL;
+}
+
+/* Create a SCHED_FIFO worker, pinned to cpu (if >= 0) before it first runs. */
+static int launch_worker(pthread_t *thread, void *(*worker)(void *), void *arg,
+                         int cpu) {
+  struct sched_param param;
+  param.sched_priority = 80;
+  int policy = SCHED_FIFO;
+  pthread_attr_t attr;
+  int ret;
+
+  pthread_attr_init(&attr);
+  if (cpu >= 0) {
+    // Pin the thread to the selected cpu
+    cpu_set_t cpuset;
+    CPU_ZERO(&cpuset);
+    CPU_SET(cpu, &cpuset);
+    pthread_attr_setaffinity_np(&attr, sizeof(cpuset), &cpuset);
+  }
+
+  // Create the thread
+  ret = pthread_create(thread, &attr, worker, arg);
+  pthread_attr_destroy(&attr);
+  if (ret != 0) {
+    errno = ret;
+    perror("pthread_create worker");
+    *thread = 0;
+    return -1;
+  }
+
+  ret = pthread_setschedparam(*thread, policy, &param);
+  if (ret != 0) {
+    errno = ret;
+    perror("pthread_setschedparam");
+    return -1;
+  }
+  return 0;
+}
+
+/* Shared I/O engine. Instead of two threads per socket, a few workers each
+ * serve many endpoints. A worker's epoll set watches the socket of every
+ * endpoint it serves and the eventfd their send_buff signals on publish(),
+ * and one timerfd stands in for all their send deadlines. Endpoints go to
+ * the least loaded worker at start(). A worker holds its lock while it
+ * handles events, so stop() never pulls an endpoint out from under it. */
+typedef enum { EV_CTL, EV_TIMER, EV_SEND, EV_SOCK } ENGINE_EV_t;
+
+typedef struct {
+  RtUdp *obj;     // NULL while the slot is free
+  uint32_t gen;   // bumped on unregister, so stale events are ignored
+  long long next; // deadline of the slot's live timer, LLONG_MAX = none
+} EngineSlot_t;
+
+typedef struct {
+  long long deadline;
+  unsigned slot;
+  uint32_t gen;
+} EngineTimer_t;
+
+typedef struct EngineWorker {
+  pthread_t thread;
+  int cpu;
+  int epoll_fd;
+  int timer_fd; // CLOCK_MONOTONIC, armed for the earliest timer
+  int ctl_fd;   // eventfd that wakes the worker to exit
+  atomic_bool running;
+  pthread_mutex_t lock; // held except while waiting in epoll_wait()
+  EngineSlot_t *slots;
+  unsigned n_slots;
+  unsigned n_active;
+  // Min-heap of send deadlines. Entries superseded by an earlier deadline
+  // for the same slot are skipped when they come up.
+  EngineTimer_t *timers;
+  size_t n_timers;
+  size_t timers_cap;
+  long long armed; // timer_fd deadline, LLONG_MAX = disarmed
+  size_t n_wakeups;
+  size_t n_events;
+  size_t n_timer_fires;
+  SendCtx_t send_ctx;
+  struct mmsghdr rx_msgs[RX_BATCH_MAX];
+  struct iovec rx_iovs[RX_BATCH_MAX];
+  char rx_ctrl[RX_BATCH_MAX][RX_CTRL_LEN];
+} EngineWorker_t;
+
+typedef struct {
+  PyObject_HEAD EngineWorker_t *workers;
+  int n_workers;
+  bool closed;
+} RtUdpEngine;
+
+/* epoll_event.data: kind | slot << 8 | gen << 32. */
+static inline uint64_t engine_key(ENGINE_EV_t kind, unsigned slot,
+                                  uint32_t gen) {
+  return (uint64_t)kind | (uint64_t)slot << 8 | (uint64_t)gen << 32;
+}
+
+static inline bool timer_before(const EngineTimer_t *a, const EngineTimer_t *b) {
+  return a->deadline < b->deadline;
+}
+
+static void timer_sift_down(EngineWorker_t *w, size_t i) {
+  EngineTimer_t *heap = w->timers;
+  for (;;) {
+    size_t min = i, l = 2 * i + 1, r = 2 * i + 2;
+    if (l < w->n_timers && timer_before(&heap[l], &heap[min]))
+      min = l;
+    if (r < w->n_timers && timer_before(&heap[r], &heap[min]))
+      min = r;
+    if (min == i)
+      return;
+    EngineTimer_t tmp = heap[i];
+    heap[i] = heap[min];
+    heap[min] = tmp;
+    i = min;
+  }
+}
+
+/* Rebuild the timer heap from the live deadline of each slot. */
+static void timer_compact(EngineWorker_t *w) {
+  w->n_timers = 0;
+  for (unsigned i = 0; i < w->n_slots; i++)
+    if (w->slots[i].obj && w->slots[i].next != LLONG_MAX)
+      w->timers[w->n_timers++] = (EngineTimer_t){
+          .deadline = w->slots[i].next, .slot = i, .gen = w->slots[i].gen};
+  for (size_t i = w->n_timers / 2; i-- > 0;)
+    timer_sift_down(w, i);
+}
+
+/* Have the endpoint in slot served again at deadline (LLONG_MAX: never). A
+ * later deadline than the pending one is left to that timer to find. */
+static int engine_schedule(EngineWorker_t *w, unsigned slot,
+                           long long deadline) {
+  EngineSlot_t *s = &w->slots[slot];
+  if (deadline >= s->next)
+    return 0;
+  s->next = deadline;
+  if (w->n_timers == w->timers_cap) {
+    // Full of superseded entries: rebuild, with room for one per slot twice.
+    if (w->timers_cap < 2 * (size_t)w->n_slots) {
+      size_t cap = 2 * (size_t)w->n_slots;
+      EngineTimer_t *timers = realloc(w->timers, cap * sizeof(*timers));
+      if (!timers)
+        return -1;
+      w->timers = timers;
+      w->timers_cap = cap;
+    }
+    timer_compact(w); // takes in the new deadline
+    return 0;
+  }
+  size_t i = w->n_timers++;
+  EngineTimer_t entry = {.deadline = deadline, .slot = slot, .gen = s->gen};
+  while (i > 0 && timer_before(&entry, &w->timers[(i - 1) / 2])) {
+    w->timers[i] = w->timers[(i - 1) / 2];
+    i = (i - 1) / 2;
+  }
+  w->timers[i] = entry;
+  return 0;
+}
+
+/* Send everything that is due on an endpoint, in batches. slept says the
+ * first batch was waited for. Sets *next to when the endpoint needs serving
+ * again. Returns the number of packets sent. */
+static size_t engine_send(EngineWorker_t *w, RtUdp *obj, bool slept,
+                          long long *next) {
+  Ringbuffer *ring = &obj->send_buff;
+  Scheduler_t *sched = &obj->sched;
+  long long lead = send_lead(obj);
+  size_t sent = 0;
+
+  stat_count(stats_of(obj, STATS_TX), ST_N_SEND_TICKS, 1);
+  *next = LLONG_MAX;
+  consumer_lock(ring);
+  send_ingest(obj);
+  while (sched->n > 0) {
+    long long first_ts = sched->heap[0].ref.ts;
+    if (first_ts - lead > now_ns(CLOCK_MONOTONIC)) {
+      *next = first_ts - lead;
+      break;
+    }
+    sent += send_ready(obj, &w->send_ctx, first_ts, slept && sent == 0);
+  }
+  consumer_unlock(ring);
+  return sent;
+}
+
+/* Serve the endpoints whose send deadline has passed. */
+static void engine_fire_timers(EngineWorker_t *w) {
+  long long now = now_ns(CLOCK_MONOTONIC);
+  while (w->n_timers > 0 && w->timers[0].deadline <= now) {
+    EngineTimer_t t = w->timers[0];
+    w->timers[0] = w->timers[--w->n_timers];
+    timer_sift_down(w, 0);
+    EngineSlot_t *s = &w->slots[t.slot];
+    if (!s->obj || s->gen != t.gen || s->next != t.deadline)
+      continue; // unregistered or superseded
+    s->next = LLONG_MAX;
+    w->n_timer_fires++;
+    long long next;
+    if (engine_send(w, s->obj, true, &next))
+      record_wake_error(s->obj, now - t.deadline);
+    engine_schedule(w, t.slot, next);
+    now = now_ns(CLOCK_MONOTONIC);
+  }
+}
+
+/* Point the timerfd at the earliest pending deadline. */
+static void engine_arm_timer(EngineWorker_t *w) {
+  long long deadline = w->n_timers > 0 ? w->timers[0].deadline : LLONG_MAX;
+  if (deadline == w->armed)
+    return;
+  struct itimerspec spec = {0};
+  if (deadline != LLONG_MAX)
+    spec.it_value = ts_from_ns(MAX(deadline, 1));
+  timerfd_settime(w->timer_fd, TFD_TIMER_ABSTIME, &spec, NULL);
+  w->armed = deadline;
+}
+
+/* send_buff had packets published: send what is due, then re-arm its
+ * eventfd and the endpoint's timer. */
+static void engine_on_send(EngineWorker_t *w, unsigned slot) {
+  RtUdp *obj = w->slots[slot].obj;
+  long long next;
+  eventfd_t value;
+  eventfd_read(obj->send_buff.event_fd, &value);
+  engine_send(w, obj, false, &next);
+  buff_event_arm(&obj->send_buff, obj->sched.ingest);
+  engine_schedule(w, slot, next);
+}
+
+static void engine_on_sock(EngineWorker_t *w, unsigned slot, uint32_t events) {
+  RtUdp *obj = w->slots[slot].obj;
+  if (events & EPOLLERR) {
+    // TX timestamps, or an ICMP error that would otherwise keep firing.
+    int err;
+    socklen_t len = sizeof(err);
+    if (obj->timestamping)
+      drain_tx_timestamps(obj);
+    getsockopt(obj->sock_fd, SOL_SOCKET, SO_ERROR, &err, &len);
+  }
+  if (events & EPOLLIN) {
+    stat_count(stats_of(obj, STATS_RX), ST_N_RX_WAKEUPS, 1);
+    // Bounded, so a flooded socket cannot starve the worker's other
+    // endpoints; epoll is level-triggered and reports it again.
+    receive_mmsg(obj, w->rx_msgs, w->rx_iovs, MAX(obj->rx_batch, 1),
+                 ENGINE_RX_ROUNDS);
+  }
+}
+
+void *engine_worker(void *arg) {
+  EngineWorker_t *w = (EngineWorker_t *)arg;
+  struct epoll_event events[ENGINE_EVENTS];
+
+  while (atomic_load(&w->running)) {
+    int n = epoll_wait(w->epoll_fd, events, ENGINE_EVENTS, -1);
+    if (n < 0)
+      continue; // EINTR
+    pthread_mutex_lock(&w->lock);
+    w->n_wakeups++;
+    w->n_events += n;
+    for (int i = 0; i < n; i++) {
+      uint64_t key = events[i].data.u64;
+      ENGINE_EV_t kind = key & 0xff;
+      unsigned slot = (key >> 8) & 0xffffff;
+      uint32_t gen = key >> 32;
+      uint64_t value;
+
+      if (kind == EV_CTL || kind == EV_TIMER) {
+        if (read(kind == EV_CTL ? w->ctl_fd : w->timer_fd, &value,
+                 sizeof(value)) > 0 &&
+            kind == EV_TIMER)
+          w->armed = LLONG_MAX;
+        continue;
+      }
+      if (slot >= w->n_slots || !w->slots[slot].obj ||
+          w->slots[slot].gen != gen)
+        continue; // stopped since epoll_wait() returned
+      if (kind == EV_SEND)
+        engine_on_send(w, slot);
+      else
+        engine_on_sock(w, slot, events[i].events);
+    }
+    engine_fire_timers(w);
+    engine_arm_timer(w);
+    pthread_mutex_unlock(&w->lock);
+  }
+  return NULL;
+}
+
+/* Hand a starting endpoint to the least loaded worker. Sets a Python
+ * exception on failure. */
+static int engine_register(RtUdpEngine *engine, RtUdp *obj) {
+  if (engine->closed) {
+    PyErr_SetString(PyExc_ValueError, "Engine is closed.");
+    return -1;
+  }
+  EngineWorker_t *w = &engine->workers[0];
+  for (int i = 1; i < engine->n_workers; i++)
+    if (engine->workers[i].n_active < w->n_active)
+      w = &engine->workers[i];
+
+  pthread_mutex_lock(&w->lock);
+  unsigned slot = 0;
+  while (slot < w->n_slots && w->slots[slot].obj)
+    slot++;
+  if (slot == w->n_slots) {
+    unsigned n = 2 * w->n_slots;
+    EngineSlot_t *slots = realloc(w->slots, n * sizeof(*slots));
+    if (!slots)
+      goto fail;
+    memset(slots + w->n_slots, 0, (n - w->n_slots) * sizeof(*slots));
+    w->slots = slots;
+    w->n_slots = n;
+  }
+  EngineSlot_t *s = &w->slots[slot];
+  bool sends = obj->DIRECTION != DIR_RECV;
+  struct epoll_event ev = {
+      .events = EPOLLIN, .data.u64 = engine_key(EV_SEND, slot, s->gen)};
+  if (sends) {
+    if (obj->send_buff.event_fd < 0 &&
+        (obj->send_buff.event_fd = eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC)) < 0)
+      goto fail;
+    sched_reset(&obj->sched, &obj->send_buff);
+    if (epoll_ctl(w->epoll_fd, EPOLL_CTL_ADD, obj->send_buff.event_fd, &ev) <
+        0)
+      goto fail;
+  }
+  // Send-only sockets are watched for EPOLLERR alone.
+  ev.events = obj->DIRECTION == DIR_SEND ? 0 : EPOLLIN;
+  ev.data.u64 = engine_key(EV_SOCK, slot, s->gen);
+  if (epoll_ctl(w->epoll_fd, EPOLL_CTL_ADD, obj->sock_fd, &ev) < 0) {
+    int err = errno;
+    if (sends)
+      epoll_ctl(w->epoll_fd, EPOLL_CTL_DEL, obj->send_buff.event_fd, NULL);
+    errno = err;
+    goto fail;
+  }
+  s->obj = obj;
+  s->next = LLONG_MAX;
+  w->n_active++;
+  obj->engine_worker = w;
+  obj->engine_slot = slot;
+  pthread_mutex_unlock(&w->lock);
+  if (sends) // pick up whatever was queued before start()
+    eventfd_write(obj->send_buff.event_fd, 1);
+  return 0;
+
+fail:
+  pthread_mutex_unlock(&w->lock);
+  PyErr_SetFromErrno(PyExc_OSError);
+  return -1;
+}
+
+/* Take an endpoint off its worker. Safe to call when not registered. */
+static void engine_unregister(RtUdp *obj) {
+  EngineWorker_t *w = obj->engine_worker;
+  if (!w)
+    return;
+  pthread_mutex_lock(&w->lock);
+  EngineSlot_t *s = &w->slots[obj->engine_slot];
+  if (obj->DIRECTION != DIR_RECV)
+    epoll_ctl(w->epoll_fd, EPOLL_CTL_DEL, obj->send_buff.event_fd, NULL);
+  if (obj->sock_fd >= 0) // gone from the set already if it was closed
+    epoll_ctl(w->epoll_fd, EPOLL_CTL_DEL, obj->sock_fd, NULL);
+  s->obj = NULL;
+  s->gen++;
+  s->next = LLONG_MAX;
+  w->n_active--;
+  pthread_mutex_unlock(&w->lock);
+  obj->engine_worker = NULL;
+}
+
+/* Stop and free the workers that were started. Only once no endpoint is
+ * registered. */
+static void engine_shutdown(RtUdpEngine *engine) {
+  for (int i = 0; i < engine->n_workers; i++) {
+    EngineWorker_t *w = &engine->workers[i];
+    if (w->thread) {
+      atomic_store(&w->running, false);
+      eventfd_write(w->ctl_fd, 1);
+      pthread_join(w->thread, NULL);
+    }
+    if (w->epoll_fd >= 0)
+      close(w->epoll_fd);
+    if (w->timer_fd >= 0)
+      close(w->timer_fd);
+    if (w->ctl_fd >= 0)
+      close(w->ctl_fd);
+    pthread_mutex_destroy(&w->lock);
+    free(w->slots);
+    free(w->timers);
+  }
+  free(engine->workers);
+  engine->workers = NULL;
+  engine->n_workers = 0;
+  engine->closed = true;
+}
+
+static int engine_worker_init(EngineWorker_t *w, int cpu) {
+  struct epoll_event ev = {.events = EPOLLIN};
 
-  return 0; // Success
+  w->cpu = cpu;
+  w->armed = LLONG_MAX;
+  atomic_init(&w->running, true);
+  pthread_mutex_init(&w->lock, NULL);
+  send_ctx_init(&w->send_ctx);
+  for (int i = 0; i < RX_BATCH_MAX; i++) {
+    w->rx_msgs[i].msg_hdr.msg_iov = &w->rx_iovs[i];
+    w->rx_msgs[i].msg_hdr.msg_iovlen = 1;
+    w->rx_msgs[i].msg_hdr.msg_control = w->rx_ctrl[i];
+  }
+  w->n_slots = 16;
+  w->slots = calloc(w->n_slots, sizeof(*w->slots));
+  w->timers_cap = 64;
+  w->timers = malloc(w->timers_cap * sizeof(*w->timers));
+  w->epoll_fd = epoll_create1(EPOLL_CLOEXEC);
+  w->timer_fd =
+      timerfd_create(CLOCK_MONOTONIC, TFD_NONBLOCK | TFD_CLOEXEC);
+  w->ctl_fd = eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC);
+  if (!w->slots || !w->timers)
+    errno = ENOMEM;
+  if (!w->slots || !w->timers || w->epoll_fd < 0 || w->timer_fd < 0 ||
+      w->ctl_fd < 0)
+    return -1;
+
+  ev.data.u64 = engine_key(EV_CTL, 0, 0);
+  if (epoll_ctl(w->epoll_fd, EPOLL_CTL_ADD, w->ctl_fd, &ev) < 0)
+    return -1;
+  ev.data.u64 = engine_key(EV_TIMER, 0, 0);
+  if (epoll_ctl(w->epoll_fd, EPOLL_CTL_ADD, w->timer_fd, &ev) < 0)
+    return -1;
+  return launch_worker(&w->thread, engine_worker, w, cpu);
 }
 
-void *send_worker(void *arg) {
-  RtUdp *obj = (RtUdp *)arg;
-  Packet_t next;
-  struct timespec time_spec;
+static int Engine_init(PyObject *self, PyObject *args, PyObject *kwds) {
+  RtUdpEngine *engine = (RtUdpEngine *)self;
+  int n_workers = 1;
+  PyObject *cpus = Py_None;
+  static char *kwlist[] = {"n_workers", "cpus", NULL};
 
-  while (obj->running) {
-    obj->stats.n_send_ticks++;
-    next = dequeue(&obj->send_buff, 100000000);
-    if (next.ts != -2) {               // timeout
-      time_spec = ts_from_ns(next.ts); // poll every 1ms
-      if (next.ts >= now_ns(CLOCK_MONOTONIC)) {
-        clock_nanosleep(CLOCK_MONOTONIC, TIMER_ABSTIME, &time_spec, NULL);
-      } else {
-        obj->stats.n_imediate_packets++;
-      }
-      int ret = sendto(obj->sock_fd, next.data, next.len, 0,
-                       (struct sockaddr *)&obj->remote_addr,
-                       sizeof(obj->remote_addr));
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "|iO", kwlist, &n_workers,
+                                   &cpus))
+    return -1;
+  if (engine->workers) {
+    PyErr_SetString(PyExc_ValueError, "Engine already initialised.");
+    return -1;
+  }
+  if (n_workers < 1 || n_workers > ENGINE_WORKERS_MAX) {
+    snprintf(buff, sizeof(buff), "n_workers must be between 1 and %d.",
+             ENGINE_WORKERS_MAX);
+    PyErr_SetString(PyExc_ValueError, buff);
+    return -1;
+  }
 
-      assert(ret < 0);
-      (void)ret;
+  int cpu[ENGINE_WORKERS_MAX];
+  for (int i = 0; i < n_workers; i++)
+    cpu[i] = -1;
+  if (cpus != Py_None) {
+    PyObject *seq = PySequence_Fast(cpus, "cpus must be a sequence of ints.");
+    if (!seq)
+      return -1;
+    if (PySequence_Fast_GET_SIZE(seq) != n_workers) {
+      Py_DECREF(seq);
+      PyErr_SetString(PyExc_ValueError,
+                      "cpus must have one entry per worker.");
+      return -1;
+    }
+    for (int i = 0; i < n_workers; i++) {
+      cpu[i] = PyLong_AsLong(PySequence_Fast_GET_ITEM(seq, i));
+      if (cpu[i] == -1 && PyErr_Occurred()) {
+        Py_DECREF(seq);
+        return -1;
+      }
+    }
+    Py_DECREF(seq);
+  }
 
-      long long send_time_ns = now_ns(CLOCK_MONOTONIC);
-      long long latency = send_time_ns - next.ts;
-      obj->stats.max_latency_ns = MAX(obj->stats.max_latency_ns, latency);
-      obj->stats.min_latency_ns = MIN(obj->stats.min_latency_ns, latency);
-      obj->stats.total_latency_ns += latency;
-      obj->stats.n_packets_sent++;
+  engine->workers = calloc(n_workers, sizeof(EngineWorker_t));
+  if (!engine->workers) {
+    PyErr_NoMemory();
+    return -1;
+  }
+  for (int i = 0; i < n_workers; i++) {
+    EngineWorker_t *w = &engine->workers[i];
+    w->epoll_fd = w->timer_fd = w->ctl_fd = -1;
+  }
+  engine->n_workers = n_workers;
+  engine->closed = false;
+  for (int i = 0; i < n_workers; i++) {
+    if (engine_worker_init(&engine->workers[i], cpu[i]) < 0) {
+      PyErr_SetFromErrno(PyExc_OSError);
+      Py_BEGIN_ALLOW_THREADS engine_shutdown(engine);
+      Py_END_ALLOW_THREADS return -1;
     }
   }
-  return NULL;
+  return 0;
 }
 
-void *receive_worker(void *arg) {
-  RtUdp *obj = (RtUdp *)arg;
-  Packet_t packet;
-  struct pollfd pfds;
-  pfds.fd = obj->sock_fd;
-  pfds.events = POLLIN;
-  struct sockaddr src_addr;
-  socklen_t addr_size = sizeof(src_addr);
+static PyObject *Engine_close(PyObject *self, PyObject *args) {
+  RtUdpEngine *engine = (RtUdpEngine *)self;
+  for (int i = 0; i < engine->n_workers; i++) {
+    if (engine->workers[i].n_active) {
+      PyErr_SetString(PyExc_ValueError,
+                      "Engine still serves running endpoints.");
+      return NULL;
+    }
+  }
+  Py_BEGIN_ALLOW_THREADS engine_shutdown(engine);
+  Py_END_ALLOW_THREADS Py_RETURN_NONE;
+}
 
-  while (obj->running) {
-    obj->stats.n_rec_ticks++;
-    int ready = poll(&pfds, 1, 10); // 1ms timeout
-    assert(ready != -1);
-    if (ready == 0) { // timout
-      continue;
-    } else { // ready
-      if (pfds.revents & POLLIN) {
-        packet.len = recvfrom(pfds.fd, &packet.data, sizeof(packet.data), 0,
-                              &src_addr, &addr_size);
-        packet.ts = now_ns(CLOCK_MONOTONIC);
-        obj->stats.n_packets_rec++;
-        assert(packet.len > 0);
-        if (queue_is_full(&obj->rec_buff)) {
-          (void)dequeue(&obj->rec_buff, 0); // drop oldest packet
-          obj->stats.n_rx_packets_dropped++;
-        }
-        enqueue(&obj->rec_buff, packet);
-      } else { /* POLLERR | POLLHUP */
-        assert(close(pfds.fd) == -1);
-        return NULL;
-      }
+static PyObject *Engine_get_stats(PyObject *self, PyObject *args) {
+  RtUdpEngine *engine = (RtUdpEngine *)self;
+  PyObject *list = PyList_New(engine->n_workers);
+  if (!list)
+    return NULL;
+  for (int i = 0; i < engine->n_workers; i++) {
+    EngineWorker_t *w = &engine->workers[i];
+    pthread_mutex_lock(&w->lock);
+    PyObject *d = Py_BuildValue(
+        "{s:i,s:I,s:n,s:n,s:n}", "cpu", w->cpu, "n_endpoints", w->n_active,
+        "n_wakeups", (Py_ssize_t)w->n_wakeups, "n_events",
+        (Py_ssize_t)w->n_events, "n_timer_fires",
+        (Py_ssize_t)w->n_timer_fires);
+    pthread_mutex_unlock(&w->lock);
+    if (!d) {
+      Py_DECREF(list);
+      return NULL;
     }
+    PyList_SET_ITEM(list, i, d);
   }
-  // long long monotinoc_timestamp = nic_2_monotonic_ts(obj, nic_timestamp); //
-  // TODO: Move to hardware time-stamps.
-  return NULL;
+  return list;
 }
 
-static PyObject *start(PyObject *self, PyObject *args) {
-  struct sched_param param;
-  param.sched_priority = 80;
-  int policy = SCHED_FIFO;
+static void Engine_dealloc(PyObject *self) {
+  // Endpoints hold a reference, so none is registered any more.
+  engine_shutdown((RtUdpEngine *)self);
+  Py_TYPE(self)->tp_free(self);
+}
+
+static PyMethodDef Engine_methods[] = {
+    {"close", Engine_close, METH_NOARGS,
+     "Stop the worker threads. Endpoints must be stopped first."},
+    {"get_stats", Engine_get_stats, METH_NOARGS,
+     "Per-worker counters as a list of dicts."},
+    {NULL} // Sentinel
+};
+
+static PyTypeObject EngineType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "rtudp._RtUdpEngine",
+    .tp_basicsize = sizeof(RtUdpEngine),
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_doc = "Worker threads shared by many sockets",
+    .tp_methods = Engine_methods,
+    .tp_new = PyType_GenericNew,
+    .tp_init = Engine_init,
+    .tp_dealloc = Engine_dealloc,
+};
+
+/* Signal the workers to exit and wait for them. Safe to call repeatedly. */
+static void join_workers(RtUdp *obj) {
+  obj->running = false;
+  engine_unregister(obj);
+  if (obj->send_worker) {
+    buff_interrupt(&obj->send_buff); // it may be waiting on a far deadline
+    pthread_join(obj->send_worker, NULL);
+    obj->send_worker = 0;
+  }
+  if (obj->receive_worker) {
+    pthread_join(obj->receive_worker, NULL);
+    obj->receive_worker = 0;
+  }
+  capture_stop(obj);
+}
 
+static PyObject *start(PyObject *self, PyObject *args) {
   RtUdp *obj = (RtUdp *)self;
 
   if (obj->running) {
@@ -407,63 +3874,170 @@ static PyObject *start(PyObject *self, PyObject *args) {
   }
 
   obj->running = true;
+  obj->send_buff.ctl->interrupted = false;
+  if (capture_start(obj) < 0)
+    goto fail;
 
-  pthread_t *thread;
+  if (obj->engine) {
+    if (engine_register((RtUdpEngine *)obj->engine, obj) < 0) {
+      obj->running = false;
+      return NULL;
+    }
+    Py_RETURN_NONE;
+  }
 
-  void *(*worker)(void *);
+  // Full duplex runs both workers on the one socket, each on its own cpu.
+  if (obj->DIRECTION != DIR_RECV &&
+      launch_worker(&obj->send_worker, send_worker, (void *)obj, obj->cpu) <
+          0)
+    goto fail;
+  if (obj->DIRECTION != DIR_SEND &&
+      launch_worker(&obj->receive_worker, receive_worker, (void *)obj,
+                    obj->rx_cpu >= 0 ? obj->rx_cpu : obj->cpu) < 0)
+    goto fail;
 
-  if (obj->DIRECTION == DIR_RECV) {
-    thread = &obj->receive_worker;
-    worker = receive_worker;
-  } else if (obj->DIRECTION == DIR_SEND) {
-    thread = &obj->send_worker;
-    worker = send_worker;
-  } else {
-    perror("Unsupported direction");
-    return PyErr_SetFromErrno(PyExc_ValueError);
-  }
+  Py_RETURN_NONE;
 
-  // Create the thread
-  if (pthread_create(thread, NULL, worker, (void *)obj) != 0) {
-    perror("pthread_create worker");
-    return PyErr_SetFromErrno(PyExc_OSError);
-  }
+fail:
+  PyErr_SetFromErrno(PyExc_OSError);
+  join_workers(obj);
+  return NULL;
+}
+
+static PyObject *stop(PyObject *self, PyObject *args) {
 
-  if (obj->cpu >= 0) {
+  RtUdp *obj = (RtUdp *)self;
 
-    // Pin the thread to the selected cpu
-    cpu_set_t cpuset;
-    CPU_ZERO(&cpuset);
-    CPU_SET(obj->cpu, &cpuset);
+  Py_BEGIN_ALLOW_THREADS join_workers(obj);
+  Py_END_ALLOW_THREADS Py_RETURN_NONE;
+}
 
-    // For current thread
-    int ret = sched_setaffinity(0, sizeof(cpuset), &cpuset);
-    if (ret != 0) {
-      perror("sched_setaffinity");
-      return PyErr_SetFromErrno(PyExc_OSError);
+/* Send one NETLINK_ROUTE request and hand each reply to fn until fn returns
+ * nonzero or the kernel is done. Returns fn's nonzero result, 0 if there was
+ * none, or -1 on error. */
+static int nl_request(struct nlmsghdr *req,
+                      int (*fn)(struct nlmsghdr *, void *), void *arg) {
+  struct sockaddr_nl kernel = {.nl_family = AF_NETLINK};
+  long buf[4096];
+  int ret = -1;
+  int fd = socket(AF_NETLINK, SOCK_RAW | SOCK_CLOEXEC, NETLINK_ROUTE);
+  if (fd < 0)
+    return -1;
+  if (sendto(fd, req, req->nlmsg_len, 0, (struct sockaddr *)&kernel,
+             sizeof(kernel)) < 0)
+    goto out;
+  for (;;) {
+    ssize_t len = recv(fd, buf, sizeof(buf), 0);
+    if (len <= 0)
+      goto out;
+    for (struct nlmsghdr *h = (struct nlmsghdr *)buf; NLMSG_OK(h, len);
+         h = NLMSG_NEXT(h, len)) {
+      if (h->nlmsg_type == NLMSG_ERROR)
+        goto out;
+      if (h->nlmsg_type == NLMSG_DONE) {
+        ret = 0;
+        goto out;
+      }
+      if ((ret = fn(h, arg)) != 0 || !(h->nlmsg_flags & NLM_F_MULTI))
+        goto out;
     }
   }
+out:
+  close(fd);
+  return ret;
+}
 
-  if (pthread_setschedparam(*thread, policy, &param) != 0) {
-    perror("pthread_setschedparam");
-    return PyErr_SetFromErrno(PyExc_OSError);
+/* nl_request() callback: the output interface of a route into *arg. */
+static int nl_route_oif(struct nlmsghdr *h, void *arg) {
+  if (h->nlmsg_type != RTM_NEWROUTE)
+    return 0;
+  int len = RTM_PAYLOAD(h);
+  for (struct rtattr *a = RTM_RTA(NLMSG_DATA(h)); RTA_OK(a, len);
+       a = RTA_NEXT(a, len)) {
+    if (a->rta_type == RTA_OIF) {
+      memcpy(arg, RTA_DATA(a), sizeof(int));
+      return 1;
+    }
   }
+  return 0;
+}
 
-  Py_RETURN_NONE;
+/* nl_request() callback: whether a qdisc on interface *arg holds packets
+ * until their SO_TXTIME launch time. */
+static int nl_qdisc_paces(struct nlmsghdr *h, void *arg) {
+  struct tcmsg *tc = NLMSG_DATA(h);
+  if (h->nlmsg_type != RTM_NEWQDISC || tc->tcm_ifindex != *(int *)arg)
+    return 0;
+  int len = TCA_PAYLOAD(h);
+  for (struct rtattr *a = TCA_RTA(tc); RTA_OK(a, len); a = RTA_NEXT(a, len)) {
+    if (a->rta_type == TCA_KIND &&
+        (strcmp(RTA_DATA(a), "fq") == 0 || strcmp(RTA_DATA(a), "etf") == 0))
+      return 1;
+  }
+  return 0;
 }
 
-static PyObject *stop(PyObject *self, PyObject *args) {
+/* Whether the interface routing to addr has an fq or etf qdisc. SO_TXTIME
+ * is accepted on any socket, but other qdiscs (noqueue on loopback,
+ * pfifo_fast, ...) ignore the launch time and send at once. */
+static bool txtime_qdisc(const struct sockaddr_in *addr) {
+  struct {
+    struct nlmsghdr nh;
+    struct rtmsg rt;
+    char attrs[RTA_SPACE(sizeof(struct in_addr))];
+  } route = {0};
+  struct {
+    struct nlmsghdr nh;
+    struct tcmsg tc;
+  } dump = {0};
+  int ifindex = 0;
 
-  RtUdp *obj = (RtUdp *)self;
+  route.nh.nlmsg_type = RTM_GETROUTE;
+  route.nh.nlmsg_flags = NLM_F_REQUEST;
+  route.rt.rtm_family = AF_INET;
+  route.rt.rtm_dst_len = 32;
+  struct rtattr *dst = (struct rtattr *)route.attrs;
+  dst->rta_type = RTA_DST;
+  dst->rta_len = RTA_LENGTH(sizeof(addr->sin_addr));
+  memcpy(RTA_DATA(dst), &addr->sin_addr, sizeof(addr->sin_addr));
+  route.nh.nlmsg_len =
+      NLMSG_LENGTH(sizeof(struct rtmsg)) + RTA_SPACE(sizeof(addr->sin_addr));
+  if (nl_request(&route.nh, nl_route_oif, &ifindex) != 1)
+    return false;
 
-  obj->running = false;
-  if (obj->send_worker)
-    if (pthread_join(obj->send_worker, NULL) < 0)
-      return PyErr_SetFromErrno(PyExc_OSError);
-  if (obj->receive_worker)
-    if (pthread_join(obj->receive_worker, NULL) < 0)
-      return PyErr_SetFromErrno(PyExc_OSError);
-  Py_RETURN_NONE;
+  dump.nh.nlmsg_len = NLMSG_LENGTH(sizeof(struct tcmsg));
+  dump.nh.nlmsg_type = RTM_GETQDISC;
+  dump.nh.nlmsg_flags = NLM_F_REQUEST | NLM_F_DUMP;
+  dump.tc.tcm_family = AF_UNSPEC;
+  return nl_request(&dump.nh, nl_qdisc_paces, &ifindex) == 1;
+}
+
+/* Give the reuseport group a cBPF program that picks the shard by socket
+ * index, i.e. bind order. Every shard attaches the same program. */
+static int attach_steering(RtUdp *obj) {
+  uint32_t load;
+  switch (obj->steer) {
+  case STEER_HASH:
+    return 0;
+  case STEER_CPU:
+    load = SKF_AD_OFF + SKF_AD_CPU;
+    break;
+  case STEER_RANDOM:
+    load = SKF_AD_OFF + SKF_AD_RANDOM;
+    break;
+  default: // STEER_PAYLOAD: the UDP header is already pulled
+    load = 0;
+    break;
+  }
+  struct sock_filter code[] = {
+      BPF_STMT(BPF_LD | BPF_W | BPF_ABS, load),
+      BPF_STMT(BPF_ALU | BPF_MOD | BPF_K, obj->shards),
+      BPF_STMT(BPF_RET | BPF_A, 0),
+  };
+  struct sock_fprog prog = {.len = sizeof(code) / sizeof(code[0]),
+                            .filter = code};
+  return setsockopt(obj->sock_fd, SOL_SOCKET, SO_ATTACH_REUSEPORT_CBPF, &prog,
+                    sizeof(prog));
 }
 
 static PyObject *init_socket(PyObject *self, PyObject *args) {
@@ -497,13 +4071,84 @@ static PyObject *init_socket(PyObject *self, PyObject *args) {
     return NULL;
   }
 
+  if (obj->gso_size &&
+      setsockopt(obj->sock_fd, SOL_UDP, UDP_SEGMENT, &obj->gso_size,
+                 sizeof(obj->gso_size)) < 0) {
+    PyErr_SetString(PyExc_OSError,
+                    "Failed to configure socket (UDP_SEGMENT).");
+    return NULL;
+  }
+  if (obj->gro && setsockopt(obj->sock_fd, SOL_UDP, UDP_GRO, &optval,
+                             sizeof(optval)) < 0) {
+    PyErr_SetString(PyExc_OSError, "Failed to configure socket (UDP_GRO).");
+    return NULL;
+  }
+
+  if (obj->timestamping) {
+    // OPT_ID numbers datagrams from 0 on this socket, matching tx_id.
+    int flags = SOF_TIMESTAMPING_SOFTWARE | SOF_TIMESTAMPING_RX_SOFTWARE |
+                SOF_TIMESTAMPING_TX_SOFTWARE | SOF_TIMESTAMPING_OPT_ID |
+                SOF_TIMESTAMPING_OPT_TSONLY;
+    if (setsockopt(obj->sock_fd, SOL_SOCKET, SO_TIMESTAMPING, &flags,
+                   sizeof(flags)) < 0) {
+      PyErr_SetString(PyExc_OSError,
+                      "Failed to configure socket (SO_TIMESTAMPING).");
+      return NULL;
+    }
+    obj->tx_id = 0;
+  }
+
+  obj->txtime_active = 0;
+  if (obj->txtime) {
+    struct sock_txtime cfg = {.clockid = CLOCK_MONOTONIC, .flags = 0};
+    if (setsockopt(obj->sock_fd, SOL_SOCKET, SO_TXTIME, &cfg, sizeof(cfg)) <
+        0) {
+      if (PyErr_WarnEx(PyExc_RuntimeWarning,
+                       "SO_TXTIME unavailable, sleeping until deadlines.",
+                       1) < 0)
+        return NULL;
+    } else if (!txtime_qdisc(&obj->remote_addr)) {
+      if (PyErr_WarnEx(PyExc_RuntimeWarning,
+                       "No fq or etf qdisc on the route to the peer, SO_TXTIME "
+                       "would send early. Sleeping until deadlines.",
+                       1) < 0)
+        return NULL;
+    } else {
+      obj->txtime_active = 1;
+    }
+  }
+
+  if (obj->busy_poll) {
+    // The kernel's own busy loop, run by each non-blocking receive. Raising
+    // it above net.core.busy_read takes CAP_NET_ADMIN.
+    int usec = (obj->busy_poll + 999) / 1000;
+    int prefer = 1;
+    if (setsockopt(obj->sock_fd, SOL_SOCKET, SO_BUSY_POLL, &usec,
+                   sizeof(usec)) < 0 ||
+        setsockopt(obj->sock_fd, SOL_SOCKET, SO_PREFER_BUSY_POLL, &prefer,
+                   sizeof(prefer)) < 0) {
+      if (PyErr_WarnEx(PyExc_RuntimeWarning,
+                       "SO_BUSY_POLL unavailable, spinning in user space "
+                       "only.",
+                       1) < 0)
+        return NULL;
+    }
+  }
+
   if (bind(obj->sock_fd, (struct sockaddr *)&obj->local_addr,
            sizeof(obj->local_addr)) < 0) {
     PyErr_SetString(PyExc_OSError, "Failed to Bind");
     return NULL;
   }
 
-  if (obj->DIRECTION == DIR_RECV) {
+  // A connected socket takes its peer's datagrams ahead of the reuseport
+  // group, so shards stay unconnected and receive from anyone.
+  if (obj->shards && attach_steering(obj) < 0) {
+    PyErr_SetString(PyExc_OSError,
+                    "Failed to configure socket (SO_ATTACH_REUSEPORT_CBPF).");
+    return NULL;
+  }
+  if (obj->DIRECTION != DIR_SEND && !obj->shards) {
     if (connect(obj->sock_fd, (struct sockaddr *)&obj->remote_addr,
                 sizeof(obj->remote_addr)) < 0) {
       PyErr_SetString(PyExc_OSError, "Failed to connect");
@@ -516,7 +4161,7 @@ static PyObject *init_socket(PyObject *self, PyObject *args) {
 
 static PyObject *get_send_length(PyObject *self, PyObject *args) {
   RtUdp *obj = (RtUdp *)self;
-  unsigned ret = length(&obj->send_buff);
+  unsigned ret = sched_pending(&obj->sched, &obj->send_buff);
   return PyLong_FromLongLong(ret);
 }
 
@@ -526,126 +4171,520 @@ static PyObject *get_receive_length(PyObject *self, PyObject *args) {
   return PyLong_FromLongLong(ret);
 }
 
+/* Get a C-contiguous buffer of native 64-bit integers (an array('q'), an
+ * int64 NumPy array, ...). */
+static int get_int64_buffer(PyObject *src, Py_buffer *view, int flags,
+                            const char *name) {
+  if (PyObject_GetBuffer(src, view,
+                         flags | PyBUF_FORMAT | PyBUF_C_CONTIGUOUS) < 0)
+    return -1;
+
+  const char *fmt = view->format ? view->format : "B";
+  if (*fmt == '@' || *fmt == '=' || *fmt == '<')
+    fmt++;
+  if (view->itemsize != 8 || strlen(fmt) != 1 || !strchr("qQlLnN", *fmt)) {
+    PyBuffer_Release(view);
+    snprintf(buff, sizeof(buff), "%s must be a buffer of 64-bit integers.",
+             name);
+    PyErr_SetString(PyExc_TypeError, buff);
+    return -1;
+  }
+  return 0;
+}
+
+typedef enum {
+  ROOM_OK,      // the packet fits now
+  ROOM_DROP,    // drop the packet (BP_DROP_NEWEST), already counted
+  ROOM_FULL,    // BP_RAISE
+  ROOM_TIMEOUT, // BP_BLOCK ran out of send_timeout
+} ROOM_t;
+
+/* Producer, with the producer lock held: make room for a len-byte packet in
+ * send_buff according to the backpressure policy. May block, so call it
+ * without the GIL. */
+static ROOM_t send_make_room(RtUdp *obj, size_t len) {
+  Ringbuffer *ring = &obj->send_buff;
+  PacketRef_t ref;
+
+  if (has_room(ring, write_cursor(ring), len))
+    return ROOM_OK;
+  switch (obj->backpressure) {
+  case BP_DROP_NEWEST:
+    stat_count(stats_of(obj, STATS_API), ST_N_TX_PACKETS_DROPPED, 1);
+    return ROOM_DROP;
+  case BP_DROP_OLDEST:
+    consumer_lock(ring);
+    while (!has_room(ring, write_cursor(ring), len) &&
+           drop_oldest_locked(ring, &ref)) {
+      if (*record_flags(ring, &ref) & RECORD_DONE) // sent, held for order
+        atomic_fetch_sub_explicit(&obj->sched.n_held, 1, memory_order_relaxed);
+      else
+        stat_count(stats_of(obj, STATS_API), ST_N_TX_PACKETS_DROPPED, 1);
+    }
+    consumer_unlock(ring);
+    return ROOM_OK;
+  case BP_RAISE:
+    return ROOM_FULL;
+  default:
+    if (obj->send_timeout < 0) {
+      wait_not_full(ring, len);
+      return ROOM_OK;
+    }
+    return wait_not_full_until(ring, len,
+                               now_ns(CLOCK_MONOTONIC) + obj->send_timeout)
+               ? ROOM_OK
+               : ROOM_TIMEOUT;
+  }
+}
+
+static void set_room_error(ROOM_t room) {
+  if (room == ROOM_FULL)
+    PyErr_SetString(PyExc_BlockingIOError, "Send queue is full.");
+  else
+    PyErr_SetString(PyExc_TimeoutError,
+                    "Timed out waiting for room in the send queue.");
+}
+
 static PyObject *send_data(PyObject *self, PyObject *args) {
   const char *buf;
-  Packet_t packet;
+  Py_ssize_t len;
+  long long ts = 0; // no timestamp: send straight away
 
-  if (!PyArg_ParseTuple(args, "y#|L", &buf, &packet.len, &packet.ts))
+  if (!PyArg_ParseTuple(args, "y#|L", &buf, &len, &ts))
     return NULL;
 
-  assert(packet.len <= sizeof(packet.data));
-  if (!memcpy(&packet.data, buf, packet.len))
-    return PyErr_SetFromErrno(PyExc_BufferError);
-
   RtUdp *obj = (RtUdp *)self;
-  if (length(&obj->send_buff) >= obj->send_buff.capacity) {
-    PyErr_SetFromErrno(PyExc_BufferError);
+  if (len > obj->max_payload) {
+    snprintf(buff, sizeof(buff), "Packet exceeds %d bytes.", obj->max_payload);
+    PyErr_SetString(PyExc_ValueError, buff);
     return NULL;
   }
 
-  if (!enqueue(&obj->send_buff, packet)) {
-    PyErr_SetFromErrno(PyExc_BlockingIOError);
+  Ringbuffer *ring = &obj->send_buff;
+  ROOM_t room = ROOM_OK;
+  producer_lock_gil(ring);
+  if (!enqueue(ring, buf, len, ts)) {
+    Py_BEGIN_ALLOW_THREADS room = send_make_room(obj, len);
+    if (room == ROOM_OK)
+      enqueue(ring, buf, len, ts);
+    Py_END_ALLOW_THREADS
+  }
+  producer_unlock(ring);
+  if (room == ROOM_FULL || room == ROOM_TIMEOUT) {
+    set_room_error(room);
     return NULL;
   }
-  obj->stats.n_packets_req++;
+  stat_count(stats_of(obj, STATS_API), ST_N_PACKETS_REQ, 1);
   Py_RETURN_NONE;
 }
 
+static PyObject *send_batch(PyObject *self, PyObject *args) {
+  PyObject *packets;
+  PyObject *seq;
+  PyObject *ret = NULL;
+  const char *buf;
+  Py_ssize_t len;
+  long long ts;
+
+  if (!PyArg_ParseTuple(args, "O", &packets))
+    return NULL;
+
+  // Snapshot the sequence so it cannot change under us while the GIL is out.
+  seq = PySequence_Tuple(packets);
+  if (!seq)
+    return NULL;
+
+  RtUdp *obj = (RtUdp *)self;
+  Ringbuffer *ring = &obj->send_buff;
+  Py_ssize_t n_packets = PyTuple_GET_SIZE(seq);
+  Py_ssize_t i = 0;
+  size_t n = 0;
+  producer_lock_gil(ring);
+  size_t cursor = write_cursor(ring);
+
+  // Fill the ring in place and publish everything written in one go.
+  while (i < n_packets) {
+    if (!PyArg_ParseTuple(PyTuple_GET_ITEM(seq, i), "y#L", &buf, &len, &ts))
+      goto done;
+    if (len > obj->max_payload) {
+      snprintf(buff, sizeof(buff), "Packet %zd exceeds %d bytes.", i,
+               obj->max_payload);
+      PyErr_SetString(PyExc_ValueError, buff);
+      goto done;
+    }
+
+    char *dst = reserve(ring, &cursor, len);
+    if (dst == NULL) {
+      ROOM_t room;
+      publish(ring, cursor, n);
+      stat_count(stats_of(obj, STATS_API), ST_N_PACKETS_REQ, n);
+      n = 0;
+      Py_BEGIN_ALLOW_THREADS room = send_make_room(obj, len);
+      Py_END_ALLOW_THREADS cursor = write_cursor(ring);
+      if (room == ROOM_DROP) {
+        stat_count(stats_of(obj, STATS_API), ST_N_PACKETS_REQ, 1);
+        i++;
+      } else if (room != ROOM_OK) {
+        set_room_error(room);
+        goto done;
+      }
+      continue;
+    }
+    memcpy(dst, buf, len);
+    commit(ring, &cursor, len, ts);
+    n++;
+    i++;
+  }
+  ret = Py_None;
+  Py_INCREF(ret);
+
+done:
+  publish(ring, cursor, n);
+  producer_unlock(ring);
+  stat_count(stats_of(obj, STATS_API), ST_N_PACKETS_REQ, n);
+  Py_DECREF(seq);
+  return ret;
+}
+
+static PyObject *send_from(PyObject *self, PyObject *args, PyObject *kwds) {
+  PyObject *buf_obj, *len_obj, *ts_obj;
+  PyObject *off_obj = Py_None;
+  Py_buffer data, lens, stamps;
+  Py_buffer offs = {0};
+  PyObject *ret = NULL;
+
+  static char *kwlist[] = {"buffer", "lengths", "timestamps", "offsets", NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "OOO|O", kwlist, &buf_obj,
+                                   &len_obj, &ts_obj, &off_obj))
+    return NULL;
+
+  if (PyObject_GetBuffer(buf_obj, &data, PyBUF_C_CONTIGUOUS) < 0)
+    return NULL;
+  if (get_int64_buffer(len_obj, &lens, 0, "lengths") < 0)
+    goto release_data;
+  if (get_int64_buffer(ts_obj, &stamps, 0, "timestamps") < 0)
+    goto release_lens;
+  if (off_obj != Py_None &&
+      get_int64_buffer(off_obj, &offs, 0, "offsets") < 0)
+    goto release_stamps;
+
+  size_t n_packets = lens.len / sizeof(long long);
+  const long long *in_len = lens.buf;
+  const long long *in_ts = stamps.buf;
+  const long long *in_off = offs.buf; // NULL: payloads packed back to back
+
+  if ((size_t)stamps.len != (size_t)lens.len ||
+      (in_off && (size_t)offs.len != (size_t)lens.len)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "lengths, timestamps and offsets must be the same size.");
+    goto release_all;
+  }
+
+  // Validate everything up front so nothing is queued for a bad request.
+  RtUdp *obj = (RtUdp *)self;
+  long long offset = 0;
+  for (size_t i = 0; i < n_packets; i++) {
+    if (in_off)
+      offset = in_off[i];
+    if (in_len[i] < 0 || in_len[i] > obj->max_payload || offset < 0 ||
+        offset + in_len[i] > data.len) {
+      snprintf(buff, sizeof(buff), "Packet %zu is out of bounds.", i);
+      PyErr_SetString(PyExc_ValueError, buff);
+      goto release_all;
+    }
+    offset += in_len[i];
+  }
+
+  Ringbuffer *ring = &obj->send_buff;
+  const char *in = data.buf;
+  ROOM_t room = ROOM_OK;
+  size_t i = 0;
+
+  Py_BEGIN_ALLOW_THREADS producer_lock(ring);
+  size_t cursor = write_cursor(ring);
+  size_t n = 0;
+  offset = 0;
+  while (i < n_packets) {
+    if (in_off)
+      offset = in_off[i];
+    char *dst = reserve(ring, &cursor, in_len[i]);
+    if (dst == NULL) {
+      publish(ring, cursor, n);
+      n = 0;
+      room = send_make_room(obj, in_len[i]);
+      cursor = write_cursor(ring);
+      if (room == ROOM_DROP) {
+        offset += in_len[i];
+        i++;
+      } else if (room != ROOM_OK) {
+        break;
+      }
+      continue;
+    }
+    memcpy(dst, in + offset, in_len[i]);
+    commit(ring, &cursor, in_len[i], in_ts[i]);
+    offset += in_len[i];
+    n++;
+    i++;
+  }
+  publish(ring, cursor, n);
+  producer_unlock(ring);
+  Py_END_ALLOW_THREADS
+
+      stat_count(stats_of(obj, STATS_API), ST_N_PACKETS_REQ, i);
+  if (room == ROOM_FULL || room == ROOM_TIMEOUT) {
+    set_room_error(room);
+    goto release_all;
+  }
+  ret = Py_None;
+  Py_INCREF(ret);
+
+release_all:
+  if (in_off)
+    PyBuffer_Release(&offs);
+release_stamps:
+  PyBuffer_Release(&stamps);
+release_lens:
+  PyBuffer_Release(&lens);
+release_data:
+  PyBuffer_Release(&data);
+  return ret;
+}
+
+/* Consumer: keep the rec_buff eventfd readable while packets are queued.
+ * Once the ring runs empty the eventfd is cleared and the consumer parks on
+ * not_empty, so the next publish() signals it again. */
+static void rx_event_rearm(RtUdp *obj) {
+  Ringbuffer *ring = &obj->rec_buff;
+  if (ring->event_fd >= 0 && queue_is_empty(ring))
+    buff_event_arm(ring, read_cursor(ring));
+}
+
+static PyObject *RtUdp_fileno(PyObject *self, PyObject *args) {
+  RtUdp *obj = (RtUdp *)self;
+  Ringbuffer *ring = &obj->rec_buff;
+  if (ring->event_fd < 0) {
+    int fd = eventfd(1, EFD_NONBLOCK | EFD_CLOEXEC);
+    if (fd < 0)
+      return PyErr_SetFromErrno(PyExc_OSError);
+    ring->event_fd = fd;
+    rx_event_rearm(obj);
+  }
+  return PyLong_FromLong(ring->event_fd);
+}
+
+/* Consumer: wait up to timeout_ns for a packet and take the consumer lock,
+ * without the GIL (call within Py_BEGIN_ALLOW_THREADS). Another consumer,
+ * a ShmRing process or the receive worker's drop_oldest(), may empty the
+ * ring before the lock is ours, so the wait goes on for the time left.
+ * Returns false on timeout, without the lock. */
+static bool wait_not_empty_locked(Ringbuffer *ring, long long timeout_ns) {
+  long long now = now_ns(CLOCK_MONOTONIC);
+  long long deadline =
+      timeout_ns > LLONG_MAX - now ? LLONG_MAX : now + timeout_ns;
+  for (;;) {
+    if (!wait_not_empty(ring, MAX(deadline - now, 0)))
+      return false;
+    consumer_lock(ring);
+    if (!queue_is_empty(ring))
+      return true;
+    consumer_unlock(ring);
+    now = now_ns(CLOCK_MONOTONIC);
+  }
+}
+
 static PyObject *receive_data(PyObject *self, PyObject *args) {
   long long timeout;
-  Packet_t packet;
+  PacketRef_t packet;
   if (!PyArg_ParseTuple(args, "L", &timeout))
     return NULL;
+  if (timeout < 0) {
+    PyErr_SetString(PyExc_ValueError, "timeout_ns must be positive.");
+    return NULL;
+  }
   RtUdp *obj = (RtUdp *)self;
-  packet = dequeue(&obj->rec_buff, timeout);
-  if (packet.ts == -2) {
+  Ringbuffer *ring = &obj->rec_buff;
+  bool ready;
+  Py_BEGIN_ALLOW_THREADS ready = wait_not_empty_locked(ring, timeout);
+  Py_END_ALLOW_THREADS
+
+      size_t cursor = read_cursor(ring);
+  if (!ready || !peek(ring, &cursor, &packet)) {
+    if (ready)
+      consumer_unlock(ring);
     PyErr_SetString(PyExc_TimeoutError, "Receive timed out");
     return NULL;
   }
-  PyObject *result = Py_BuildValue("y#L", &packet.data, packet.len, packet.ts);
+  PyObject *result =
+      Py_BuildValue("y#L", packet.data, (Py_ssize_t)packet.len, packet.ts);
+  release(ring, cursor, 1);
+  consumer_unlock(ring);
+  rx_event_rearm(obj);
   return result;
 }
 
-static PyObject *create_packet_tuple_list(Packet_t packet[], size_t n_packets) {
-  PyObject *list = PyList_New(n_packets);
-  if (!list)
+static PyObject *receive_into(PyObject *self, PyObject *args) {
+  PyObject *buf_obj, *len_obj, *ts_obj;
+  Py_buffer data, lens, stamps;
+  long long timeout;
+  size_t n = 0;
+  bool timed_out = false;
+
+  if (!PyArg_ParseTuple(args, "OOOL", &buf_obj, &len_obj, &ts_obj, &timeout))
+    return NULL;
+  if (timeout < 0) {
+    PyErr_SetString(PyExc_ValueError, "timeout_ns must be positive.");
     return NULL;
+  }
 
-  for (size_t i = 0; i < n_packets; ++i) {
-    PyObject *py_data =
-        PyBytes_FromStringAndSize(packet[i].data, packet[i].len);
-    PyObject *py_ts = PyLong_FromLongLong(packet[i].ts);
-    if (!py_data || !py_ts) {
-      Py_XDECREF(py_data);
-      Py_XDECREF(py_ts);
-      Py_DECREF(list);
-      return NULL;
-    }
+  if (PyObject_GetBuffer(buf_obj, &data,
+                         PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS) < 0)
+    return NULL;
+  if (get_int64_buffer(len_obj, &lens, PyBUF_WRITABLE, "lengths") < 0) {
+    PyBuffer_Release(&data);
+    return NULL;
+  }
+  if (get_int64_buffer(ts_obj, &stamps, PyBUF_WRITABLE, "timestamps") < 0) {
+    PyBuffer_Release(&data);
+    PyBuffer_Release(&lens);
+    return NULL;
+  }
 
-    PyObject *tuple = PyTuple_New(2);
-    if (!tuple) {
-      Py_DECREF(py_data);
-      Py_DECREF(py_ts);
-      Py_DECREF(list);
-      return NULL;
+  RtUdp *obj = (RtUdp *)self;
+  Ringbuffer *ring = &obj->rec_buff;
+  size_t n_max = MIN(lens.len, stamps.len) / sizeof(long long);
+  long long *out_len = lens.buf;
+  long long *out_ts = stamps.buf;
+  char *out = data.buf;
+
+  Py_BEGIN_ALLOW_THREADS if (!wait_not_empty_locked(ring, timeout)) {
+    timed_out = true;
+  }
+  else {
+    // Payloads are packed back to back until the buffer or the arrays fill.
+    size_t cursor = read_cursor(ring);
+    size_t offset = 0;
+    PacketRef_t packet;
+    while (n < n_max) {
+      size_t next = cursor;
+      if (!peek(ring, &next, &packet) ||
+          offset + packet.len > (size_t)data.len)
+        break;
+      memcpy(out + offset, packet.data, packet.len);
+      offset += packet.len;
+      out_len[n] = packet.len;
+      out_ts[n] = packet.ts;
+      cursor = next;
+      n++;
     }
+    release(ring, cursor, n);
+    consumer_unlock(ring);
+  }
+  Py_END_ALLOW_THREADS
+
+      rx_event_rearm(obj);
+  PyBuffer_Release(&data);
+  PyBuffer_Release(&lens);
+  PyBuffer_Release(&stamps);
+
+  if (timed_out) {
+    PyErr_SetString(PyExc_TimeoutError, "Receive timed out");
+    return NULL;
+  }
+  if (n == 0) {
+    PyErr_SetString(PyExc_ValueError,
+                    "Buffer too small for the next packet.");
+    return NULL;
+  }
+  return PyLong_FromSize_t(n);
+}
 
-    PyTuple_SET_ITEM(tuple, 0, py_data); // steals reference
-    PyTuple_SET_ITEM(tuple, 1, py_ts);   // steals reference
+static PyObject *create_packet_tuple(const PacketRef_t *packet) {
+  PyObject *py_data = PyBytes_FromStringAndSize(packet->data, packet->len);
+  PyObject *py_ts = PyLong_FromLongLong(packet->ts);
+  if (!py_data || !py_ts) {
+    Py_XDECREF(py_data);
+    Py_XDECREF(py_ts);
+    return NULL;
+  }
 
-    PyList_SET_ITEM(list, i, tuple); // steals reference
+  PyObject *tuple = PyTuple_New(2);
+  if (!tuple) {
+    Py_DECREF(py_data);
+    Py_DECREF(py_ts);
+    return NULL;
   }
 
-  return list;
+  PyTuple_SET_ITEM(tuple, 0, py_data); // steals reference
+  PyTuple_SET_ITEM(tuple, 1, py_ts);   // steals reference
+  return tuple;
 }
 
 static PyObject *RtUdp_receive_batch(PyObject *self, PyObject *args) {
   long long timeout;
   long long n_packets;
-  Packet_t *packet_batch;
   bool timed_out = false;
-  PyObject *ret = NULL;
   long long n_dropped_start;
   long long n_dropped_during;
+  PacketRef_t packet;
 
   if (!PyArg_ParseTuple(args, "LL", &n_packets, &timeout))
     return NULL;
+  if (n_packets < 0) {
+    PyErr_SetString(PyExc_ValueError, "n_packets must be positive.");
+    return NULL;
+  }
   RtUdp *obj = (RtUdp *)self;
+  Ringbuffer *ring = &obj->rec_buff;
+  StatBlock_t *rx_stats = stats_of(obj, STATS_RX);
 
-  packet_batch = malloc(sizeof(Packet_t) * n_packets);
-  if (packet_batch == NULL) {
-    snprintf(buff, sizeof(buff),
-             "Failed to allocated buffer with %lld elements.", n_packets);
-    PyErr_SetString(PyExc_MemoryError, buff);
+  PyObject *list = PyList_New(n_packets);
+  if (!list)
     return NULL;
-  }
 
-  Py_BEGIN_ALLOW_THREADS n_dropped_start = obj->stats.n_rx_packets_dropped;
-  for (int i = 0; i < n_packets; i++) {
-    packet_batch[i] = dequeue(&obj->rec_buff, timeout);
-    if (packet_batch[i].ts == -2) {
-      timed_out = true;
-      break;
+  n_dropped_start = stat_get(rx_stats, ST_N_RX_PACKETS_DROPPED);
+  Py_ssize_t i = 0;
+  while (i < n_packets) {
+    Py_BEGIN_ALLOW_THREADS timed_out = !wait_not_empty_locked(ring, timeout);
+    Py_END_ALLOW_THREADS
+
+        if (timed_out) break;
+
+    // Build tuples straight from the ring for everything already queued.
+    size_t cursor = read_cursor(ring);
+    size_t n = 0;
+    while (i < n_packets && peek(ring, &cursor, &packet)) {
+      PyObject *tuple = create_packet_tuple(&packet);
+      if (!tuple) {
+        release(ring, cursor, n + 1);
+        consumer_unlock(ring);
+        rx_event_rearm(obj);
+        Py_DECREF(list);
+        return NULL;
+      }
+      PyList_SET_ITEM(list, i, tuple); // steals reference
+      i++;
+      n++;
     }
+    release(ring, cursor, n);
+    consumer_unlock(ring);
   }
-  n_dropped_during = obj->stats.n_rx_packets_dropped - n_dropped_start;
-  Py_END_ALLOW_THREADS
+  rx_event_rearm(obj);
+  n_dropped_during =
+      stat_get(rx_stats, ST_N_RX_PACKETS_DROPPED) - n_dropped_start;
 
-      if (timed_out) {
+  if (timed_out) {
     PyErr_SetString(PyExc_TimeoutError, "Timed out waiting for data");
-    ret = NULL;
+    Py_DECREF(list);
+    return NULL;
   }
-  else if (n_dropped_during != 0) {
+  if (n_dropped_during != 0) {
     snprintf(buff, sizeof(buff), "Missed %lld packets", n_dropped_during);
     PyErr_SetString(PyExc_ValueError, buff);
-    ret = NULL;
-  }
-  else {
-    ret = create_packet_tuple_list(packet_batch, n_packets);
+    Py_DECREF(list);
+    return NULL;
   }
-
-  free(packet_batch);
-  return ret;
+  return list;
 }
 
 static PyObject *close_socket(PyObject *self, PyObject *args) {
@@ -658,44 +4697,203 @@ static PyObject *close_socket(PyObject *self, PyObject *args) {
 
 static void RtUdp_dealoc(PyObject *self) {
   RtUdp *obj = (RtUdp *)self;
+  join_workers(obj);
+  Py_XDECREF(obj->engine);
   if (obj->sock_fd > 0)
     close(obj->sock_fd);
   if (obj->NAME)
     free(obj->NAME);
+  buff_free(&obj->send_buff);
+  buff_free(&obj->rec_buff);
+  buff_free(&obj->tx_ts_buff);
+  free(obj->tx_sched);
+  free(obj->gro_buf);
+  sched_free(&obj->sched);
+  if (obj->shm) {
+    // Processes still attached keep their mapping until they close it.
+    munmap(obj->shm, obj->shm_bytes);
+    shm_unlink(obj->shm_path);
+  }
+  free(obj->shm_path);
+  capture_free(obj);
 
   Py_TYPE(self)->tp_free(self);
 }
 
+/* Wrap a copy of n 8-byte items in a memoryview with the given format. */
+static PyObject *int64_view(const void *src, size_t n, const char *format) {
+  PyObject *bytes = PyBytes_FromStringAndSize(src, n * sizeof(uint64_t));
+  if (!bytes)
+    return NULL;
+  PyObject *view = PyMemoryView_FromObject(bytes);
+  Py_DECREF(bytes);
+  if (!view)
+    return NULL;
+  PyObject *cast = PyObject_CallMethod(view, "cast", "s", format);
+  Py_DECREF(view);
+  return cast;
+}
+
 #define ADD_LONG(dict, key, val)                                               \
   do {                                                                         \
-    PyObject *_v = PyLong_FromLong(val);                                       \
+    PyObject *_v = PyLong_FromLongLong(val);                                   \
     if (_v) {                                                                  \
       PyDict_SetItemString(dict, key, _v);                                     \
       Py_DECREF(_v);                                                           \
     }                                                                          \
   } while (0)
 
+#define ADD_DOUBLE(dict, key, val)                                             \
+  do {                                                                         \
+    PyObject *_v = PyFloat_FromDouble(val);                                    \
+    if (_v) {                                                                  \
+      PyDict_SetItemString(dict, key, _v);                                     \
+      Py_DECREF(_v);                                                           \
+    }                                                                          \
+  } while (0)
+
+static inline double ratio(long long num, long long den) {
+  return den ? (double)num / den : 0.0;
+}
+
 static PyObject *get_packet_stats(PyObject *self, PyObject *args) {
+  RtUdp *obj = (RtUdp *)self;
+  StatSnapshot_t snap;
+  long long *v = snap.v;
+
   PyObject *dict = PyDict_New(); // create a new empty dict
   if (!dict)
     return NULL;
-  //
-  RtUdp *obj = (RtUdp *)self;
-  // Create some values (e.g., ints, floats)
-  ADD_LONG(dict, "n_packets_rec", obj->stats.n_packets_rec);
-  ADD_LONG(dict, "n_packets_req", obj->stats.n_packets_req);
-  ADD_LONG(dict, "n_packets_sent", obj->stats.n_packets_sent);
-  ADD_LONG(dict, "n_rx_packets_dropped", obj->stats.n_rx_packets_dropped);
-  ADD_LONG(dict, "min_latency_ns", obj->stats.min_latency_ns);
-  ADD_LONG(dict, "max_latency_ns", obj->stats.max_latency_ns);
-  ADD_LONG(dict, "total_latency_ns", obj->stats.total_latency_ns);
-  ADD_LONG(dict, "n_send_ticks", obj->stats.n_send_ticks);
-  ADD_LONG(dict, "n_rec_ticks", obj->stats.n_rec_ticks);
-  ADD_LONG(dict, "n_imediate_packets", obj->stats.n_imediate_packets);
+
+  // One consistent snapshot; the workers keep counting.
+  stats_snapshot(&obj->stats, &snap);
+  for (int i = 0; i < ST_COUNT; i++)
+    ADD_LONG(dict, stat_info[i].name, v[i]);
+  ADD_DOUBLE(dict, "avg_rx_batch",
+             ratio(v[ST_N_PACKETS_REC], v[ST_N_RX_WAKEUPS]));
+  ADD_DOUBLE(dict, "avg_wake_error_ns",
+             ratio(v[ST_TOTAL_WAKE_ERROR_NS], v[ST_N_TIMED_WAITS]));
+  ADD_LONG(dict, "spin_margin_ns", obj->spin_margin);
+  ADD_DOUBLE(dict, "avg_spin_ns",
+             ratio(v[ST_TOTAL_SPIN_NS], v[ST_N_TIMED_WAITS]));
+  ADD_LONG(dict, "n_tx_ring_wakes", buff_wakes(&obj->send_buff));
+  ADD_LONG(dict, "n_rx_ring_wakes", buff_wakes(&obj->rec_buff));
+  ADD_DOUBLE(dict, "syscalls_per_packet",
+             ratio(v[ST_N_SEND_SYSCALLS], v[ST_N_PACKETS_SENT]));
+  ADD_LONG(dict, "uring_tx", obj->uring_tx);
+  ADD_LONG(dict, "uring_rx", obj->uring_rx);
+  ADD_DOUBLE(dict, "rx_spin_idle_ratio",
+             ratio(v[ST_N_RX_SPIN_IDLE], v[ST_N_RX_SPIN_POLLS]));
+
+  uint64_t total = 0;
+  for (unsigned i = 0; i < HISTO_BINS; i++)
+    total += snap.histogram[i];
+  ADD_LONG(dict, "p50_latency_ns",
+           histo_percentile(&obj->stats, snap.histogram, total, 0.50,
+                            v[ST_MAX_LATENCY_NS]));
+  ADD_LONG(dict, "p99_latency_ns",
+           histo_percentile(&obj->stats, snap.histogram, total, 0.99,
+                            v[ST_MAX_LATENCY_NS]));
+  ADD_LONG(dict, "p999_latency_ns",
+           histo_percentile(&obj->stats, snap.histogram, total, 0.999,
+                            v[ST_MAX_LATENCY_NS]));
+  ADD_LONG(dict, "p9999_latency_ns",
+           histo_percentile(&obj->stats, snap.histogram, total, 0.9999,
+                            v[ST_MAX_LATENCY_NS]));
 
   return dict; // return the dictionary
 }
 
+/* The raw counters, in STAT_NAMES order, copied into out (a writable buffer
+ * of at least len(STAT_NAMES) int64) or a new memoryview. Cheap enough to
+ * poll at high rates. */
+static PyObject *get_stats_snapshot(PyObject *self, PyObject *args) {
+  RtUdp *obj = (RtUdp *)self;
+  PyObject *out = Py_None;
+  StatSnapshot_t snap;
+  Py_buffer view;
+
+  if (!PyArg_ParseTuple(args, "|O", &out))
+    return NULL;
+  stats_snapshot(&obj->stats, &snap);
+  if (out == Py_None)
+    return int64_view(snap.v, ST_COUNT, "q");
+
+  if (get_int64_buffer(out, &view, PyBUF_WRITABLE, "out") < 0)
+    return NULL;
+  if (view.len < (Py_ssize_t)sizeof(snap.v)) {
+    PyBuffer_Release(&view);
+    snprintf(buff, sizeof(buff), "out must hold at least %d counters.",
+             ST_COUNT);
+    PyErr_SetString(PyExc_ValueError, buff);
+    return NULL;
+  }
+  memcpy(view.buf, snap.v, sizeof(snap.v));
+  PyBuffer_Release(&view);
+  Py_INCREF(out);
+  return out;
+}
+
+static PyObject *get_tx_timestamps(PyObject *self, PyObject *args) {
+  RtUdp *obj = (RtUdp *)self;
+  Ringbuffer *ring = &obj->tx_ts_buff;
+
+  if (!obj->timestamping) {
+    PyErr_SetString(PyExc_ValueError, "Timestamping is not enabled.");
+    return NULL;
+  }
+
+  PyObject *list = PyList_New(0);
+  if (!list)
+    return NULL;
+
+  // Take only what is there now; the worker may keep adding.
+  consumer_lock(ring);
+  size_t n = length(ring);
+  size_t cursor = read_cursor(ring);
+  size_t taken = 0;
+  size_t next = cursor;
+  PacketRef_t ref;
+  while (taken < n && peek(ring, &next, &ref)) {
+    TxStamp_t stamp;
+    memcpy(&stamp, ref.data, sizeof(stamp));
+    PyObject *item = Py_BuildValue("(ILL)", stamp.id, stamp.sched_ns, ref.ts);
+    if (!item || PyList_Append(list, item) < 0) {
+      Py_XDECREF(item);
+      Py_DECREF(list);
+      release(ring, cursor, taken);
+      consumer_unlock(ring);
+      return NULL;
+    }
+    Py_DECREF(item);
+    cursor = next;
+    taken++;
+  }
+  release(ring, cursor, taken);
+  consumer_unlock(ring);
+  return list;
+}
+
+static PyObject *get_latency_histogram(PyObject *self, PyObject *args) {
+  RtUdp *obj = (RtUdp *)self;
+  StatSnapshot_t snap;
+  long long edges[HISTO_BINS + 1];
+
+  stats_snapshot(&obj->stats, &snap);
+  for (unsigned i = 0; i <= HISTO_BINS; i++)
+    edges[i] = histo_edge(&obj->stats, i);
+
+  PyObject *py_counts = int64_view(snap.histogram, HISTO_BINS, "Q");
+  if (!py_counts)
+    return NULL;
+  PyObject *py_edges = int64_view(edges, HISTO_BINS + 1, "q");
+  if (!py_edges) {
+    Py_DECREF(py_counts);
+    return NULL;
+  }
+  return Py_BuildValue("(NN)", py_counts, py_edges);
+}
+
 static PyObject *RtUdp_repr(PyObject *self) {
   RtUdp *obj = (RtUdp *)self;
   char ip_str[INET_ADDRSTRLEN];
@@ -713,6 +4911,8 @@ static PyObject *RtUdp_repr(PyObject *self) {
 
   if (obj->DIRECTION == DIR_RECV) {
     direction_str = "<-";
+  } else if (obj->DIRECTION == DIR_FULL) {
+    direction_str = "<->";
   } else {
     direction_str = "->";
   }
@@ -738,10 +4938,11 @@ static PyObject *RtUdp_purge(PyObject *self, PyObject *args) {
     return NULL;
   }
 
-  obj->rec_buff.head = 0;
-  obj->rec_buff.tail = 0;
-  obj->send_buff.head = 0;
-  obj->send_buff.tail = 0;
+  buff_reset(&obj->rec_buff);
+  buff_reset(&obj->send_buff);
+  obj->sched.n_held = 0;
+  sched_purge(&obj->sched);
+  rx_event_rearm(obj);
 
   if (start(self, NULL) == NULL) {
     return NULL;
@@ -775,14 +4976,25 @@ static inline Py_hash_t RtUdp_hash(PyObject *self) {
 
 static PyMethodDef RtUdp_methods[] = {
     {"send_data", send_data, METH_VARARGS, "Send data over UDP"},
+    {"send_batch", send_batch, METH_VARARGS,
+     "Queue a list of (data, timestamp) packets for sending."},
+    {"send_from", (PyCFunction)(void (*)(void))send_from,
+     METH_VARARGS | METH_KEYWORDS,
+     "Queue packets sliced from one contiguous buffer for sending."},
     {"receive_data", receive_data, METH_VARARGS, "Recieve data over UDP"},
     {"receive_batch", RtUdp_receive_batch, METH_VARARGS,
      "Recieve batch of data over UDP"},
+    {"receive_into", receive_into, METH_VARARGS,
+     "Copy queued packets into a caller-owned buffer."},
     {"init_socket", init_socket, METH_NOARGS, "Initialise UDP socket."},
     {"close_socket", close_socket, METH_NOARGS, "Close UDP socket."},
     {"start", start, METH_NOARGS, "start send/recieve workers."},
     {"stop", stop, METH_NOARGS, "end send/recieve workers."},
     {"get_packet_stats", get_packet_stats, METH_NOARGS, "Send data over UDP"},
+    {"get_tx_timestamps", get_tx_timestamps, METH_NOARGS,
+     "Collect kernel TX timestamps as (id, scheduled, sent) tuples."},
+    {"get_latency_histogram", get_latency_histogram, METH_NOARGS,
+     "Send latency histogram as (counts, edges) memoryviews."},
     {"get_send_length", get_send_length, METH_NOARGS,
      "Get number of packets in send queue."},
     {"get_receive_length", get_receive_length, METH_NOARGS,
@@ -790,6 +5002,10 @@ static PyMethodDef RtUdp_methods[] = {
     {"is_running", RtUdp_is_running, METH_NOARGS,
      "Return True if the comm object is currenently running."},
     {"purge", RtUdp_purge, METH_NOARGS, "Clear buffers."},
+    {"get_stats_snapshot", get_stats_snapshot, METH_VARARGS,
+     "Raw counters in STAT_NAMES order, into out if given."},
+    {"fileno", RtUdp_fileno, METH_NOARGS,
+     "eventfd that is readable while received packets are queued."},
 
     {NULL} // Sentinel
 };
@@ -807,6 +5023,452 @@ static PyTypeObject UDPSocketType = {
     .tp_repr = RtUdp_repr,
 };
 
+/* Another process's view of a socket's shared-memory rings (shm_name).
+ * It consumes the receive ring and produces into the send ring, alongside
+ * the owning socket, under the rings' process-shared locks. */
+typedef struct {
+  PyObject_HEAD char *mem; // the segment, NULL once closed
+  size_t bytes;
+  Ringbuffer rings[SHM_RINGS];
+  bool holding;         // acquire() holds the receive ring's consumer lock
+  size_t acquired;      // read cursor past the acquired packets
+  size_t n_acquired;
+  Py_ssize_t n_exports; // live buffers over the segment
+} RtUdpShmRing;
+
+/* Check a ring descriptor against the ring shape this build would give it. */
+static bool shm_ring_valid(const ShmRing_t *desc, Ringbuffer *ring,
+                           size_t total) {
+  if (desc->kind != RING_FIXED && desc->kind != RING_SLAB)
+    return false;
+  size_t data_bytes =
+      buff_shape(ring, desc->kind,
+                 desc->kind == RING_SLAB ? desc->size : desc->capacity,
+                 desc->max_len);
+  return data_bytes == desc->data_bytes && ring->capacity == desc->capacity &&
+         ring->size == desc->size && ring->stride == desc->stride &&
+         desc->ctl_offset % CACHE_LINE == 0 &&
+         desc->ctl_offset >= sizeof(ShmHeader_t) &&
+         desc->ctl_offset + sizeof(RingCtl_t) <= desc->data_offset &&
+         desc->data_offset <= total && data_bytes <= total - desc->data_offset;
+}
+
+static int ShmRing_init(PyObject *self, PyObject *args, PyObject *kwds) {
+  const char *name;
+  struct stat st;
+  static char *kwlist[] = {"name", NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "s", kwlist, &name))
+    return -1;
+
+  RtUdpShmRing *shm = (RtUdpShmRing *)self;
+  if (shm->mem) {
+    PyErr_SetString(PyExc_ValueError, "Ring is already attached.");
+    return -1;
+  }
+  char *path = shm_path(name);
+  if (!path) {
+    PyErr_NoMemory();
+    return -1;
+  }
+  int fd = shm_open(path, O_RDWR | O_CLOEXEC, 0);
+  free(path);
+  if (fd < 0 || fstat(fd, &st) < 0) {
+    PyErr_SetFromErrnoWithFilename(PyExc_OSError, name);
+    if (fd >= 0)
+      close(fd);
+    return -1;
+  }
+  char *mem = MAP_FAILED;
+  if ((size_t)st.st_size >= sizeof(ShmHeader_t))
+    mem = mmap(NULL, st.st_size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+  close(fd);
+  if (mem == MAP_FAILED && (size_t)st.st_size >= sizeof(ShmHeader_t)) {
+    PyErr_SetFromErrnoWithFilename(PyExc_OSError, name);
+    return -1;
+  }
+
+  const ShmHeader_t *hdr = (const ShmHeader_t *)mem;
+  if (mem == MAP_FAILED || memcmp(hdr->magic, SHM_MAGIC, sizeof(hdr->magic))) {
+    snprintf(buff, sizeof(buff), "'%s' is not an rtudp ring segment.", name);
+    goto invalid;
+  }
+  atomic_thread_fence(memory_order_acquire);
+  if (hdr->version != SHM_VERSION || hdr->header_size != sizeof(ShmHeader_t) ||
+      hdr->ctl_size != sizeof(RingCtl_t) || hdr->n_rings != SHM_RINGS ||
+      hdr->total_bytes > (uint64_t)st.st_size) {
+    snprintf(buff, sizeof(buff),
+             "'%s' was created by an incompatible rtudp build.", name);
+    goto invalid;
+  }
+  for (int i = 0; i < SHM_RINGS; i++) {
+    const ShmRing_t *desc = &hdr->ring[i];
+    if (!shm_ring_valid(desc, &shm->rings[i], hdr->total_bytes)) {
+      snprintf(buff, sizeof(buff), "'%s' has a corrupt ring layout.", name);
+      goto invalid;
+    }
+    buff_attach(&shm->rings[i], (RingCtl_t *)(mem + desc->ctl_offset),
+                mem + desc->data_offset, true);
+  }
+  shm->rings[SHM_RX].lock_consumer = true;
+  shm->mem = mem;
+  shm->bytes = st.st_size;
+  return 0;
+
+invalid:
+  if (mem != MAP_FAILED)
+    munmap(mem, st.st_size);
+  PyErr_SetString(PyExc_ValueError, buff);
+  return -1;
+}
+
+static RtUdpShmRing *shm_ring_open(PyObject *self) {
+  RtUdpShmRing *shm = (RtUdpShmRing *)self;
+  if (!shm->mem) {
+    PyErr_SetString(PyExc_ValueError, "Ring is closed.");
+    return NULL;
+  }
+  return shm;
+}
+
+/* Take the receive ring's consumer lock, without the GIL so that a thread
+ * of ours blocked here cannot stall the one holding it. */
+static bool shm_consumer_lock(RtUdpShmRing *shm) {
+  if (shm->holding) {
+    PyErr_SetString(PyExc_ValueError,
+                    "release() the acquired packets first.");
+    return false;
+  }
+  Py_BEGIN_ALLOW_THREADS consumer_lock(&shm->rings[SHM_RX]);
+  Py_END_ALLOW_THREADS return true;
+}
+
+static PyObject *ShmRing_receive_data(PyObject *self, PyObject *args) {
+  long long timeout;
+  PacketRef_t packet;
+  if (!PyArg_ParseTuple(args, "L", &timeout))
+    return NULL;
+  if (timeout < 0) {
+    PyErr_SetString(PyExc_ValueError, "timeout_ns must be positive.");
+    return NULL;
+  }
+  RtUdpShmRing *shm = shm_ring_open(self);
+  if (!shm)
+    return NULL;
+  Ringbuffer *ring = &shm->rings[SHM_RX];
+  bool ready;
+  Py_BEGIN_ALLOW_THREADS ready = wait_not_empty(ring, timeout);
+  Py_END_ALLOW_THREADS
+
+      if (!shm_consumer_lock(shm)) return NULL;
+  size_t cursor = read_cursor(ring);
+  if (!ready || !peek(ring, &cursor, &packet)) {
+    consumer_unlock(ring);
+    PyErr_SetString(PyExc_TimeoutError, "Receive timed out");
+    return NULL;
+  }
+  PyObject *result =
+      Py_BuildValue("y#L", packet.data, (Py_ssize_t)packet.len, packet.ts);
+  release(ring, cursor, 1);
+  consumer_unlock(ring);
+  return result;
+}
+
+static PyObject *ShmRing_receive_batch(PyObject *self, PyObject *args) {
+  long long timeout;
+  long long n_packets;
+  bool timed_out = false;
+  PacketRef_t packet;
+
+  if (!PyArg_ParseTuple(args, "LL", &n_packets, &timeout))
+    return NULL;
+  if (n_packets < 0) {
+    PyErr_SetString(PyExc_ValueError, "n_packets must be positive.");
+    return NULL;
+  }
+  RtUdpShmRing *shm = shm_ring_open(self);
+  if (!shm)
+    return NULL;
+  Ringbuffer *ring = &shm->rings[SHM_RX];
+  PyObject *list = PyList_New(n_packets);
+  if (!list)
+    return NULL;
+
+  Py_ssize_t i = 0;
+  while (i < n_packets) {
+    Py_BEGIN_ALLOW_THREADS timed_out = !wait_not_empty(ring, timeout);
+    Py_END_ALLOW_THREADS
+
+        if (timed_out) break;
+
+    if (!shm_consumer_lock(shm)) {
+      Py_DECREF(list);
+      return NULL;
+    }
+    size_t cursor = read_cursor(ring);
+    size_t n = 0;
+    while (i < n_packets && peek(ring, &cursor, &packet)) {
+      PyObject *tuple = create_packet_tuple(&packet);
+      if (!tuple) {
+        release(ring, cursor, n + 1);
+        consumer_unlock(ring);
+        Py_DECREF(list);
+        return NULL;
+      }
+      PyList_SET_ITEM(list, i, tuple); // steals reference
+      i++;
+      n++;
+    }
+    release(ring, cursor, n);
+    consumer_unlock(ring);
+  }
+  if (timed_out) {
+    PyErr_SetString(PyExc_TimeoutError, "Timed out waiting for data");
+    Py_DECREF(list);
+    return NULL;
+  }
+  return list;
+}
+
+/* Zero-copy receive: memoryviews straight onto the ring's records. The
+ * consumer lock stays held until release(), so the owner's receive worker
+ * cannot drop them meanwhile; it stalls on a full ring instead. */
+static PyObject *ShmRing_acquire(PyObject *self, PyObject *args) {
+  long long timeout;
+  long long n_packets;
+  PacketRef_t packet;
+
+  if (!PyArg_ParseTuple(args, "LL", &n_packets, &timeout))
+    return NULL;
+  if (n_packets < 1 || timeout < 0) {
+    PyErr_SetString(PyExc_ValueError,
+                    "n_packets must be at least 1 and timeout_ns positive.");
+    return NULL;
+  }
+  RtUdpShmRing *shm = shm_ring_open(self);
+  if (!shm)
+    return NULL;
+  Ringbuffer *ring = &shm->rings[SHM_RX];
+  bool ready;
+  Py_BEGIN_ALLOW_THREADS ready = wait_not_empty(ring, timeout);
+  Py_END_ALLOW_THREADS
+
+      if (!shm_consumer_lock(shm)) return NULL;
+  size_t cursor = read_cursor(ring);
+  size_t next = cursor;
+  if (!ready || !peek(ring, &next, &packet)) {
+    consumer_unlock(ring);
+    PyErr_SetString(PyExc_TimeoutError, "Receive timed out");
+    return NULL;
+  }
+
+  PyObject *list = PyList_New(0);
+  PyObject *segment = list ? PyMemoryView_FromObject(self) : NULL;
+  if (!segment)
+    goto error;
+  do {
+    Py_ssize_t offset = packet.data - shm->mem;
+    PyObject *view = PySequence_GetSlice(segment, offset, offset + packet.len);
+    PyObject *tuple = view ? Py_BuildValue("NL", view, packet.ts) : NULL;
+    if (!tuple || PyList_Append(list, tuple) < 0) {
+      Py_XDECREF(tuple);
+      goto error;
+    }
+    Py_DECREF(tuple);
+    cursor = next;
+  } while (PyList_GET_SIZE(list) < n_packets && peek(ring, &next, &packet));
+  Py_DECREF(segment);
+  shm->holding = true;
+  shm->acquired = cursor;
+  shm->n_acquired = PyList_GET_SIZE(list);
+  return list;
+
+error:
+  Py_XDECREF(segment);
+  Py_XDECREF(list);
+  consumer_unlock(ring);
+  return NULL;
+}
+
+static void shm_release(RtUdpShmRing *shm) {
+  if (shm->holding) {
+    Ringbuffer *ring = &shm->rings[SHM_RX];
+    release(ring, shm->acquired, shm->n_acquired);
+    shm->holding = false;
+    consumer_unlock(ring);
+  }
+}
+
+static PyObject *ShmRing_release(PyObject *self, PyObject *args) {
+  RtUdpShmRing *shm = shm_ring_open(self);
+  if (!shm)
+    return NULL;
+  shm_release(shm);
+  Py_RETURN_NONE;
+}
+
+/* Producer side of the send ring. Blocks while it is full, whatever the
+ * owner's backpressure policy. */
+static PyObject *ShmRing_send_data(PyObject *self, PyObject *args) {
+  const char *buf;
+  Py_ssize_t len;
+  long long ts = 0; // no timestamp: send straight away
+
+  if (!PyArg_ParseTuple(args, "y#|L", &buf, &len, &ts))
+    return NULL;
+  RtUdpShmRing *shm = shm_ring_open(self);
+  if (!shm)
+    return NULL;
+  Ringbuffer *ring = &shm->rings[SHM_TX];
+  if ((size_t)len > ring->max_len) {
+    snprintf(buff, sizeof(buff), "Packet exceeds %zu bytes.", ring->max_len);
+    PyErr_SetString(PyExc_ValueError, buff);
+    return NULL;
+  }
+  Py_BEGIN_ALLOW_THREADS producer_lock(ring);
+  while (!enqueue(ring, buf, len, ts))
+    wait_not_full(ring, len);
+  producer_unlock(ring);
+  Py_END_ALLOW_THREADS Py_RETURN_NONE;
+}
+
+static PyObject *ShmRing_send_batch(PyObject *self, PyObject *args) {
+  PyObject *packets;
+  PyObject *seq;
+  PyObject *ret = NULL;
+  const char *buf;
+  Py_ssize_t len;
+  long long ts;
+
+  if (!PyArg_ParseTuple(args, "O", &packets))
+    return NULL;
+  RtUdpShmRing *shm = shm_ring_open(self);
+  if (!shm)
+    return NULL;
+  seq = PySequence_Tuple(packets);
+  if (!seq)
+    return NULL;
+
+  Ringbuffer *ring = &shm->rings[SHM_TX];
+  Py_ssize_t n_packets = PyTuple_GET_SIZE(seq);
+  Py_ssize_t i = 0;
+  size_t n = 0;
+  Py_BEGIN_ALLOW_THREADS producer_lock(ring);
+  Py_END_ALLOW_THREADS size_t cursor = write_cursor(ring);
+
+  while (i < n_packets) {
+    if (!PyArg_ParseTuple(PyTuple_GET_ITEM(seq, i), "y#L", &buf, &len, &ts))
+      goto done;
+    if ((size_t)len > ring->max_len) {
+      snprintf(buff, sizeof(buff), "Packet %zd exceeds %zu bytes.", i,
+               ring->max_len);
+      PyErr_SetString(PyExc_ValueError, buff);
+      goto done;
+    }
+    char *dst = reserve(ring, &cursor, len);
+    if (dst == NULL) {
+      publish(ring, cursor, n);
+      n = 0;
+      Py_BEGIN_ALLOW_THREADS wait_not_full(ring, len);
+      Py_END_ALLOW_THREADS cursor = write_cursor(ring);
+      continue;
+    }
+    memcpy(dst, buf, len);
+    commit(ring, &cursor, len, ts);
+    n++;
+    i++;
+  }
+  ret = Py_None;
+  Py_INCREF(ret);
+
+done:
+  publish(ring, cursor, n);
+  producer_unlock(ring);
+  Py_DECREF(seq);
+  return ret;
+}
+
+static PyObject *ShmRing_get_receive_length(PyObject *self, PyObject *args) {
+  RtUdpShmRing *shm = shm_ring_open(self);
+  if (!shm)
+    return NULL;
+  return PyLong_FromSize_t(length(&shm->rings[SHM_RX]));
+}
+
+static PyObject *ShmRing_close(PyObject *self, PyObject *args) {
+  RtUdpShmRing *shm = (RtUdpShmRing *)self;
+  if (!shm->mem)
+    Py_RETURN_NONE;
+  if (shm->n_exports) {
+    PyErr_SetString(PyExc_BufferError,
+                    "Release the memoryviews from acquire() first.");
+    return NULL;
+  }
+  shm_release(shm);
+  munmap(shm->mem, shm->bytes);
+  shm->mem = NULL;
+  Py_RETURN_NONE;
+}
+
+static int ShmRing_getbuffer(PyObject *self, Py_buffer *view, int flags) {
+  RtUdpShmRing *shm = shm_ring_open(self);
+  if (!shm) {
+    view->obj = NULL;
+    return -1;
+  }
+  if (PyBuffer_FillInfo(view, self, shm->mem, shm->bytes, 1, flags) < 0)
+    return -1;
+  shm->n_exports++;
+  return 0;
+}
+
+static void ShmRing_releasebuffer(PyObject *self, Py_buffer *view) {
+  ((RtUdpShmRing *)self)->n_exports--;
+}
+
+static void ShmRing_dealloc(PyObject *self) {
+  RtUdpShmRing *shm = (RtUdpShmRing *)self;
+  if (shm->mem) {
+    shm_release(shm);
+    munmap(shm->mem, shm->bytes);
+  }
+  Py_TYPE(self)->tp_free(self);
+}
+
+static PyMethodDef ShmRing_methods[] = {
+    {"receive_data", ShmRing_receive_data, METH_VARARGS,
+     "Copy out the oldest received packet"},
+    {"receive_batch", ShmRing_receive_batch, METH_VARARGS,
+     "Copy out n_packets received packets"},
+    {"acquire", ShmRing_acquire, METH_VARARGS,
+     "Borrow up to n_packets received packets without copying"},
+    {"release", ShmRing_release, METH_NOARGS,
+     "Hand the acquired packets back to the ring"},
+    {"send_data", ShmRing_send_data, METH_VARARGS,
+     "Queue a packet on the send ring"},
+    {"send_batch", ShmRing_send_batch, METH_VARARGS,
+     "Queue many packets on the send ring"},
+    {"get_receive_length", ShmRing_get_receive_length, METH_NOARGS,
+     "Packets waiting in the receive ring"},
+    {"close", ShmRing_close, METH_NOARGS, "Detach from the segment"},
+    {NULL}};
+
+static PyBufferProcs ShmRing_as_buffer = {
+    .bf_getbuffer = ShmRing_getbuffer,
+    .bf_releasebuffer = ShmRing_releasebuffer,
+};
+
+static PyTypeObject ShmRingType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "rtudp._RtUdpShmRing",
+    .tp_basicsize = sizeof(RtUdpShmRing),
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_doc = "Attachment to a socket's shared-memory rings",
+    .tp_methods = ShmRing_methods,
+    .tp_as_buffer = &ShmRing_as_buffer,
+    .tp_new = PyType_GenericNew,
+    .tp_init = ShmRing_init,
+    .tp_dealloc = ShmRing_dealloc,
+};
+
 // static PyMethodDef UDPCommMethods[] = {
 //	{"init_socket", init_socket, METH_VARARGS, "Initialize the UDP socket"},
 //	{"send_data", send_data, METH_VARARGS, "Send data and return
@@ -817,13 +5479,141 @@ static PyTypeObject UDPSocketType = {
 //	{NULL, NULL, 0, NULL}
 // };
 
+/* Ring microbenchmark: one producer and one consumer thread move n_packets
+ * records of payload bytes through a private ring, batch records per
+ * publish()/release(). */
+typedef struct {
+  Ringbuffer ring;
+  size_t n_packets;
+  size_t payload;
+  size_t batch;
+  size_t n_consumed;
+  char *data;
+} RingBench_t;
+
+static void *ring_bench_producer(void *arg) {
+  RingBench_t *bench = arg;
+  Ringbuffer *ring = &bench->ring;
+  size_t sent = 0;
+  while (sent < bench->n_packets) {
+    size_t cursor, k = 0;
+    char *dst;
+    wait_not_full(ring, bench->payload);
+    cursor = write_cursor(ring);
+    while (k < bench->batch && sent + k < bench->n_packets &&
+           (dst = reserve(ring, &cursor, bench->payload)) != NULL) {
+      memcpy(dst, bench->data, bench->payload);
+      commit(ring, &cursor, bench->payload, sent + k);
+      k++;
+    }
+    publish(ring, cursor, k);
+    sent += k;
+  }
+  return NULL;
+}
+
+static void *ring_bench_consumer(void *arg) {
+  RingBench_t *bench = arg;
+  Ringbuffer *ring = &bench->ring;
+  PacketRef_t ref;
+  while (bench->n_consumed < bench->n_packets) {
+    size_t cursor, k = 0;
+    if (!wait_not_empty(ring, 1000000000LL))
+      break; // producer stalled
+    cursor = read_cursor(ring);
+    while (k < bench->batch && peek(ring, &cursor, &ref)) {
+      if ((size_t)ref.ts != bench->n_consumed + k)
+        return NULL; // out of order, reported as a short count
+      k++;
+    }
+    release(ring, cursor, k);
+    bench->n_consumed += k;
+  }
+  return NULL;
+}
+
+static PyObject *ring_bench(PyObject *self, PyObject *args, PyObject *kwds) {
+  static char *kwlist[] = {"n_packets", "capacity", "payload",
+                           "batch",     "slab",     NULL};
+  Py_ssize_t n_packets, capacity = 1024, payload = 64, batch = 1;
+  int slab = 0;
+  RingBench_t bench = {0};
+  pthread_t producer, consumer;
+  long long start, elapsed;
+  int err;
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|nnnp", kwlist, &n_packets,
+                                   &capacity, &payload, &batch, &slab))
+    return NULL;
+  if (n_packets < 0 || capacity < 2 || payload < 0 ||
+      payload > UDP_PAYLOAD_LIMIT || batch < 1) {
+    PyErr_SetString(PyExc_ValueError, "invalid ring benchmark parameters.");
+    return NULL;
+  }
+  if (slab && (size_t)capacity < 2 * slab_record_size(payload)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "capacity must fit two records in slab mode.");
+    return NULL;
+  }
+
+  bench.n_packets = n_packets;
+  bench.payload = payload;
+  bench.batch = batch;
+  bench.data = calloc(1, payload + 1);
+  if (bench.data == NULL ||
+      buff_init(&bench.ring, slab ? RING_SLAB : RING_FIXED, capacity,
+                payload) < 0) {
+    free(bench.data);
+    buff_free(&bench.ring);
+    return PyErr_NoMemory();
+  }
+
+  Py_BEGIN_ALLOW_THREADS start = now_ns(CLOCK_MONOTONIC);
+  err = pthread_create(&consumer, NULL, ring_bench_consumer, &bench);
+  if (err == 0) {
+    err = pthread_create(&producer, NULL, ring_bench_producer, &bench);
+    if (err == 0)
+      pthread_join(producer, NULL);
+    else
+      bench.n_packets = 0; // let the consumer finish
+    pthread_join(consumer, NULL);
+  }
+  elapsed = now_ns(CLOCK_MONOTONIC) - start;
+  Py_END_ALLOW_THREADS
+
+  size_t n_wakes = buff_wakes(&bench.ring);
+  free(bench.data);
+  buff_free(&bench.ring);
+  if (err != 0) {
+    errno = err;
+    return PyErr_SetFromErrno(PyExc_OSError);
+  }
+  return Py_BuildValue("{s:n,s:L,s:d,s:n}", "n_packets",
+                       (Py_ssize_t)bench.n_consumed, "elapsed_ns", elapsed,
+                       "ops_per_s",
+                       elapsed > 0 ? bench.n_consumed * 1e9 / elapsed : 0.0,
+                       "n_wakes", (Py_ssize_t)n_wakes);
+}
+
+static PyMethodDef rtudp_functions[] = {
+    {"_ring_bench", (PyCFunction)(void (*)(void))ring_bench,
+     METH_VARARGS | METH_KEYWORDS,
+     "_ring_bench(n_packets, capacity=1024, payload=64, batch=1, slab=False)\n"
+     "--\n\n"
+     "Move n_packets through a ring between two threads and time it."},
+    {NULL, NULL, 0, NULL}};
+
 static struct PyModuleDef rtudpmodule = {PyModuleDef_HEAD_INIT, "rtudp", NULL,
-                                         -1, NULL};
+                                         -1, rtudp_functions};
 
 PyMODINIT_FUNC PyInit_rtudp(void) {
   PyObject *m;
   if (PyType_Ready(&UDPSocketType) < 0)
     return NULL;
+  if (PyType_Ready(&EngineType) < 0)
+    return NULL;
+  if (PyType_Ready(&ShmRingType) < 0)
+    return NULL;
 
   m = PyModule_Create(&rtudpmodule);
   if (!m)
@@ -831,5 +5621,16 @@ PyMODINIT_FUNC PyInit_rtudp(void) {
 
   Py_INCREF(&UDPSocketType);
   PyModule_AddObject(m, "_RtUdpSocket", (PyObject *)&UDPSocketType);
+  Py_INCREF(&EngineType);
+  PyModule_AddObject(m, "_RtUdpEngine", (PyObject *)&EngineType);
+  Py_INCREF(&ShmRingType);
+  PyModule_AddObject(m, "_RtUdpShmRing", (PyObject *)&ShmRingType);
+
+  PyObject *names = PyTuple_New(ST_COUNT);
+  if (!names)
+    return NULL;
+  for (int i = 0; i < ST_COUNT; i++)
+    PyTuple_SET_ITEM(names, i, PyUnicode_FromString(stat_info[i].name));
+  PyModule_AddObject(m, "STAT_NAMES", names);
   return m;
 }
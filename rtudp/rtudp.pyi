@@ -1,6 +1,6 @@
 # rtudp.pyi
 
-from typing import Optional, Tuple, Dict
+from typing import Any, Optional, Tuple, Dict, List
 
 class RtUdp:
     def __init__(self,
@@ -14,7 +14,29 @@ class RtUdp:
                  name: str = ...,
                  direction: int = ...,
                  cpu: int = ...,
-                 timeout: int = ...) -> None: ...
+                 timeout: int = ...,
+                 rx_batch: int = ...,
+                 ring_bytes: int = ...,
+                 max_payload: int = ...,
+                 gso_size: int = ...,
+                 gro: bool = ...,
+                 rx_cpu: int = ...,
+                 histo_start: int = ...,
+                 histo_div: int = ...,
+                 timestamping: bool = ...,
+                 txtime: bool = ...,
+                 txtime_lead: int = ...,
+                 spin_margin: int = ...,
+                 backpressure: str = ...,
+                 send_timeout: int = ...,
+                 engine: Optional[RtUdpEngine] = ...,
+                 shards: int = ...,
+                 steer: str = ...,
+                 shm_name: Optional[str] = ...,
+                 capture: Optional[str] = ...,
+                 backend: str = ...,
+                 rx_spin: int = ...,
+                 busy_poll: int = ...) -> None: ...
 
     def init_socket(self) -> None: ...
     def close_socket(self) -> None: ...
@@ -24,12 +46,49 @@ class RtUdp:
     def purge(self) -> None: ...
 
     def send_data(self, data: bytes, timestamp: Optional[int] = ...) -> None: ...
+    def send_batch(self, packets: List[Tuple[bytes, int]]) -> None: ...
+    def send_from(self, buffer: Any, lengths: Any, timestamps: Any,
+                  offsets: Optional[Any] = ...) -> None: ...
     def receive_data(self, timeout_ns: int) -> Tuple[bytes, int]: ...
     def receive_batch(self, n_packets: int, timeout_ns: int) -> Tuple[bytes, int]: ...
+    def receive_into(self, buffer: Any, lengths: Any, timestamps: Any,
+                     timeout_ns: int) -> int: ...
 
-    def get_packet_stats(self) -> Dict[str, int]: ...
+    def get_packet_stats(self) -> Dict[str, float]: ...
+    def get_stats_snapshot(self, out: Optional[Any] = ...) -> memoryview: ...
+    def get_tx_timestamps(self) -> List[Tuple[int, int, int]]: ...
+    def get_latency_histogram(self) -> Tuple[memoryview, memoryview]: ...
+    def fileno(self) -> int: ...
     def get_send_length(self) -> int: ...
     def get_receive_length(self) -> int: ...
 
+class RtUdpEngine:
+    def __init__(self,
+                 n_workers: int = ...,
+                 cpus: Optional[List[int]] = ...) -> None: ...
+
+    def close(self) -> None: ...
+    def get_stats(self) -> List[Dict[str, int]]: ...
+
+class RtUdpShmRing:
+    def __init__(self, name: str) -> None: ...
+
+    def receive_data(self, timeout_ns: int) -> Tuple[bytes, int]: ...
+    def receive_batch(self, n_packets: int, timeout_ns: int) -> List[Tuple[bytes, int]]: ...
+    def acquire(self, n_packets: int, timeout_ns: int) -> List[Tuple[memoryview, int]]: ...
+    def release(self) -> None: ...
+    def send_data(self, data: bytes, timestamp: int = ...) -> None: ...
+    def send_batch(self, packets: List[Tuple[bytes, int]]) -> None: ...
+    def get_receive_length(self) -> int: ...
+    def close(self) -> None: ...
+
+STAT_NAMES: Tuple[str, ...]
+
+def _ring_bench(n_packets: int,
+                capacity: int = ...,
+                payload: int = ...,
+                batch: int = ...,
+                slab: bool = ...) -> Dict[str, Any]: ...
+
 # Module-level exports
 __all__: list[str]
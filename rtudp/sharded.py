@@ -0,0 +1,138 @@
+import select
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .socket_impl import RtUdpSocket
+
+
+class ShardedReceiver:
+    """One receiving port spread over several sockets, rings and cores.
+    
+    Opens ``shards`` SO_REUSEPORT sockets on the same local address, each
+    with its own receive worker (pinned to ``cpus[i]``) and ring. The kernel
+    picks a shard for every datagram according to ``steer``:
+    
+    - "hash": the kernel's 4-tuple hash, so one sender lands on one shard
+    - "cpu": the cpu that received the datagram, modulo ``shards``
+    - "random": uniformly at random
+    - "payload": the first 4 payload bytes as a big-endian key, modulo
+      ``shards``, so senders decide which packets stay together
+    
+    Shards are not connected to ``remote_ip``/``remote_port`` and accept
+    datagrams from any sender. Consume either merged, through
+    ``receive_batch()``/``receive_data()``, or per shard through
+    ``shards[i]``, e.g. one consumer thread per shard.
+    """
+    
+    def __init__(self, local_ip: str, local_port: int,
+                 remote_ip: str, remote_port: int, shards: int = 2,
+                 steer: str = "hash", cpus: Optional[Sequence[int]] = None,
+                 **kwargs):
+        """Create the shard sockets.
+        
+        Args:
+            local_ip: Local IP address all shards bind to
+            local_port: Local port all shards bind to
+            remote_ip: Remote IP address (not used for filtering)
+            remote_port: Remote port (not used for filtering)
+            shards: Number of sockets and receive workers (default: 2)
+            steer: "hash", "cpu", "random" or "payload" (default: "hash")
+            cpus: Optional CPU core per shard for its receive worker
+            **kwargs: Passed on to every shard's ``RtUdpSocket``
+            
+        Raises:
+            ValueError: If shards or steer is invalid or cpus has the wrong
+                length
+        """
+        if shards < 1:
+            raise ValueError("shards must be at least 1.")
+        if cpus is None:
+            cpus = [-1] * shards
+        if len(cpus) != shards:
+            raise ValueError("cpus must have one entry per shard.")
+        kwargs.pop('direction', None)
+        name = kwargs.pop('name', "RtUdp")
+        self.shards = [
+            RtUdpSocket(local_ip, local_port, remote_ip, remote_port,
+                        direction=1, cpu=cpus[i], shards=shards, steer=steer,
+                        name=f"{name}[{i}]", **kwargs)
+            for i in range(shards)
+        ]
+    
+    def init_socket(self) -> None:
+        """Open and bind the shard sockets, in shard order."""
+        for shard in self.shards:
+            shard.init_socket()
+    
+    def close_socket(self) -> None:
+        """Close the shard sockets."""
+        for shard in self.shards:
+            shard.close_socket()
+    
+    def start(self) -> None:
+        """Start every shard's receive worker."""
+        for shard in self.shards:
+            shard.start()
+    
+    def stop(self) -> None:
+        """Stop every shard's receive worker."""
+        for shard in self.shards:
+            shard.stop()
+    
+    def is_running(self) -> bool:
+        """Check if the shards are running."""
+        return all(shard.is_running() for shard in self.shards)
+    
+    def purge(self) -> None:
+        """Clear all shard buffers."""
+        for shard in self.shards:
+            shard.purge()
+    
+    def get_receive_length(self) -> int:
+        """Get number of packets queued over all shards."""
+        return sum(shard.get_receive_length() for shard in self.shards)
+    
+    def receive_batch(self, n_packets: int, timeout_ns: int) -> List[Tuple[bytes, int]]:
+        """Receive n_packets from whichever shards have them.
+        
+        Packets are ordered by receive timestamp. Each shard's packets keep
+        their arrival order.
+        
+        Raises:
+            TimeoutError: If fewer than n_packets arrive within timeout_ns
+            ValueError: If a shard dropped packets meanwhile
+        """
+        if n_packets < 0:
+            raise ValueError("n_packets must be positive.")
+        deadline = time.monotonic_ns() + timeout_ns
+        poller = select.poll()
+        for shard in self.shards:
+            poller.register(shard.fileno(), select.POLLIN)
+        packets = []
+        while True:
+            for shard in self.shards:
+                n = min(shard.get_receive_length(), n_packets - len(packets))
+                if n > 0:
+                    packets.extend(shard.receive_batch(n, 0))
+            if len(packets) == n_packets:
+                break
+            remaining = deadline - time.monotonic_ns()
+            if remaining <= 0:
+                raise TimeoutError("Timed out waiting for data")
+            poller.poll(max(remaining // 1_000_000, 1))
+        packets.sort(key=lambda packet: packet[1])
+        return packets
+    
+    def receive_data(self, timeout_ns: int) -> Tuple[bytes, int]:
+        """Receive the next packet from any shard."""
+        return self.receive_batch(1, timeout_ns)[0]
+    
+    def get_packet_stats(self) -> Dict[str, Any]:
+        """Packet counters summed over the shards, plus each shard's own
+        statistics under "shards"."""
+        shard_stats = [shard.get_packet_stats() for shard in self.shards]
+        stats: Dict[str, Any] = {
+            key: sum(s[key] for s in shard_stats)
+            for key in shard_stats[0] if key.startswith("n_")
+        }
+        stats["shards"] = shard_stats
+        return stats
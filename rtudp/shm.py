@@ -0,0 +1,85 @@
+from typing import Any, List, Tuple
+from .rtudp import _RtUdpShmRing
+
+
+class ShmRing:
+    """Another process's handle on a socket's shared-memory rings.
+    
+    A socket created with ``shm_name=`` keeps its receive and send rings in
+    a named POSIX shared-memory segment instead of private memory. Any
+    process can attach to it by name, e.g. a ``multiprocessing`` worker,
+    and drain received packets or queue packets for sending without a round
+    trip through the owning process. The owner removes the name when it is
+    destroyed; attached processes keep their mapping until they ``close()``.
+    
+    Consumers (the owner's ``receive_*`` calls and every attached process)
+    take turns on the receive ring, and producers on the send ring, under
+    process-shared locks that survive a holder dying. Sends from here block
+    while the send ring is full, whatever the owner's ``backpressure``, and
+    are not counted in the owner's statistics.
+    """
+    
+    def __init__(self, name: str):
+        """Attach to the rings of the socket created with ``shm_name=name``.
+        
+        Raises:
+            FileNotFoundError: If no such segment exists
+            ValueError: If the segment is not an rtudp ring segment or was
+                created by an incompatible build
+        """
+        self._ring = _RtUdpShmRing(name)
+    
+    def receive_data(self, timeout_ns: int) -> Tuple[bytes, int]:
+        """Copy out the oldest received packet as (data, timestamp)."""
+        return self._ring.receive_data(timeout_ns)
+    
+    def receive_batch(self, n_packets: int, timeout_ns: int) -> List[Tuple[bytes, int]]:
+        """Copy out n_packets received packets."""
+        return self._ring.receive_batch(n_packets, timeout_ns)
+    
+    def acquire(self, n_packets: int, timeout_ns: int) -> List[Tuple[memoryview, int]]:
+        """Borrow up to n_packets received packets without copying.
+        
+        Waits up to timeout_ns for the first packet and returns whatever is
+        queued, at most n_packets, as read-only memoryviews onto the ring.
+        The packets stay in the ring until ``release()``, and until then
+        every other consumer waits and the owner's receive worker cannot
+        drop old packets to make room, so keep it short. The views must not
+        be used after ``release()``.
+        
+        Raises:
+            TimeoutError: If nothing arrived within timeout_ns
+            ValueError: If packets are already acquired
+        """
+        return self._ring.acquire(n_packets, timeout_ns)
+    
+    def release(self) -> None:
+        """Hand the packets from ``acquire()`` back to the ring."""
+        return self._ring.release()
+    
+    def send_data(self, data: bytes, timestamp: int = 0) -> None:
+        """Queue a packet on the owner's send ring, due at timestamp
+        (CLOCK_MONOTONIC ns, 0 for straight away)."""
+        return self._ring.send_data(data, timestamp)
+    
+    def send_batch(self, packets: List[Tuple[bytes, int]]) -> None:
+        """Queue many (data, timestamp) packets on the owner's send ring."""
+        return self._ring.send_batch(packets)
+    
+    def get_receive_length(self) -> int:
+        """Number of packets waiting in the receive ring."""
+        return self._ring.get_receive_length()
+    
+    def close(self) -> None:
+        """Detach from the segment, releasing any acquired packets.
+        
+        Raises:
+            BufferError: If memoryviews from ``acquire()`` are still alive
+        """
+        return self._ring.close()
+    
+    def __enter__(self) -> "ShmRing":
+        return self
+    
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -1,11 +1,15 @@
 from typing import Optional, Tuple, Dict, Any, List
 from .base import RtUdpBase
-from .rtudp import _RtUdpSocket
+from .rtudp import _RtUdpSocket, STAT_NAMES
+from .engine import Engine
 
 
 class RtUdpSocket(RtUdpBase):
     """Real UDP socket implementation using the C extension."""
     
+    #: Counter names, in ``get_stats_snapshot()`` order
+    STAT_NAMES = STAT_NAMES
+    
     def __init__(self, local_ip: str, local_port: int, 
                  remote_ip: str, remote_port: int, **kwargs):
         """Initialize the UDP socket.
@@ -21,15 +25,86 @@ class RtUdpSocket(RtUdpBase):
                 - capacity: Ring buffer capacity (default: 1024)
                 - name: Name for debugging (default: "RtUdp")
                 - direction: 0=send, 1=receive, 2=full duplex (default: 0)
-                - cpu: CPU core to pin threads to (default: -1 for no affinity)
+                - cpu: CPU core to pin the send worker to, or the receive
+                  worker in receive mode (default: -1 for no affinity)
+                - rx_cpu: CPU core for the receive worker in full duplex
+                  mode (default: -1 to follow cpu)
                 - timeout: Default timeout in nanoseconds (default: 10s)
+                - rx_batch: recvmmsg() vector length for the receive worker,
+                  0 for one recvfrom() per datagram (default: 0)
+                - ring_bytes: Size in bytes of each variable-length slab ring.
+                  0 uses fixed per-packet slots sized by capacity (default: 0)
+                - max_payload: Largest datagram in bytes, up to 65507
+                  (default: 1500)
+                - gso_size: Segment size for UDP_SEGMENT send offload, 0 to
+                  disable (default: 0)
+                - gro: Enable UDP_GRO receive coalescing (default: False)
+                - histo_start: Latency histogram bin width in ns for the
+                  first octave (default: 100)
+                - histo_div: Latency histogram bins per octave, a power of
+                  two from 8 to 128 (default: 16)
+                - timestamping: Use SO_TIMESTAMPING kernel software
+                  timestamps for received packets and get_tx_timestamps()
+                  (default: False)
+                - txtime: Hand scheduled packets to the kernel early with
+                  SO_TXTIME/SCM_TXTIME instead of sleeping until each
+                  deadline. Needs an fq or etf qdisc on the route to the
+                  peer to hold them, otherwise init_socket() warns and
+                  falls back to sleeping (default: False)
+                - txtime_lead: How far ahead of its deadline, in ns, a
+                  packet is handed over in txtime mode (default: 200000)
+                - spin_margin: Precision mode. Sleep until this many ns
+                  before each deadline, then busy-wait. The margin adapts
+                  to the measured wake-up overshoot. 0 to disable
+                  (default: 0)
+                - backpressure: What sending does when the send ring is
+                  full: "block" waits for room, "drop_newest" discards the
+                  packet being queued, "drop_oldest" discards the oldest
+                  queued packet and "raise" raises BlockingIOError. Drops
+                  count in n_tx_packets_dropped (default: "block")
+                - send_timeout: How long "block" waits for room in ns before
+                  raising TimeoutError, -1 waits forever (default: -1)
+                - engine: An ``Engine`` whose shared worker threads serve
+                  this socket instead of its own (default: None)
+                - shards: Size of the SO_REUSEPORT receive group this socket
+                  belongs to, 0 for none. Shards do not connect. Normally
+                  set up by ``ShardedReceiver`` (default: 0)
+                - steer: How the group spreads datagrams: "hash", "cpu",
+                  "random" or "payload" (default: "hash")
+                - shm_name: Keep both rings in a new POSIX shared-memory
+                  segment of this name, which other processes can attach
+                  to with ``ShmRing``. Not with ``engine`` (default: None)
+                - capture: Path of a pcapng file the workers record every
+                  packet they send or receive to, with its scheduled time,
+                  through a writer thread (default: None)
+                - backend: Worker I/O, "poll" or "io_uring". Falls back to
+                  "poll" where io_uring is unavailable (default: "poll")
+                - rx_spin: Busy-poll receive. After each datagram the
+                  receive worker keeps receiving without blocking for this
+                  many ns before it blocks in poll() again. 0 to disable.
+                  Not with ``engine`` (default: 0)
+                - busy_poll: SO_BUSY_POLL budget in ns, with
+                  SO_PREFER_BUSY_POLL, for the kernel's own busy loop in
+                  each receive. Needs CAP_NET_ADMIN above the
+                  net.core.busy_read sysctl. 0 to disable (default: 0)
         """
+        if isinstance(kwargs.get('engine'), Engine):
+            kwargs['engine'] = kwargs['engine']._engine
         self._socket = _RtUdpSocket(local_ip, local_port, remote_ip, remote_port, **kwargs)
     
     def send_data(self, data: bytes, timestamp: Optional[int] = None) -> None:
         """Send data with optional timestamp."""
         return self._socket.send_data(data, timestamp)
     
+    def send_batch(self, packets: List[Tuple[bytes, int]]) -> None:
+        """Queue many packets for sending in one call."""
+        return self._socket.send_batch(packets)
+    
+    def send_from(self, buffer: Any, lengths: Any, timestamps: Any,
+                  offsets: Optional[Any] = None) -> None:
+        """Queue many packets sliced out of one contiguous buffer."""
+        return self._socket.send_from(buffer, lengths, timestamps, offsets)
+    
     def receive_data(self, timeout_ns: int) -> Tuple[bytes, int]:
         """Receive data with timeout."""
         return self._socket.receive_data(timeout_ns)
@@ -38,6 +113,15 @@ class RtUdpSocket(RtUdpBase):
         """Receive multiple packets."""
         return self._socket.receive_batch(n_packets, timeout_ns)
     
+    def receive_into(self, buffer: Any, lengths: Any, timestamps: Any,
+                     timeout_ns: int) -> int:
+        """Receive queued packets into caller-owned buffers."""
+        return self._socket.receive_into(buffer, lengths, timestamps, timeout_ns)
+    
+    def fileno(self) -> int:
+        """eventfd that is readable while received packets are queued."""
+        return self._socket.fileno()
+    
     def init_socket(self) -> None:
         """Initialize the UDP socket."""
         return self._socket.init_socket()
@@ -58,6 +142,23 @@ class RtUdpSocket(RtUdpBase):
         """Get packet statistics."""
         return self._socket.get_packet_stats()
     
+    def get_stats_snapshot(self, out: Optional[Any] = None) -> Any:
+        """Copy the raw 64-bit counters, in ``STAT_NAMES`` order, into the
+        writable int64 buffer ``out`` (or a new memoryview) and return it.
+        
+        All counters come from one consistent snapshot, taken without
+        stopping the workers, so this is cheap to poll at high rates.
+        """
+        return self._socket.get_stats_snapshot(out)
+    
+    def get_tx_timestamps(self) -> List[Tuple[int, int, int]]:
+        """Collect the kernel TX timestamps recorded since the last call."""
+        return self._socket.get_tx_timestamps()
+    
+    def get_latency_histogram(self) -> Tuple[memoryview, memoryview]:
+        """Get the send latency histogram as (counts, edges)."""
+        return self._socket.get_latency_histogram()
+    
     def get_send_length(self) -> int:
         """Get number of packets in send queue."""
         return self._socket.get_send_length()
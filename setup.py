@@ -7,7 +7,7 @@ extra_link_args = []
 
 if sys.platform == "linux":
     extra_compile_args.extend(["-pthread", "-fPIC"])
-    extra_link_args.append("-pthread")
+    extra_link_args.extend(["-pthread", "-lrt"])
 
 rtudp = Extension(
     name="rtudp.rtudp",
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Test asyncio receiving through fileno() with both implementations."""
+
+import asyncio
+import os
+import select
+import time
+from rtudp import create_rtudp_pair
+
+
+async def exercise(sender, receiver, n_packets):
+    # Nothing queued yet: the fd must not be readable and waits time out.
+    assert select.select([receiver.fileno()], [], [], 0)[0] == []
+    try:
+        await receiver.areceive(timeout_ns=20_000_000)
+        assert False, "areceive() should have timed out"
+    except TimeoutError:
+        pass
+
+    # Another task keeps running while the receiver waits.
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    ticker_task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0.02)
+    sender.send_data(b"first", time.monotonic_ns() + 30_000_000)
+    data, _ = await receiver.areceive(timeout_ns=1_000_000_000)
+    assert data == b"first"
+    assert ticks > 10, "event loop was blocked while waiting"
+    ticker_task.cancel()
+
+    now = time.monotonic_ns()
+    sender.send_batch([(i.to_bytes(4, "little"), now + i * 100_000)
+                       for i in range(n_packets)])
+    await sender.adrain(timeout_ns=1_000_000_000)
+    assert sender.get_send_length() == 0
+
+    received = await receiver.areceive_batch(n_packets, timeout_ns=1_000_000_000)
+    assert [int.from_bytes(d, "little") for d, _ in received] == list(range(n_packets))
+
+    # Drained again, so the fd goes quiet.
+    assert select.select([receiver.fileno()], [], [], 0)[0] == []
+
+
+def run_asyncio(implementation, n_packets=100):
+    sender, receiver = create_rtudp_pair(
+        implementation,
+        "127.0.79.1", 5001,
+        "127.0.79.2", 5002,
+        capacity=1024
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+    try:
+        asyncio.run(exercise(sender, receiver, n_packets))
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_emulated_fileno_closed():
+    # The pipe behind an emulated fileno() is closed with the endpoint.
+    open_fds = len(os.listdir("/proc/self/fd"))
+    for port in range(5601, 5701, 2):
+        sender, receiver = create_rtudp_pair(
+            "emulated", "127.0.79.5", port, "127.0.79.6", port + 1)
+        sender.init_socket()
+        receiver.init_socket()
+        receiver.fileno()
+        sender.close_socket()
+        receiver.close_socket()
+    assert len(os.listdir("/proc/self/fd")) == open_fds
+
+
+def test_asyncio_socket():
+    run_asyncio("socket")
+
+
+def test_asyncio_emulated():
+    run_asyncio("emulated")
+
+
+if __name__ == "__main__":
+    test_asyncio_socket()
+    test_asyncio_emulated()
+    test_emulated_fileno_closed()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Test send backpressure policies and GIL release with both implementations."""
+
+import threading
+import time
+from rtudp import create_rtudp_pair
+
+CAPACITY = 8
+
+
+def make_pair(implementation, port, **kwargs):
+    sender, receiver = create_rtudp_pair(
+        implementation,
+        "127.0.80.1", port,
+        "127.0.80.2", port + 1,
+        capacity=CAPACITY, **kwargs
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    return sender, receiver
+
+
+def close(*endpoints):
+    for endpoint in endpoints:
+        endpoint.stop()
+        endpoint.close_socket()
+
+
+def fill_and_deliver(implementation, port, policy, n_packets=20):
+    """Overfill a stopped sender, then start it and see what arrives."""
+    sender, receiver = make_pair(implementation, port, backpressure=policy)
+    try:
+        now = time.monotonic_ns()
+        for i in range(n_packets):
+            sender.send_data(i.to_bytes(4, "little"), now)
+        assert sender.get_send_length() == CAPACITY
+        stats = sender.get_packet_stats()
+        assert stats['n_tx_packets_dropped'] == n_packets - CAPACITY
+        assert stats['n_packets_req'] == n_packets
+
+        receiver.start()
+        sender.start()
+        received = receiver.receive_batch(CAPACITY, 1_000_000_000)
+        return [int.from_bytes(data, "little") for data, _ in received]
+    finally:
+        close(sender, receiver)
+
+
+def run_policies(implementation, port):
+    assert fill_and_deliver(implementation, port, "drop_newest") == list(range(8))
+    assert fill_and_deliver(implementation, port + 2, "drop_oldest") == list(range(12, 20))
+
+    sender, receiver = make_pair(implementation, port + 4, backpressure="raise")
+    try:
+        sender.send_batch([(b"x", 0)] * CAPACITY)
+        try:
+            sender.send_data(b"x", 0)
+            assert False, "a full queue should raise"
+        except BlockingIOError:
+            pass
+        assert sender.get_send_length() == CAPACITY
+    finally:
+        close(sender, receiver)
+
+    sender, receiver = make_pair(implementation, port + 6, send_timeout=20_000_000)
+    try:
+        sender.send_batch([(b"x", 0)] * CAPACITY)
+        start = time.monotonic()
+        try:
+            sender.send_data(b"x", 0)
+            assert False, "a full queue should time out"
+        except TimeoutError:
+            pass
+        assert time.monotonic() - start >= 0.015
+    finally:
+        close(sender, receiver)
+
+
+def run_gil_release(implementation, port):
+    """Other Python threads run while receive_data() waits."""
+    sender, receiver = make_pair(implementation, port)
+    receiver.start()
+    count = 0
+    done = threading.Event()
+
+    def spin():
+        nonlocal count
+        while not done.is_set():
+            count += 1
+
+    spinner = threading.Thread(target=spin)
+    spinner.start()
+    try:
+        time.sleep(0.01)
+        before = count
+        try:
+            receiver.receive_data(200_000_000)
+        except TimeoutError:
+            pass
+        assert count - before > 1000, "receive_data() held the GIL"
+    finally:
+        done.set()
+        spinner.join()
+        close(sender, receiver)
+
+
+def run_blocked_producers(port, n_packets=2000):
+    """A send_batch() and a send_data() thread both blocked on a full ring."""
+    sender, receiver = make_pair("socket", port)
+    now = time.monotonic_ns()
+    batch = threading.Thread(target=sender.send_batch, args=(
+        [(b"b%d" % i, now) for i in range(n_packets)],))
+
+    def one_by_one():
+        for i in range(n_packets):
+            sender.send_data(b"d%d" % i, now)
+
+    single = threading.Thread(target=one_by_one)
+    try:
+        batch.start()
+        time.sleep(0.05)  # blocked on the full ring, without the GIL
+        single.start()
+        time.sleep(0.05)
+        sender.start()
+        batch.join(5)
+        single.join(5)
+        assert not batch.is_alive() and not single.is_alive()
+        deadline = time.monotonic() + 5
+        while sender.get_send_length() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = sender.get_packet_stats()
+        assert stats['n_packets_req'] == 2 * n_packets
+        assert stats['n_packets_sent'] == 2 * n_packets
+        assert stats['n_tx_packets_dropped'] == 0
+    finally:
+        close(sender, receiver)
+
+
+def test_backpressure_socket():
+    run_policies("socket", 5101)
+
+
+def test_backpressure_emulated():
+    run_policies("emulated", 5121)
+
+
+def test_gil_release_socket():
+    run_gil_release("socket", 5141)
+
+
+def test_blocked_producers_socket():
+    run_blocked_producers(5143)
+
+
+if __name__ == "__main__":
+    test_backpressure_socket()
+    test_backpressure_emulated()
+    test_gil_release_socket()
+    test_blocked_producers_socket()
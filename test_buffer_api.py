@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Test the buffer-protocol APIs (send_from/receive_into) with both implementations."""
+
+import threading
+import time
+from array import array
+from rtudp import create_rtudp_pair
+
+
+def run_receive_into(implementation, n_packets=100, **kwargs):
+    """Receive a burst straight into a bytearray plus int64 arrays."""
+    kwargs.setdefault('capacity', 1024)
+    sender, receiver = create_rtudp_pair(
+        implementation,
+        "127.0.71.1", 4201,
+        "127.0.71.2", 4202,
+        **kwargs
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    try:
+        now = time.monotonic_ns()
+        payloads = [b"x" * (i % 17 + 1) for i in range(n_packets)]
+        sender.send_batch([(data, now) for data in payloads])
+
+        buffer = bytearray(64 * 1024)
+        lengths = array('q', [0] * 32)
+        timestamps = array('q', [0] * 32)
+        received = []
+        while len(received) < n_packets:
+            n = receiver.receive_into(buffer, lengths, timestamps, 1_000_000_000)
+            assert 0 < n <= len(lengths)
+            offset = 0
+            for i in range(n):
+                received.append(bytes(buffer[offset:offset + lengths[i]]))
+                offset += lengths[i]
+                assert timestamps[i] > 0
+        assert received == payloads
+
+        # A buffer too small for the next packet leaves it queued.
+        sender.send_data(b"y" * 64, time.monotonic_ns())
+        while receiver.get_receive_length() == 0:
+            time.sleep(0.001)
+        try:
+            receiver.receive_into(bytearray(8), lengths, timestamps, 1_000_000)
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+        assert receiver.receive_into(buffer, lengths, timestamps, 1_000_000) == 1
+        assert lengths[0] == 64
+
+        try:
+            receiver.receive_into(buffer, lengths, timestamps, 1_000_000)
+            raise AssertionError("expected TimeoutError")
+        except TimeoutError:
+            pass
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def run_send_from(implementation, n_packets=100, **kwargs):
+    """Schedule a whole batch from one buffer and timestamp array."""
+    kwargs.setdefault('capacity', 1024)
+    sender, receiver = create_rtudp_pair(
+        implementation,
+        "127.0.71.3", 4203,
+        "127.0.71.4", 4204,
+        **kwargs
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    try:
+        payloads = [i.to_bytes(8, "little") * (i % 3 + 1) for i in range(n_packets)]
+        buffer = b"".join(payloads)
+        lengths = array('q', [len(p) for p in payloads])
+        start = time.monotonic_ns() + 5_000_000
+        timestamps = array('q', [start + i * 10_000 for i in range(n_packets)])
+
+        # Bad requests are rejected without queueing anything.
+        try:
+            sender.send_from(buffer, lengths, timestamps[:-1])
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+        try:
+            sender.send_from(buffer[:-1], lengths, timestamps)
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+
+        half = n_packets // 2
+        sender.send_from(buffer, lengths[:half], timestamps[:half])
+        offsets = array('q')
+        offset = sum(lengths[:half])
+        for length in lengths[half:]:
+            offsets.append(offset)
+            offset += length
+        sender.send_from(buffer, lengths[half:], timestamps[half:], offsets)
+        assert sender.get_packet_stats()['n_packets_req'] == n_packets
+
+        received = receiver.receive_batch(n_packets, 1_000_000_000)
+        assert [data for data, _ in received] == payloads
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_send_from_socket():
+    run_send_from("socket")
+
+
+def test_send_from_emulated():
+    run_send_from("emulated")
+
+
+def test_send_from_socket_slab():
+    # Small enough that the slab wraps several times.
+    run_send_from("socket", ring_bytes=8192, rx_batch=16)
+
+
+def test_send_from_concurrent_socket(n_packets=100000):
+    # send_from() on one thread and send_data() on another share the ring's
+    # producer side, so neither may overwrite the other's packets.
+    sender, receiver = create_rtudp_pair(
+        "socket",
+        "127.0.71.5", 4205,
+        "127.0.71.6", 4206,
+        capacity=1 << 18, max_payload=64
+    )
+    sender.init_socket()
+    try:
+        later = time.monotonic_ns() + 3_600_000_000_000  # the worker is not started
+        lengths = array('q', [8] * n_packets)
+        timestamps = array('q', [later] * n_packets)
+        thread = threading.Thread(target=sender.send_from,
+                                  args=(bytes(8 * n_packets), lengths, timestamps))
+        thread.start()
+        for i in range(n_packets):
+            sender.send_data(b"x", later)
+        thread.join()
+        assert sender.get_packet_stats()['n_packets_req'] == 2 * n_packets
+        assert sender.get_send_length() == 2 * n_packets
+    finally:
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_receive_into_socket():
+    run_receive_into("socket")
+
+
+def test_receive_into_emulated():
+    run_receive_into("emulated")
+
+
+def test_receive_into_socket_slab():
+    run_receive_into("socket", ring_bytes=8192, rx_batch=16)
+
+
+if __name__ == "__main__":
+    test_send_from_socket()
+    test_send_from_emulated()
+    test_send_from_socket_slab()
+    test_send_from_concurrent_socket()
+    test_receive_into_socket()
+    test_receive_into_emulated()
+    test_receive_into_socket_slab()
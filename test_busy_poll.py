@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Test the busy-poll receive mode."""
+
+import time
+import warnings
+from rtudp import Engine, RtUdpSocket, create_rtudp_pair
+
+
+def run_busy_poll(rx_batch, port, n_packets=20):
+    with warnings.catch_warnings():
+        # SO_BUSY_POLL needs CAP_NET_ADMIN; spinning works without it.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        sender, receiver = create_rtudp_pair(
+            "socket",
+            "127.0.89.1", port,
+            "127.0.89.2", port + 1,
+            rx_batch=rx_batch, rx_spin=2_000_000, busy_poll=50_000
+        )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+    try:
+        now = time.monotonic_ns()
+        sender.send_batch([(i.to_bytes(4, "little"), now + i * 200_000)
+                           for i in range(n_packets)])
+        received = receiver.receive_batch(n_packets, 1_000_000_000)
+        assert [int.from_bytes(d, "little") for d, _ in received] \
+            == list(range(n_packets))
+
+        stats = receiver.get_packet_stats()
+        print(f"[rx_batch={rx_batch}] polls={stats['n_rx_spin_polls']} "
+              f"idle={stats['n_rx_spin_idle']} "
+              f"wakeups={stats['n_rx_wakeups']} "
+              f"spin_ns={stats['total_rx_spin_ns']}")
+        assert stats["n_packets_rec"] == n_packets
+        assert stats["n_rx_spin_polls"] > 0
+        assert stats["n_rx_spin_idle"] <= stats["n_rx_spin_polls"]
+        assert 0.0 <= stats["rx_spin_idle_ratio"] <= 1.0
+        assert stats["total_rx_spin_ns"] > 0
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+    # Idle between bursts, it blocks in poll() again.
+    assert receiver.get_packet_stats()["n_rec_ticks"] > 0
+
+
+def test_busy_poll_single():
+    run_busy_poll(0, 7001)
+
+
+def test_busy_poll_batched():
+    run_busy_poll(16, 7003)
+
+
+def test_busy_poll_errors():
+    for kwargs in ({"rx_spin": -1}, {"busy_poll": -1},
+                   {"rx_spin": 1000, "engine": Engine(1)}):
+        try:
+            RtUdpSocket("127.0.89.1", 7005, "127.0.89.2", 7006, direction=1,
+                        **kwargs)
+            assert False, f"{kwargs} should be rejected"
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    test_busy_poll_single()
+    test_busy_poll_batched()
+    test_busy_poll_errors()
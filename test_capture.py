@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Test in-worker pcapng capture and capture replay."""
+
+import os
+import re
+import struct
+import tempfile
+import time
+from rtudp import RtUdpSocket, create_rtudp_pair, load_capture
+
+
+def run_capture(directory, n_packets=20, gap_ns=2_000_000):
+    tx_path = os.path.join(directory, "tx.pcapng")
+    rx_path = os.path.join(directory, "rx.pcapng")
+    sender = RtUdpSocket("127.0.86.1", 6601, "127.0.86.2", 6602,
+                         capture=tx_path)
+    receiver = RtUdpSocket("127.0.86.2", 6602, "127.0.86.1", 6601,
+                           direction=1, rx_batch=16, capture=rx_path)
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+    try:
+        now = time.monotonic_ns()
+        sender.send_batch([(i.to_bytes(4, "little"), now + i * gap_ns)
+                           for i in range(n_packets)])
+        receiver.receive_batch(n_packets, 1_000_000_000)
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+    assert sender.get_packet_stats()["n_captured"] == n_packets
+    assert receiver.get_packet_stats()["n_captured"] == n_packets
+
+    for path, direction in ((tx_path, "out"), (rx_path, "in")):
+        capture = load_capture(path, direction)
+        payloads = [capture.data[o:o + n]
+                    for o, n in zip(capture.offsets, capture.lengths)]
+        assert payloads == [i.to_bytes(4, "little") for i in range(n_packets)]
+        # A worker that wakes late handles the due packets in one batch
+        # with one timestamp, so only the overall spacing is checked.
+        stamps = capture.timestamps
+        assert all(a <= b for a, b in zip(stamps, stamps[1:])), stamps
+        assert stamps[-1] - stamps[0] > (n_packets - 1) * gap_ns // 2, stamps
+    # The scheduled times in the send capture's comments keep the spacing,
+    # up to the monotonic to realtime offset drifting between records.
+    with open(tx_path, "rb") as f:
+        scheduled = [int(ts) for ts in re.findall(rb"scheduled_ns=(\d+)", f.read())]
+    assert len(scheduled) == n_packets
+    gaps = [b - a for a, b in zip(scheduled, scheduled[1:])]
+    assert all(abs(gap - gap_ns) < 100_000 for gap in gaps), gaps
+    # A send capture holds no received packets.
+    assert len(load_capture(tx_path, "in").lengths) == 0
+    return tx_path
+
+
+def run_replay(implementation, path, n_packets=20, gap_ns=2_000_000):
+    sender, receiver = create_rtudp_pair(
+        implementation,
+        "127.0.86.3", 6603,
+        "127.0.86.4", 6604,
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+    try:
+        assert sender.replay_capture(path, speed=2.0) == n_packets
+        received = receiver.receive_batch(n_packets, 1_000_000_000)
+        assert [int.from_bytes(d, "little") for d, _ in received] == \
+            list(range(n_packets))
+        span = received[-1][1] - received[0][1]
+        assert span > (n_packets - 1) * gap_ns // 4, span
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_capture_and_replay():
+    with tempfile.TemporaryDirectory() as directory:
+        path = run_capture(directory)
+        run_replay("socket", path)
+        run_replay("emulated", path)
+
+
+def test_load_classic_pcap():
+    # Two Ethernet frames in a microsecond pcap: a UDP datagram and an ARP.
+    ip = bytes([0x45, 0, 0, 33, 0, 0, 0x40, 0, 64, 17, 0, 0,
+                127, 0, 0, 1, 127, 0, 0, 2])
+    udp = struct.pack(">HHHH", 5000, 5001, 13, 0) + b"hello"
+    frames = [b"\0" * 12 + b"\x08\x00" + ip + udp, b"\0" * 12 + b"\x08\x06"]
+    data = struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)
+    for i, frame in enumerate(frames):
+        data += struct.pack("<IIII", 10, 500 + i, len(frame), len(frame)) + frame
+    with tempfile.NamedTemporaryFile(suffix=".pcap") as f:
+        f.write(data)
+        f.flush()
+        capture = load_capture(f.name)
+    assert len(capture.lengths) == 1
+    start = capture.offsets[0]
+    assert capture.data[start:start + capture.lengths[0]] == b"hello"
+    assert capture.timestamps[0] == 10_000_500_000
+
+
+if __name__ == "__main__":
+    test_capture_and_replay()
+    test_load_classic_pcap()
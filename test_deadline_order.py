@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Test that packets go out in deadline order, whatever order they were queued in."""
+
+import random
+import time
+from rtudp import create_rtudp, create_rtudp_pair
+
+
+def run_deadline_order(implementation, n_packets=100, **kwargs):
+    sender, receiver = create_rtudp_pair(
+        implementation,
+        "127.0.78.1", 4901,
+        "127.0.78.2", 4902,
+        **kwargs
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    try:
+        # A far-off packet first must not hold back the ones queued behind it.
+        start = time.monotonic_ns()
+        sender.send_data(b"far", start + 200_000_000)
+        slots = list(range(n_packets))
+        random.Random(1).shuffle(slots)
+        for i in slots:
+            sender.send_data(b"%d" % i, start + 20_000_000 + i * 100_000)
+
+        received = receiver.receive_batch(n_packets, 1_000_000_000)
+        assert [d for d, _ in received] == [b"%d" % i for i in range(n_packets)]
+        data, _ = receiver.receive_data(1_000_000_000)
+        assert data == b"far"
+
+        stats = sender.get_packet_stats()
+        print(f"[{implementation}] p99={stats['p99_latency_ns']} max={stats['max_latency_ns']}")
+        # No packet waited for the one queued ahead of it.
+        assert stats['max_latency_ns'] < 20_000_000
+        if implementation == "socket":
+            assert stats['n_tx_out_of_order'] > 0
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def run_far_ahead(port, n_packets=20, **kwargs):
+    """One packet far ahead, then more than the send ring holds due now."""
+    sender = create_rtudp("socket", "127.0.78.1", port, "127.0.78.2", port + 1,
+                          direction=0, send_timeout=2_000_000_000, **kwargs)
+    receiver = create_rtudp("socket", "127.0.78.2", port + 1, "127.0.78.1", port,
+                            direction=1)
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    try:
+        now = time.monotonic_ns()
+        sender.send_data(b"far", now + 30_000_000_000)
+        for i in range(n_packets):
+            sender.send_data(b"%d" % i, now)  # TimeoutError if stuck
+
+        received = receiver.receive_batch(n_packets, 1_000_000_000)
+        assert [d for d, _ in received] == [b"%d" % i for i in range(n_packets)]
+        assert sender.get_send_length() == 1
+        stats = sender.get_packet_stats()
+        assert stats['n_packets_sent'] == n_packets
+        assert stats['n_tx_spilled'] >= 1
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_deadline_order_socket():
+    run_deadline_order("socket")
+
+
+def test_deadline_order_socket_slab():
+    run_deadline_order("socket", ring_bytes=8192)
+
+
+def test_deadline_order_emulated():
+    run_deadline_order("emulated")
+
+
+def test_far_ahead_socket():
+    run_far_ahead(4903, capacity=8)
+
+
+def test_far_ahead_socket_slab():
+    run_far_ahead(4905, n_packets=500, ring_bytes=4096)
+
+
+if __name__ == "__main__":
+    test_deadline_order_socket()
+    test_deadline_order_socket_slab()
+    test_deadline_order_emulated()
+    test_far_ahead_socket()
+    test_far_ahead_socket_slab()
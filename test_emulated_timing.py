@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Test that the emulated send worker sleeps until each deadline, not in ticks."""
+
+import time
+from rtudp import create_rtudp_pair
+from conftest import close_pair
+
+
+def make_pair(port):
+    sender, receiver = create_rtudp_pair(
+        "emulated",
+        "127.0.90.1", port,
+        "127.0.90.2", port + 1
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    return sender, receiver
+
+
+def test_emulated_idle():
+    sender, receiver = make_pair(7101)
+    try:
+        time.sleep(0.2)
+        # An idle worker waits without a timeout.
+        assert sender.get_packet_stats()["n_send_ticks"] <= 2
+        assert receiver.get_packet_stats()["n_rec_ticks"] == 0
+    finally:
+        close_pair(sender, receiver)
+
+
+def test_emulated_early_wake():
+    sender, receiver = make_pair(7103)
+    try:
+        # The worker is asleep until the far packet when the near one comes.
+        now = time.monotonic_ns()
+        sender.send_data(b"far", now + 500_000_000)
+        time.sleep(0.01)
+        sender.send_data(b"near", time.monotonic_ns() + 10_000_000)
+        data, sent = receiver.receive_data(1_000_000_000)
+        assert data == b"near"
+        assert sent < now + 100_000_000
+    finally:
+        close_pair(sender, receiver)
+
+
+def test_emulated_paced_latency(n_packets=100):
+    sender, receiver = make_pair(7105)
+    try:
+        start = time.monotonic_ns() + 5_000_000
+        sender.send_batch([(b"%d" % i, start + i * 300_000)
+                           for i in range(n_packets)])
+        received = receiver.receive_batch(n_packets, 2_000_000_000)
+        assert [d for d, _ in received] == [b"%d" % i for i in range(n_packets)]
+        # Nothing goes out early.
+        for i, (_, sent) in enumerate(received):
+            assert sent >= start + i * 300_000
+
+        stats = sender.get_packet_stats()
+        print(f"[emulated] p50={stats['p50_latency_ns']} "
+              f"p99={stats['p99_latency_ns']} ticks={stats['n_send_ticks']}")
+        assert stats["n_packets_sent"] == n_packets
+        assert stats["min_latency_ns"] >= 0
+        # One wake per deadline, give or take, not one per millisecond.
+        assert stats["n_send_ticks"] < 4 * n_packets
+    finally:
+        close_pair(sender, receiver)
+
+
+if __name__ == "__main__":
+    test_emulated_idle()
+    test_emulated_early_wake()
+    test_emulated_paced_latency()
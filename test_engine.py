@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Test many socket endpoints served by one shared engine."""
+
+import time
+from rtudp import Engine, create_rtudp_pair
+
+
+def test_engine_many_endpoints(n_pairs=16, n_packets=50):
+    engine = Engine(n_workers=1)
+    pairs = []
+    try:
+        for i in range(n_pairs):
+            sender, receiver = create_rtudp_pair(
+                "socket",
+                "127.0.82.1", 6001 + 2 * i,
+                "127.0.82.2", 6002 + 2 * i,
+                capacity=256, rx_batch=8 * (i % 2), engine=engine
+            )
+            sender.init_socket()
+            receiver.init_socket()
+            sender.start()
+            receiver.start()
+            pairs.append((sender, receiver))
+        assert engine.get_stats()[0]['n_endpoints'] == 2 * n_pairs
+
+        # Shuffled deadlines over 10 ms, interleaved across all endpoints.
+        now = time.monotonic_ns()
+        for i, (sender, _) in enumerate(pairs):
+            sender.send_batch([(bytes([i, k]), now + (k * 37 % n_packets) * 200_000)
+                               for k in range(n_packets)])
+        for i, (sender, receiver) in enumerate(pairs):
+            received = receiver.receive_batch(n_packets, 1_000_000_000)
+            order = sorted(range(n_packets), key=lambda k: k * 37 % n_packets)
+            assert [data for data, _ in received] == [bytes([i, k]) for k in order]
+            stats = sender.get_packet_stats()
+            assert stats['n_packets_sent'] == n_packets
+            assert stats['n_timed_waits'] > 0
+
+        stats = engine.get_stats()[0]
+        print(stats)
+        assert stats['n_timer_fires'] > 0
+
+        # Endpoints still running keep the engine open.
+        try:
+            engine.close()
+            assert False, "close() should refuse while endpoints run"
+        except ValueError:
+            pass
+    finally:
+        for sender, receiver in pairs:
+            sender.stop()
+            receiver.stop()
+            sender.close_socket()
+            receiver.close_socket()
+    assert engine.get_stats()[0]['n_endpoints'] == 0
+    engine.close()
+
+
+def test_engine_restart():
+    with Engine(n_workers=2) as engine:
+        sender, receiver = create_rtudp_pair(
+            "socket",
+            "127.0.82.3", 6101,
+            "127.0.82.4", 6102,
+            engine=engine
+        )
+        sender.init_socket()
+        receiver.init_socket()
+        try:
+            for round in range(3):
+                # Queued before start(): picked up once registered.
+                sender.send_data(bytes([round]), time.monotonic_ns())
+                sender.start()
+                receiver.start()
+                data, _ = receiver.receive_data(1_000_000_000)
+                assert data == bytes([round])
+                # Spread over both workers.
+                assert [w['n_endpoints'] for w in engine.get_stats()] == [1, 1]
+                sender.stop()
+                receiver.stop()
+        finally:
+            sender.stop()
+            receiver.stop()
+            sender.close_socket()
+            receiver.close_socket()
+
+
+def test_engine_receive_bounded(n_packets=100):
+    # A socket with a backlog is served a few batches per wake-up, so it
+    # cannot keep the worker from its other endpoints.
+    with Engine(n_workers=1) as engine:
+        sender, receiver = create_rtudp_pair(
+            "socket",
+            "127.0.82.7", 6301,
+            "127.0.82.8", 6302,
+            capacity=256, engine=engine
+        )
+        sender.init_socket()
+        receiver.init_socket()
+        try:
+            sender.start()
+            sender.send_batch([(bytes([i]), 0) for i in range(n_packets)])
+            time.sleep(0.05)  # queued in the receiving socket
+            receiver.start()
+            received = receiver.receive_batch(n_packets, 1_000_000_000)
+            assert [data for data, _ in received] == \
+                [bytes([i]) for i in range(n_packets)]
+            # rx_batch=0 receives one datagram per recvmmsg() round.
+            assert engine.get_stats()[0]['n_wakeups'] >= n_packets // 4
+        finally:
+            sender.stop()
+            receiver.stop()
+            sender.close_socket()
+            receiver.close_socket()
+
+
+def test_engine_closed():
+    engine = Engine()
+    engine.close()
+    sender, receiver = create_rtudp_pair(
+        "socket",
+        "127.0.82.5", 6201,
+        "127.0.82.6", 6202,
+        engine=engine
+    )
+    sender.init_socket()
+    try:
+        try:
+            sender.start()
+            assert False, "a closed engine should not take endpoints"
+        except ValueError:
+            pass
+        assert not sender.is_running()
+    finally:
+        sender.close_socket()
+
+
+if __name__ == "__main__":
+    test_engine_many_endpoints()
+    test_engine_restart()
+    test_engine_receive_bounded()
+    test_engine_closed()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Test full duplex (direction=2) endpoints with both implementations."""
+
+import time
+from rtudp import create_rtudp_pair
+
+
+def run_full_duplex(implementation, n_packets=50):
+    """Exchange packets both ways over one endpoint per side."""
+    a, b = create_rtudp_pair(
+        implementation,
+        "127.0.73.1", 4401,
+        "127.0.73.2", 4402,
+        direction=2
+    )
+    a.init_socket()
+    b.init_socket()
+
+    try:
+        # Run twice to check stop() leaves the endpoint restartable.
+        for rnd in range(2):
+            a.start()
+            b.start()
+            time.sleep(0.05)
+            assert a.is_running() and b.is_running()
+
+            now = time.monotonic_ns()
+            for i in range(n_packets):
+                a.send_data(b"a%d.%d" % (rnd, i), now)
+                b.send_data(b"b%d.%d" % (rnd, i), now)
+
+            from_a = b.receive_batch(n_packets, 1_000_000_000)
+            from_b = a.receive_batch(n_packets, 1_000_000_000)
+            assert [d for d, _ in from_a] == [b"a%d.%d" % (rnd, i) for i in range(n_packets)]
+            assert [d for d, _ in from_b] == [b"b%d.%d" % (rnd, i) for i in range(n_packets)]
+
+            a.stop()
+            b.stop()
+            assert not a.is_running() and not b.is_running()
+
+        stats = a.get_packet_stats()
+        print(f"[{implementation}] {stats}")
+        assert stats['n_packets_sent'] == 2 * n_packets
+        assert stats['n_packets_rec'] == 2 * n_packets
+    finally:
+        a.stop()
+        b.stop()
+        a.close_socket()
+        b.close_socket()
+
+
+def test_full_duplex_socket():
+    run_full_duplex("socket")
+
+
+def test_full_duplex_emulated():
+    run_full_duplex("emulated")
+
+
+if __name__ == "__main__":
+    test_full_duplex_socket()
+    test_full_duplex_emulated()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Test the network impairment model of the emulated transport."""
+
+import time
+from rtudp import Impairment, VirtualClock, create_rtudp_pair
+from conftest import close_pair
+
+
+def make_pair(port, impairment, clock=None, **kwargs):
+    sender, receiver = create_rtudp_pair(
+        "emulated",
+        "127.0.92.1", port,
+        "127.0.92.2", port + 1,
+        impairment=impairment, clock=clock, **kwargs
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    return sender, receiver
+
+
+def run_virtual(port, impairment, n_packets, size=8, gap_ns=1_000_000):
+    """Send n_packets numbered packets in virtual time and return what
+    arrived as (number, arrival) pairs, with the sender's stats."""
+    clock = VirtualClock()
+    sender, receiver = make_pair(port, impairment, clock, capacity=2 * n_packets)
+    try:
+        sender.send_batch([(i.to_bytes(size, "little"), i * gap_ns)
+                           for i in range(n_packets)])
+        clock.run()
+        received = receiver.receive_batch(receiver.get_receive_length(), 0)
+        return ([(int.from_bytes(d, "little"), ts) for d, ts in received],
+                sender.get_packet_stats())
+    finally:
+        close_pair(sender, receiver)
+
+
+def test_latency_and_rate():
+    received, _ = run_virtual(7301, Impairment(latency_ns=5_000_000), 10)
+    assert received == [(i, i * 1_000_000 + 5_000_000) for i in range(10)]
+
+    # 1000 bytes at 8 Mbit/s take 1 ms each, so a burst queues up.
+    received, _ = run_virtual(7303, Impairment(rate_bps=8_000_000), 5,
+                              size=1000, gap_ns=0)
+    assert received == [(i, (i + 1) * 1_000_000) for i in range(5)]
+
+
+def test_jitter():
+    received, stats = run_virtual(7305, Impairment(latency_ns=2_000_000,
+                                                   jitter_ns=500_000, seed=1), 1000)
+    delays = [ts - i * 1_000_000 for i, ts in received]
+    assert len(delays) == 1000 and min(delays) >= 0
+    assert 1_900_000 < sum(delays) / len(delays) < 2_100_000
+    # Jitter larger than the gap reorders.
+    assert [i for i, _ in received] != list(range(1000))
+    assert stats["n_link_lost"] == 0
+
+
+def test_bernoulli_loss():
+    profile = Impairment(loss=0.1, seed=7)
+    received, stats = run_virtual(7307, profile, 10000)
+    assert 800 < stats["n_link_lost"] < 1200
+    assert len(received) == 10000 - stats["n_link_lost"]
+    assert stats["n_packets_sent"] == 10000
+    # The same seed loses the same packets.
+    assert run_virtual(7307, profile, 10000)[0] == received
+
+
+def lost_runs(received, n_packets):
+    got = {i for i, _ in received}
+    runs, run = [], 0
+    for i in range(n_packets):
+        if i in got:
+            if run:
+                runs.append(run)
+            run = 0
+        else:
+            run += 1
+    return runs
+
+
+def test_gilbert_elliott_loss():
+    # 1/6 of the time in the bad state, where everything is lost.
+    received, stats = run_virtual(
+        7311, Impairment(gilbert_elliott=(0.05, 0.25, 0.0, 1.0), seed=3), 10000)
+    assert 1200 < stats["n_link_lost"] < 2200
+    runs = lost_runs(received, 10000)
+    # Bursts of about 1 / r = 4 packets, not single losses.
+    assert sum(runs) / len(runs) > 2.5
+
+
+def test_reorder_and_duplicate():
+    received, stats = run_virtual(
+        7313, Impairment(latency_ns=3_000_000, reorder=0.2, duplicate=0.1,
+                         seed=5), 1000)
+    assert 100 < stats["n_link_reordered"] < 300
+    assert 50 < stats["n_link_duplicated"] < 150
+    assert len(received) == 1000 + stats["n_link_duplicated"]
+    assert sorted({i for i, _ in received}) == list(range(1000))
+    order = [i for i, _ in received]
+    assert order != sorted(order)
+
+
+def test_asymmetric_real_time():
+    # Only endpoint1 -> endpoint2 is impaired.
+    sender, receiver = make_pair(7315, (Impairment(latency_ns=20_000_000), None),
+                                 direction=2)
+    try:
+        start = time.monotonic_ns()
+        sender.send_data(b"slow", start)
+        receiver.send_data(b"fast", start)
+        data, arrival = sender.receive_data(1_000_000_000)
+        assert data == b"fast" and arrival - start < 20_000_000
+        data, arrival = receiver.receive_data(1_000_000_000)
+        assert data == b"slow" and arrival - start >= 20_000_000
+    finally:
+        close_pair(sender, receiver)
+
+
+def test_impairment_errors():
+    for kwargs in ({"latency_ns": -1}, {"rate_bps": 0}, {"loss": 1.5},
+                   {"loss": 0.1, "gilbert_elliott": (0.1, 0.1, 0.0, 1.0)},
+                   {"gilbert_elliott": (0.1, 0.1)}, {"limit": 0}):
+        try:
+            Impairment(**kwargs)
+            assert False, f"{kwargs} should be rejected"
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    test_latency_and_rate()
+    test_jitter()
+    test_bernoulli_loss()
+    test_gilbert_elliott_loss()
+    test_reorder_and_duplicate()
+    test_asymmetric_real_time()
+    test_impairment_errors()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Test jumbo payloads with UDP_SEGMENT (GSO) sends and UDP_GRO receives."""
+
+import time
+from rtudp import create_rtudp, create_rtudp_pair
+
+PAYLOAD = bytes(range(256)) * 55  # 14080 bytes, 11 segments of 1280
+SEGMENT = 1280
+
+
+def run_jumbo(gro, port):
+    sender, receiver = create_rtudp_pair(
+        "socket",
+        "127.0.72.1", port,
+        "127.0.72.2", port + 1,
+        max_payload=16384, gso_size=SEGMENT, gro=gro
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    try:
+        sender.send_data(PAYLOAD, time.monotonic_ns())
+        # With or without GRO, each segment is a record of its own.
+        received = receiver.receive_batch(11, 1_000_000_000)
+        assert b"".join(data for data, _ in received) == PAYLOAD
+        assert [len(data) for data, _ in received[:-1]] == [SEGMENT] * 10
+        stats = receiver.get_packet_stats()
+        assert stats['n_packets_rec'] == 11
+        if gro:
+            assert stats['n_rx_gro_packets'] == 1
+            assert stats['n_rx_gro_segments'] == 11
+
+        stats = sender.get_packet_stats()
+        print(f"[gro={gro}] {stats}")
+        assert stats['n_tx_gso_packets'] == 1
+        assert stats['n_tx_gso_segments'] == 11
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_gso_segments():
+    run_jumbo(False, 4301)
+
+
+def test_gso_gro_round_trip():
+    run_jumbo(True, 4303)
+
+
+def run_truncated(gro, port):
+    sender = create_rtudp("socket", "127.0.72.3", port, "127.0.72.4", port + 1,
+                          direction=0, max_payload=2000)
+    receiver = create_rtudp("socket", "127.0.72.4", port + 1, "127.0.72.3", port,
+                            direction=1, max_payload=1000, gro=gro)
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    try:
+        now = time.monotonic_ns()
+        sender.send_data(bytes(1500), now)
+        sender.send_data(b"fits", now)
+        # The oversized datagram is dropped, not cut to max_payload.
+        data, _ = receiver.receive_data(1_000_000_000)
+        assert data == b"fits"
+        stats = receiver.get_packet_stats()
+        assert stats['n_rx_truncated'] == 1
+        assert stats['n_packets_rec'] == 1
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_truncated():
+    run_truncated(False, 4307)
+
+
+def test_gro_truncated():
+    run_truncated(True, 4309)
+
+
+def test_payload_limit():
+    sender, _ = create_rtudp_pair("socket", "127.0.72.1", 4305,
+                                  "127.0.72.2", 4306, max_payload=2000)
+    sender.init_socket()
+    try:
+        try:
+            sender.send_data(bytes(2001), 0)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("oversized payload was accepted")
+    finally:
+        sender.close_socket()
+
+
+if __name__ == "__main__":
+    test_gso_segments()
+    test_gso_gro_round_trip()
+    test_truncated()
+    test_gro_truncated()
+    test_payload_limit()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Test the send latency histogram and percentiles with both implementations."""
+
+import time
+from rtudp import create_rtudp, create_rtudp_pair
+from rtudp.emulated import LatencyHistogram
+
+
+def run_latency_histogram(implementation, n_packets=200):
+    sender, receiver = create_rtudp_pair(
+        implementation,
+        "127.0.74.1", 4501,
+        "127.0.74.2", 4502,
+        capacity=4096, histo_start=50, histo_div=8
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    try:
+        now = time.monotonic_ns()
+        for i in range(n_packets):
+            sender.send_data(b"x", now + i * 100_000)
+        receiver.receive_batch(n_packets, 1_000_000_000)
+
+        stats = sender.get_packet_stats()
+        counts, edges = sender.get_latency_histogram()
+        print(f"[{implementation}] " + ", ".join(
+            f"{k}={stats[k]}" for k in stats if k.endswith("latency_ns")))
+
+        assert counts.format == "Q" and len(counts) == 128
+        assert edges.format == "q" and len(edges) == 129
+        assert sum(counts) == stats['n_packets_sent'] == n_packets
+        assert list(edges[:9]) == [i * 50 for i in range(9)]
+        assert all(a < b for a, b in zip(edges, edges[1:]))
+
+        assert (stats['p50_latency_ns'] <= stats['p99_latency_ns']
+                <= stats['p999_latency_ns'] <= stats['p9999_latency_ns']
+                <= stats['max_latency_ns'])
+        assert stats['p50_latency_ns'] >= stats['min_latency_ns']
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_latency_histogram_socket():
+    run_latency_histogram("socket")
+
+
+def test_latency_histogram_emulated():
+    run_latency_histogram("emulated")
+
+
+def test_histogram_bins():
+    """Every bin's lower edge maps back to that bin."""
+    histo = LatencyHistogram(100, 16)
+    for i in range(histo.N_BINS):
+        assert histo.index(histo.edges[i]) == i
+        assert histo.index(histo.edges[i + 1] - 1) == i
+    assert histo.index(10**12) == histo.N_BINS - 1
+
+
+def run_histogram_range(implementation):
+    """The smallest accepted histo_div still has increasing int64 edges."""
+    for histo_start, histo_div in ((1, 8), (100, 8), (2**29, 8)):
+        endpoint = create_rtudp(implementation, "127.0.74.3", 4503,
+                                "127.0.74.4", 4504, histo_start=histo_start,
+                                histo_div=histo_div)
+        _, edges = endpoint.get_latency_histogram()
+        assert edges[0] == 0
+        assert all(a < b for a, b in zip(edges, edges[1:])), list(edges)
+    for histo_start, histo_div in ((100, 2), (100, 4), (2**31, 8)):
+        try:
+            create_rtudp(implementation, "127.0.74.3", 4503, "127.0.74.4", 4504,
+                         histo_start=histo_start, histo_div=histo_div)
+            assert False, f"histo_div={histo_div} should be rejected"
+        except ValueError:
+            pass
+
+
+def test_histogram_range_socket():
+    run_histogram_range("socket")
+
+
+def test_histogram_range_emulated():
+    run_histogram_range("emulated")
+
+
+if __name__ == "__main__":
+    test_latency_histogram_socket()
+    test_latency_histogram_emulated()
+    test_histogram_bins()
+    test_histogram_range_socket()
+    test_histogram_range_emulated()
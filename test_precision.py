@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Test the sleep-then-spin precision mode (spin_margin) of the socket backend."""
+
+import time
+from rtudp import create_rtudp_pair
+
+
+def run_precision(spin_margin, port, n_packets=100):
+    sender, receiver = create_rtudp_pair(
+        "socket",
+        "127.0.77.1", port,
+        "127.0.77.2", port + 1,
+        spin_margin=spin_margin
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    try:
+        start = time.monotonic_ns() + 1_000_000
+        for i in range(n_packets):
+            sender.send_data(b"%d" % i, start + i * 500_000)
+        receiver.receive_batch(n_packets, 2_000_000_000)
+
+        stats = sender.get_packet_stats()
+        print(f"[spin_margin={spin_margin}] avg={stats['avg_wake_error_ns']:.0f} "
+              f"max={stats['max_wake_error_ns']} margin={stats['spin_margin_ns']} "
+              f"spin={stats['total_spin_ns']}")
+        # A packet that is already due when the worker gets to it is sent
+        # without waiting.
+        assert stats['n_timed_waits'] == stats['n_tx_sleep_packets'] > 0
+        assert stats['n_tx_sleep_packets'] + stats['n_imediate_packets'] == n_packets
+        assert stats['min_latency_ns'] >= 0
+        return stats
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_precision_mode():
+    stats = run_precision(50_000, 4801)
+    assert stats['total_spin_ns'] > 0
+    assert 1_000 <= stats['spin_margin_ns'] <= 1_000_000
+
+
+def test_sleep_only():
+    stats = run_precision(0, 4803)
+    assert stats['total_spin_ns'] == 0
+    assert stats['spin_margin_ns'] == 0
+
+
+if __name__ == "__main__":
+    test_precision_mode()
+    test_sleep_only()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""Test the C ring buffer between two threads, without a socket."""
+
+from rtudp.rtudp import _ring_bench
+
+
+def test_ring_fixed():
+    for batch in (1, 7, 64):
+        # capacity 5 rounds up to 8 slots, so the producer keeps waiting
+        result = _ring_bench(100_000, capacity=5, payload=32, batch=batch)
+        assert result["n_packets"] == 100_000, result
+
+
+def test_ring_slab():
+    for payload in (0, 17, 1500):
+        # odd record sizes exercise the wrap marker at the end of the slab
+        result = _ring_bench(50_000, capacity=4096, payload=payload,
+                             batch=3, slab=True)
+        assert result["n_packets"] == 50_000, result
+
+
+if __name__ == "__main__":
+    test_ring_fixed()
+    test_ring_slab()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Test batched sending (send_batch) and receiving (rx_batch) with both implementations."""
+
+import time
+from rtudp import create_rtudp_pair
+
+
+def run_send_batch(implementation, port=4101, rx_batch=64, n_packets=200):
+    """Send a burst of already-due packets with one send_batch() call."""
+    sender, receiver = create_rtudp_pair(
+        implementation,
+        "127.0.70.1", port,
+        "127.0.70.2", port + 1,
+        capacity=4096, rx_batch=rx_batch
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    try:
+        now = time.monotonic_ns()
+        sender.send_batch([(i.to_bytes(8, "little"), now) for i in range(n_packets)])
+
+        received = receiver.receive_batch(n_packets, 1_000_000_000)
+        ids = [int.from_bytes(data, "little") for data, _ in received]
+        assert ids == list(range(n_packets)), "packets arrived out of order"
+
+        stats = sender.get_packet_stats()
+        rx_stats = receiver.get_packet_stats()
+        print(f"[{implementation}] {stats}")
+        print(f"[{implementation}] {rx_stats}")
+        assert stats['n_packets_req'] == n_packets
+        assert stats['n_packets_sent'] == n_packets
+        if implementation == "socket":
+            # A backlog of due packets must not cost one syscall each.
+            assert stats['syscalls_per_packet'] < 0.5
+            assert rx_stats['n_packets_rec'] == n_packets
+            if rx_batch > 1:
+                # ... and neither does receiving the burst with recvmmsg.
+                assert rx_stats['n_rx_syscalls'] < rx_stats['n_packets_rec']
+                assert rx_stats['avg_rx_batch'] > 1
+            else:
+                assert rx_stats['n_rx_syscalls'] >= rx_stats['n_packets_rec']
+        return rx_stats
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_send_batch_socket():
+    batched = run_send_batch("socket")
+    single = run_send_batch("socket", port=4103, rx_batch=0)
+    assert batched['n_rx_syscalls'] < single['n_rx_syscalls']
+
+
+def test_send_batch_emulated():
+    run_send_batch("emulated")
+
+
+if __name__ == "__main__":
+    test_send_batch_socket()
+    test_send_batch_emulated()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Test shared-memory rings drained and fed from another process."""
+
+import multiprocessing
+import os
+import threading
+import time
+from rtudp import RtUdpSocket, ShmRing, Engine
+from conftest import close_pair
+
+
+def shm_worker(name, n_packets):
+    # Sum the received payloads without copying them, then report back
+    # through the owner's send ring.
+    with ShmRing(name) as ring:
+        total = 0
+        seen = 0
+        while seen < n_packets:
+            packets = ring.acquire(n_packets - seen, 2_000_000_000)
+            total += sum(int.from_bytes(view, "little") for view, _ in packets)
+            seen += len(packets)
+            del packets
+            ring.release()
+        ring.send_data(total.to_bytes(8, "little"))
+
+
+def test_shm_other_process(n_packets=100):
+    name = f"rtudp-test-{os.getpid()}"
+    owner = RtUdpSocket("127.0.85.2", 6502, "127.0.85.1", 6501,
+                        direction=2, shm_name=name)
+    peer = RtUdpSocket("127.0.85.1", 6501, "127.0.85.2", 6502, direction=2)
+    owner.init_socket()
+    peer.init_socket()
+    owner.start()
+    peer.start()
+    time.sleep(0.05)
+
+    ctx = multiprocessing.get_context("spawn")
+    child = ctx.Process(target=shm_worker, args=(name, n_packets))
+    child.start()
+    try:
+        now = time.monotonic_ns()
+        peer.send_batch([(i.to_bytes(4, "little"), now) for i in range(n_packets)])
+        data, _ = peer.receive_data(10_000_000_000)
+        assert int.from_bytes(data, "little") == sum(range(n_packets))
+        child.join(10)
+        assert child.exitcode == 0
+        assert owner.get_receive_length() == 0, "child did not drain the ring"
+    finally:
+        if child.is_alive():
+            child.terminate()
+        owner.stop()
+        peer.stop()
+        owner.close_socket()
+        peer.close_socket()
+
+
+def test_shm_errors():
+    name = f"rtudp-test-err-{os.getpid()}"
+    owner = RtUdpSocket("127.0.85.4", 6504, "127.0.85.3", 6503,
+                        direction=1, shm_name=name)
+    try:
+        RtUdpSocket("127.0.85.5", 6505, "127.0.85.3", 6503,
+                    direction=1, shm_name=name)
+        assert False, "second owner of one segment"
+    except FileExistsError:
+        pass
+    with Engine() as engine:
+        try:
+            RtUdpSocket("127.0.85.6", 6506, "127.0.85.3", 6503,
+                        shm_name=name + "-engine", engine=engine)
+            assert False, "shm_name with an engine"
+        except ValueError:
+            pass
+
+    ring = ShmRing(name)
+    owner.init_socket()
+    owner.start()
+    try:
+        sender = RtUdpSocket("127.0.85.3", 6503, "127.0.85.4", 6504)
+        sender.init_socket()
+        sender.start()
+        sender.send_data(b"held", time.monotonic_ns())
+        views = ring.acquire(1, 1_000_000_000)
+        assert bytes(views[0][0]) == b"held"
+        try:
+            ring.close()
+            assert False, "closed under a live memoryview"
+        except BufferError:
+            pass
+        try:
+            ring.acquire(1, 0)
+            assert False, "acquired twice"
+        except ValueError:
+            pass
+        del views
+        ring.close()
+        sender.stop()
+        sender.close_socket()
+    finally:
+        owner.stop()
+        owner.close_socket()
+    del owner
+    try:
+        ShmRing(name)
+        assert False, "segment outlived its owner"
+    except FileNotFoundError:
+        pass
+
+
+def test_shm_receive_contended():
+    name = f"rtudp-test-contended-{os.getpid()}"
+    owner = RtUdpSocket("127.0.85.8", 6508, "127.0.85.7", 6507,
+                        direction=1, shm_name=name)
+    ring = ShmRing(name)
+    owner.init_socket()
+    owner.start()
+    sender = RtUdpSocket("127.0.85.7", 6507, "127.0.85.8", 6508)
+    sender.init_socket()
+    sender.start()
+    try:
+        sender.send_data(b"first", time.monotonic_ns())
+        views = ring.acquire(1, 1_000_000_000)
+        result = []
+
+        def receive():
+            try:
+                result.append(owner.receive_data(2_000_000_000))
+            except TimeoutError as exc:
+                result.append(exc)
+
+        # The ring holds a packet, so receive_data goes straight for the
+        # consumer lock held by the ShmRing: this thread must keep running.
+        thread = threading.Thread(target=receive)
+        thread.start()
+        time.sleep(0.05)
+        assert not result
+        # Once the lock is free the ring is empty again: wait for the next
+        # packet rather than time out.
+        del views
+        ring.release()
+        time.sleep(0.05)
+        sender.send_data(b"second", time.monotonic_ns())
+        thread.join(5)
+        assert len(result) == 1 and not isinstance(result[0], Exception)
+        assert result[0][0] == b"second"
+        ring.close()
+    finally:
+        close_pair(sender, owner)
+
+
+if __name__ == "__main__":
+    test_shm_other_process()
+    test_shm_errors()
+    test_shm_receive_contended()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Test consistent 64-bit statistics snapshots from the socket implementation."""
+
+import time
+from array import array
+from rtudp import create_rtudp_pair
+
+
+def test_stats_snapshot(n_packets=10000, burst=100):
+    sender, receiver = create_rtudp_pair(
+        "socket",
+        "127.0.84.1", 6401,
+        "127.0.84.2", 6402,
+        capacity=4096, rx_batch=64
+    )
+    names = sender.STAT_NAMES
+    idx = {name: i for i, name in enumerate(names)}
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    try:
+        counters = array('q', bytes(8 * len(names)))
+        assert sender.get_stats_snapshot(counters) is counters
+        now = time.monotonic_ns()
+        for start in range(0, n_packets, burst):
+            sender.send_batch([(b"x" * 16, now) for _ in range(burst)])
+            # Each send batch updates these together, so every snapshot
+            # taken while the worker runs must agree with itself.
+            for _ in range(20):
+                sender.get_stats_snapshot(counters)
+                sent = counters[idx['n_packets_sent']]
+                paths = (counters[idx['n_imediate_packets']]
+                         + counters[idx['n_tx_sleep_packets']]
+                         + counters[idx['n_tx_txtime_packets']])
+                assert paths == sent + counters[idx['n_tx_packets_dropped']]
+            receiver.receive_batch(burst, 1_000_000_000)
+
+        snapshot = sender.get_stats_snapshot()
+        stats = sender.get_packet_stats()
+        assert snapshot.format == 'q' and len(snapshot) == len(names)
+        # The idle send worker may still tick in between.
+        for i, name in enumerate(names):
+            if not name.endswith("_ticks"):
+                assert snapshot[i] == stats[name], name
+        assert stats['n_packets_req'] == stats['n_packets_sent'] == n_packets
+        assert receiver.get_packet_stats()['n_packets_rec'] == n_packets
+
+        try:
+            sender.get_stats_snapshot(array('q', [0]))
+            assert False, "a short buffer should be refused"
+        except ValueError:
+            pass
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+if __name__ == "__main__":
+    test_stats_snapshot()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Test SO_TXTIME launch-time scheduling and the sleep fallback."""
+
+import time
+import warnings
+from rtudp import create_rtudp_pair
+
+
+def run_txtime(txtime, port, n_packets=20):
+    sender, receiver = create_rtudp_pair(
+        "socket",
+        "127.0.76.1", port,
+        "127.0.76.2", port + 1,
+        txtime=txtime, txtime_lead=500_000
+    )
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        sender.init_socket()
+    # Loopback's noqueue qdisc would ignore launch times, so unless the
+    # route has fq or etf, txtime falls back to sleeping.
+    active = txtime and not caught
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    time.sleep(0.05)
+
+    try:
+        start = time.monotonic_ns() + 2_000_000
+        for i in range(n_packets):
+            sender.send_data(b"%d" % i, start + i * 1_000_000)
+        sender.send_data(b"late", 0)
+
+        received = receiver.receive_batch(n_packets + 1, 1_000_000_000)
+        # Queued last but already due, so it goes out first.
+        assert [d for d, _ in received] == [b"late"] + [b"%d" % i for i in range(n_packets)]
+
+        stats = sender.get_packet_stats()
+        print(f"[txtime={txtime}] txtime={stats['n_tx_txtime_packets']} "
+              f"sleep={stats['n_tx_sleep_packets']} "
+              f"immediate={stats['n_imediate_packets']}")
+        paths = (stats['n_tx_txtime_packets'] + stats['n_tx_sleep_packets']
+                 + stats['n_imediate_packets'])
+        assert paths == n_packets + 1
+        assert stats['n_imediate_packets'] >= 1  # at least the late one
+        if active:
+            # A wake-up that overshoots the whole lead falls back to a plain send.
+            assert stats['n_tx_txtime_packets'] > stats['n_tx_sleep_packets']
+        else:
+            assert stats['n_tx_txtime_packets'] == 0
+            assert stats['n_tx_sleep_packets'] > 0
+        return active
+    finally:
+        sender.stop()
+        receiver.stop()
+        sender.close_socket()
+        receiver.close_socket()
+
+
+def test_txtime():
+    if not run_txtime(True, 4701):
+        print("no fq or etf qdisc on loopback, tested the fallback")
+
+
+def test_sleep_fallback():
+    run_txtime(False, 4703)
+
+
+if __name__ == "__main__":
+    test_txtime()
+    test_sleep_fallback()
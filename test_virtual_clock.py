@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Test the emulated implementation in virtual time."""
+
+import time
+from rtudp import VirtualClock, create_rtudp_pair
+from conftest import close_pair
+
+DAY_NS = 86_400 * 1_000_000_000
+
+
+def make_pair(clock, port, **kwargs):
+    sender, receiver = create_rtudp_pair(
+        "emulated",
+        "127.0.91.1", port,
+        "127.0.91.2", port + 1,
+        clock=clock, **kwargs
+    )
+    sender.init_socket()
+    receiver.init_socket()
+    sender.start()
+    receiver.start()
+    return sender, receiver
+
+
+def run_day(port, n_packets=1440):
+    """One packet a minute for a day, queued out of order."""
+    clock = VirtualClock()
+    sender, receiver = make_pair(clock, port, capacity=2048)
+    try:
+        step = DAY_NS // n_packets
+        sender.send_batch([(b"%d" % i, (i + 1) * step)
+                           for i in reversed(range(n_packets))])
+        received = receiver.receive_batch(n_packets, 2 * DAY_NS)
+        assert clock.monotonic_ns() == DAY_NS
+        return received, sender.get_packet_stats()
+    finally:
+        close_pair(sender, receiver)
+
+
+def test_virtual_day():
+    start = time.monotonic()
+    received, stats = run_day(7201)
+    assert time.monotonic() - start < 5.0
+    step = DAY_NS // 1440
+    assert received == [(b"%d" % i, (i + 1) * step) for i in range(1440)]
+    assert stats["n_packets_sent"] == 1440
+    assert stats["max_latency_ns"] == 0
+    # Identical results every run.
+    assert run_day(7203) == (received, stats)
+
+
+def test_virtual_timeout():
+    clock = VirtualClock(1_000)
+    sender, receiver = make_pair(clock, 7205)
+    try:
+        sender.send_data(b"late", 1_000 + 3_600_000_000_000)
+        try:
+            receiver.receive_data(60_000_000_000)
+            assert False, "the packet is an hour away"
+        except TimeoutError:
+            pass
+        # The timeout advanced virtual time, not wall-clock time.
+        assert clock.monotonic_ns() == 1_000 + 60_000_000_000
+        data, sent = receiver.receive_data(3_600_000_000_000)
+        assert (data, sent) == (b"late", 1_000 + 3_600_000_000_000)
+        assert clock.monotonic_ns() == sent
+    finally:
+        close_pair(sender, receiver)
+
+
+def test_virtual_shared_clock():
+    # Two senders into one receiver interleave by deadline, ties in the
+    # order they were queued.
+    clock = VirtualClock()
+    a, receiver = make_pair(clock, 7207)
+    b, _ = create_rtudp_pair("emulated", "127.0.91.3", 7209,
+                             "127.0.91.2", 7208, clock=clock)
+    b.init_socket()
+    b.start()
+    try:
+        b.send_data(b"b1", 100)
+        a.send_data(b"a1", 100)
+        a.send_data(b"a2", 50)
+        b.send_data(b"b2", 200)
+        clock.run()
+        assert clock.monotonic_ns() == 200
+        assert [d for d, _ in receiver.receive_batch(4, 0)] == \
+            [b"a2", b"b1", b"a1", b"b2"]
+        assert a.get_send_length() == b.get_send_length() == 0
+    finally:
+        close_pair(a, receiver)
+        b.stop()
+        b.close_socket()
+
+
+def test_virtual_backpressure():
+    # A blocked send runs the simulation until there is room.
+    clock = VirtualClock()
+    sender, receiver = make_pair(clock, 7211, capacity=4)
+    try:
+        sender.send_batch([(b"%d" % i, i * 1_000) for i in range(10)])
+        assert clock.monotonic_ns() == 5_000
+        assert sender.get_send_length() == 4
+        # The receive queue holds 4 too, so 4 and 5 found it full.
+        received = receiver.receive_batch(8, 10_000)
+        assert [d for d, _ in received] == \
+            [b"%d" % i for i in (0, 1, 2, 3, 6, 7, 8, 9)]
+        assert sender.get_packet_stats()["n_tx_packets_dropped"] == 2
+    finally:
+        close_pair(sender, receiver)
+
+
+if __name__ == "__main__":
+    test_virtual_day()
+    test_virtual_timeout()
+    test_virtual_shared_clock()
+    test_virtual_backpressure()